@@ -0,0 +1,92 @@
+"""
+Archive output for SpriteCutter
+Streams encoded tiles straight into one zip or tar file, so an export is a
+single sequential write instead of thousands of small files.
+"""
+
+import io
+import tarfile
+import time
+import zipfile
+
+# Extension -> (kind, tarfile mode)
+ARCHIVE_FORMATS = {
+    ".zip": ("zip", None),
+    ".tar": ("tar", "w"),
+    ".tar.gz": ("tar", "w:gz"),
+    ".tgz": ("tar", "w:gz"),
+    ".tar.bz2": ("tar", "w:bz2"),
+    ".tar.xz": ("tar", "w:xz"),
+}
+
+
+def archive_format(path):
+    """The ARCHIVE_FORMATS entry for a path, or None if it is not an archive"""
+    lower = str(path).lower()
+    for extension, kind in ARCHIVE_FORMATS.items():
+        if lower.endswith(extension):
+            return kind
+    return None
+
+
+def is_archive_path(path):
+    return archive_format(path) is not None
+
+
+class ArchiveWriter:
+    """Write named byte strings into a zip or tar archive as they arrive
+
+    compress_level is 0-9 (None for the format's default).  stored writes
+    zip members without compression, which is the fastest choice for PNG
+    tiles as they are already deflated.  Tar members are never compressed
+    one by one, so stored changes nothing for tar archives; a compressed
+    tar extension always gets its gzip/bzip2/xz layer.  With fileobj the
+    archive is written there instead, and path only picks the format.
+    """
+
+    def __init__(self, path, compress_level=None, stored=False, fileobj=None):
+        kind = archive_format(path)
+        if kind is None:
+            raise ValueError(f"Unsupported archive type: {path} "
+                             f"(use one of {', '.join(ARCHIVE_FORMATS)})")
+        self.path = path
+        self.kind, mode = kind
+        self.timestamp = time.time()
+        self.count = 0
+        self.bytes_written = 0
+
+        if self.kind == "zip":
+            compression = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            level = None if stored else compress_level
+            self.archive = zipfile.ZipFile(fileobj or path, "w", compression=compression,
+                                           compresslevel=level)
+        else:
+            options = {}
+            if mode in ("w:gz", "w:bz2") and compress_level is not None:
+                options["compresslevel"] = max(1, compress_level)
+            elif mode == "w:xz" and compress_level is not None:
+                options["preset"] = compress_level
+            self.archive = tarfile.open(path, mode, fileobj=fileobj, **options)
+
+    def add(self, name, data):
+        """Append one member; name uses '/' separators"""
+        if self.kind == "zip":
+            info = zipfile.ZipInfo(name, time.localtime(self.timestamp)[:6])
+            self.archive.writestr(info, data, compress_type=self.archive.compression,
+                                  compresslevel=self.archive.compresslevel)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self.timestamp
+            self.archive.addfile(info, io.BytesIO(data))
+        self.count += 1
+        self.bytes_written += len(data)
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,237 @@
+"""
+Texture atlas export for SpriteCutter
+Repacks the cells of a grid into a few large images plus a JSON index of
+frame rectangles, which loads far faster than thousands of small files.
+"""
+
+import json
+import os
+
+from PIL import Image
+
+from encoders import get_encoder
+from grid import plan_tiles
+from slicer import tile_digest
+
+
+class SkylinePacker:
+    """Bottom-left skyline bin packer for one atlas page
+
+    The skyline is a list of [x, y, width] segments describing the lowest
+    free height across the page.  Each rectangle goes where its bottom edge
+    ends up highest on the page (smallest y + height), leftmost on ties.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.skyline = [[0, 0, width]]
+        self.used_width = 0
+        self.used_height = 0
+
+    def _fit(self, index, width, height):
+        """Top y for a width x height rectangle placed at segment index, or None"""
+        x = self.skyline[index][0]
+        if x + width > self.width:
+            return None
+        y = 0
+        remaining = width
+        while remaining > 0:
+            if index >= len(self.skyline):
+                return None
+            segment = self.skyline[index]
+            y = max(y, segment[1])
+            if y + height > self.height:
+                return None
+            remaining -= segment[2]
+            index += 1
+        return y
+
+    def insert(self, width, height):
+        """Place a rectangle and return its (x, y), or None if the page is full"""
+        best = None
+        for index, segment in enumerate(self.skyline):
+            y = self._fit(index, width, height)
+            if y is not None and (best is None or (y + height, segment[0]) < best[0]):
+                best = ((y + height, segment[0]), index, segment[0], y)
+        if best is None:
+            return None
+
+        _, index, x, y = best
+        self.skyline.insert(index, [x, y + height, width])
+
+        # Trim or drop the segments now covered by the new one
+        right = x + width
+        i = index + 1
+        while i < len(self.skyline):
+            segment = self.skyline[i]
+            if segment[0] >= right:
+                break
+            overlap = right - segment[0]
+            if segment[2] <= overlap:
+                del self.skyline[i]
+                continue
+            segment[0] += overlap
+            segment[2] -= overlap
+            break
+
+        # Merge neighbours of equal height
+        i = 0
+        while i < len(self.skyline) - 1:
+            if self.skyline[i][1] == self.skyline[i + 1][1]:
+                self.skyline[i][2] += self.skyline.pop(i + 1)[2]
+            else:
+                i += 1
+
+        self.used_width = max(self.used_width, right)
+        self.used_height = max(self.used_height, y + height)
+        return x, y
+
+
+def trim_tile(tile):
+    """Return (trimmed tile, (left, top)) with transparent borders cut away
+
+    Fully transparent tiles return (None, (0, 0)).
+    """
+    bbox = tile.getchannel("A").getbbox()
+    if bbox is None:
+        return None, (0, 0)
+    if bbox == (0, 0) + tile.size:
+        return tile, (0, 0)
+    return tile.crop(bbox), bbox[:2]
+
+
+class AtlasResult:
+    """Outcome of an atlas export
+
+    saved counts the frames written to the index, including repeats that
+    share another frame's rectangle.
+    """
+
+    def __init__(self, saved, total, pages=None, index_path=None, cancelled=False,
+                 empty=0, duplicates=0):
+        self.saved = saved
+        self.total = total
+        self.pages = pages or []
+        self.index_path = index_path
+        self.cancelled = cancelled
+        self.empty = empty
+        self.duplicates = duplicates
+
+    def __repr__(self):
+        return (f"AtlasResult(saved={self.saved}, total={self.total}, "
+                f"pages={len(self.pages)}, cancelled={self.cancelled})")
+
+
+def index_path(output_dir, prefix):
+    return os.path.join(output_dir, f"{prefix}_atlas.json")
+
+
+def pack_atlas(image, spec, output_dir, prefix="sprite", naming_scheme="row_col",
+               max_size=2048, padding=1, trim=True, dedupe=True,
+               progress=None, cancel_event=None, source_path=None, encoder=None):
+    """Pack every cell of the grid into atlas pages under output_dir
+
+    Writes '<prefix>_atlas_<n>.png' pages (or the extension of encoder) and
+    '<prefix>_atlas.json'.  Frames
+    are keyed by the file name the cell would have had with naming_scheme,
+    and record the page, the packed rectangle, the offset of the trimmed
+    rectangle inside the cell and the untrimmed cell size.  Transparent
+    cells are left out; with dedupe, identical cells share one rectangle.
+
+    progress(done, total) counts cells and then pages.  Raises ValueError if
+    a single cell is larger than max_size.
+    """
+    encoder = get_encoder(encoder)
+    tiles = plan_tiles(spec, image.size, prefix, naming_scheme)
+    total = len(tiles)
+    steps = [0, total]
+
+    def advance():
+        steps[0] += 1
+        if progress:
+            progress(steps[0], steps[1])
+
+    # Crop and trim every cell, sharing repeats
+    frames = {}
+    sprites = []  # [trimmed tile, placement]; placement is filled in by packing
+    by_digest = {}
+    empty = duplicates = 0
+    for row, col, box, filename in tiles:
+        if cancel_event is not None and cancel_event.is_set():
+            return AtlasResult(0, total, cancelled=True)
+        cell = image.crop(box).convert("RGBA")
+        sprite, offset = trim_tile(cell) if trim else (cell, (0, 0))
+        advance()
+        if sprite is None:
+            empty += 1
+            continue
+        if max(sprite.width, sprite.height) + padding > max_size:
+            raise ValueError(f"Cell {filename} ({sprite.width}x{sprite.height}) "
+                             f"does not fit in a {max_size}px atlas")
+
+        digest = tile_digest(sprite) if dedupe else None
+        if digest is not None and digest in by_digest:
+            entry = by_digest[digest]
+            duplicates += 1
+        else:
+            entry = [sprite, None]
+            sprites.append(entry)
+            if digest is not None:
+                by_digest[digest] = entry
+        frames[filename] = {
+            "row": row, "col": col, "sprite": entry,
+            "offset": list(offset), "source_size": [cell.width, cell.height],
+        }
+
+    # Tallest first packs tightest with a skyline
+    pages = []
+    for entry in sorted(sprites, key=lambda e: (e[0].height, e[0].width), reverse=True):
+        width, height = entry[0].width + padding, entry[0].height + padding
+        for page_index, packer in enumerate(pages):
+            position = packer.insert(width, height)
+            if position is not None:
+                break
+        else:
+            packer = SkylinePacker(max_size, max_size)
+            pages.append(packer)
+            page_index = len(pages) - 1
+            position = packer.insert(width, height)
+        entry[1] = (page_index,) + position
+
+    steps[1] = total + len(pages)
+    os.makedirs(output_dir, exist_ok=True)
+    page_images = [Image.new("RGBA", (max(1, packer.used_width - padding),
+                                      max(1, packer.used_height - padding)))
+                   for packer in pages]
+    for sprite, (page_index, x, y) in sprites:
+        page_images[page_index].paste(sprite, (x, y))
+
+    page_paths = []
+    for page_index, page in enumerate(page_images):
+        if cancel_event is not None and cancel_event.is_set():
+            return AtlasResult(0, total, page_paths, cancelled=True)
+        path = os.path.join(output_dir, f"{prefix}_atlas_{page_index}{encoder.extension}")
+        with open(path, "wb") as f:
+            f.write(encoder.encode(page))
+        page_paths.append(path)
+        advance()
+
+    index = {
+        "source": os.path.basename(source_path) if source_path else None,
+        "grid": spec.to_dict(),
+        "pages": [{"file": os.path.basename(path), "size": list(page.size)}
+                  for path, page in zip(page_paths, page_images)],
+        "frames": {},
+    }
+    for filename, frame in frames.items():
+        sprite, (page_index, x, y) = frame.pop("sprite")
+        frame["page"] = page_index
+        frame["frame"] = [x, y, sprite.width, sprite.height]
+        index["frames"][filename] = frame
+
+    path = index_path(output_dir, prefix)
+    with open(path, "w") as f:
+        # Compact: the index is read by game loaders, not people
+        json.dump(index, f, separators=(",", ":"))
+    return AtlasResult(len(frames), total, page_paths, path, empty=empty, duplicates=duplicates)
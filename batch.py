@@ -0,0 +1,154 @@
+"""
+Batch slicing for SpriteCutter
+Streams many sprite sheets through decode, slice and encode with a bounded
+number of sheets in flight, so memory stays flat however many are queued.
+"""
+
+import glob
+import json
+import os
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor,
+                                FIRST_COMPLETED, wait)
+
+from encoders import get_encoder
+from grid import grid_for_image, plan_tiles
+from loader import open_image
+from slicer import save_tile
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff", ".tif")
+SIDECAR_SUFFIX = ".grid.json"
+
+
+def iter_inputs(patterns):
+    """Yield image paths from files, directories and glob patterns, lazily and once each"""
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = (os.path.join(pattern, name) for name in sorted(os.listdir(pattern)))
+        elif glob.has_magic(pattern):
+            candidates = sorted(glob.iglob(pattern, recursive=True))
+        else:
+            candidates = [pattern]
+
+        for path in candidates:
+            if os.path.isdir(path) or path in seen:
+                continue
+            if path != pattern and not path.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            seen.add(path)
+            yield path
+
+
+def load_sidecar(path):
+    """Per-sheet grid overrides from '<sheet>.grid.json', or an empty dict"""
+    sidecar = os.path.splitext(path)[0] + SIDECAR_SUFFIX
+    if not os.path.exists(sidecar):
+        return {}
+    with open(sidecar) as f:
+        return json.load(f)
+
+
+class SheetOutcome:
+    """Result of slicing one sheet in a batch"""
+
+    def __init__(self, path, output_dir, saved=0, error=None):
+        self.path = path
+        self.output_dir = output_dir
+        self.saved = saved
+        self.error = error
+
+
+class BatchResult:
+    """Totals for a whole batch run"""
+
+    def __init__(self):
+        self.sheets = 0
+        self.saved = 0
+        self.failures = []
+
+    def add(self, outcome):
+        if outcome.error:
+            self.failures.append(outcome)
+        else:
+            self.sheets += 1
+            self.saved += outcome.saved
+
+
+def slice_sheet(path, output_dir, template, prefix, naming_scheme, encoder=None):
+    """Decode one sheet, slice it serially and release it
+
+    Runs inside a pool worker; each worker holds at most one decoded sheet.
+    """
+    try:
+        template = dict(template, **load_sidecar(path))
+        encoder = get_encoder(encoder)
+        with open_image(path) as image:
+            spec = grid_for_image(template, image.size)
+            os.makedirs(output_dir, exist_ok=True)
+            saved = 0
+            tiles = plan_tiles(spec, image.size, prefix, naming_scheme, encoder.extension)
+            for _, _, box, filename in tiles:
+                save_tile(image, box, os.path.join(output_dir, filename), encoder)
+                saved += 1
+        return SheetOutcome(path, output_dir, saved)
+    except Exception as e:
+        return SheetOutcome(path, output_dir, error=f"{type(e).__name__}: {e}")
+
+
+def run_batch(inputs, output_dir, template=None, naming_scheme="row_col", workers=None,
+              use_processes=False, flat=False, on_sheet=None, cancel_event=None, encoder=None):
+    """Slice every image matched by inputs
+
+    Each sheet is named after its file and, unless flat is set, written to
+    its own sub-directory of output_dir.  on_sheet(outcome) is called from
+    the calling thread as each sheet finishes.  A sheet whose name is
+    already taken by an earlier one (same file name in another folder)
+    fails instead of overwriting its tiles.
+    """
+    template = template or {}
+    workers = max(1, workers or os.cpu_count() or 1)
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+
+    result = BatchResult()
+    # Only this many sheets are queued or decoding at any moment
+    max_pending = workers * 2
+    pending = set()
+    sources = iter_inputs(inputs)
+    claimed = {}  # prefix -> first sheet written under it
+
+    with executor_class(max_workers=workers) as executor:
+        exhausted = False
+        while not exhausted or pending:
+            if cancel_event is not None and cancel_event.is_set():
+                exhausted = True
+
+            while not exhausted and len(pending) < max_pending:
+                path = next(sources, None)
+                if path is None:
+                    exhausted = True
+                    break
+                prefix = os.path.splitext(os.path.basename(path))[0]
+                sheet_dir = output_dir if flat else os.path.join(output_dir, prefix)
+                if prefix in claimed:
+                    # Same file name from another folder: its tiles would
+                    # overwrite the first sheet's
+                    outcome = SheetOutcome(path, sheet_dir, error=(
+                        f"output name '{prefix}' is already used by {claimed[prefix]}"))
+                    result.add(outcome)
+                    if on_sheet:
+                        on_sheet(outcome)
+                    continue
+                claimed[prefix] = path
+                pending.add(executor.submit(slice_sheet, path, sheet_dir, template,
+                                            prefix, naming_scheme, encoder))
+
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                result.add(outcome)
+                if on_sheet:
+                    on_sheet(outcome)
+
+    return result
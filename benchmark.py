@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for SpriteCutter
+Times the paths the app relies on (loading, preview resampling, grid
+overlay redraws and slicing exports) on synthetic sheets and writes the
+results as JSON so runs from different commits can be compared.
+
+    python benchmark.py -o before.json
+    python benchmark.py --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import PIL
+
+from create_sample import create_sample_sprite_sheet
+from grid import GridSpec
+from loader import open_image
+from overlay import HANDLE_SIZE, GridOverlay
+from preview import PreviewPyramid
+from slicer import slice_image
+
+# name -> (width, height, rows, cols); "large" cases only run when asked for
+CASES = {
+    "1k-4": (1024, 1024, 2, 2),
+    "1k-1024": (1024, 1024, 32, 32),
+    "4k-4096": (4096, 4096, 64, 64),
+    "16k-65536": (16384, 16384, 256, 256),
+}
+DEFAULT_CASES = ("1k-4", "1k-1024", "4k-4096")
+
+# Canvas size used for fit-to-window previews, like the app's default window
+VIEWPORT = (800, 600)
+
+
+class RecordingCanvas:
+    """Stand-in for a Tk canvas that counts item operations
+
+    Used when no display is available, so overlay and tile benchmarks
+    measure SpriteCutter's own work and how many Tk calls it would make.
+    """
+
+    def __init__(self, width=VIEWPORT[0], height=VIEWPORT[1]):
+        self.width = width
+        self.height = height
+        self.next_id = 0
+        self.calls = 0
+
+    def _item(self, *args, **kwargs):
+        self.calls += 1
+        self.next_id += 1
+        return self.next_id
+
+    create_line = create_rectangle = create_image = _item
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+
+    coords = move = delete = configure = tag_lower = _call
+
+    def canvasx(self, x):
+        return x
+
+    def canvasy(self, y):
+        return y
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+
+def measure(func, repeat):
+    """Run func repeat times; return (min seconds, median seconds, last result)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings), result
+
+
+def sheet_for_case(name, workdir):
+    """Path of the synthetic sheet for a case, generating it once"""
+    width, height, rows, cols = CASES[name]
+    path = os.path.join(workdir, f"sheet_{width}x{height}_{rows}x{cols}.png")
+    if not os.path.exists(path):
+        create_sample_sprite_sheet(width, height, rows, cols, path,
+                                   numbered=rows * cols <= 4096, verbose=False)
+    return path
+
+
+def bench_load(path, repeat):
+    def run():
+        with open_image(path) as image:
+            image.load()
+            return image.size
+    best, median, _ = measure(run, repeat)
+    return {"seconds": best, "median": median}
+
+
+def bench_preview(image, repeat):
+    """Fit-to-window render, as display_image_on_canvas does on load"""
+    scale = min(VIEWPORT[0] / image.width, VIEWPORT[1] / image.height, 1.0)
+    best, median, _ = measure(lambda: PreviewPyramid(image).render(scale), repeat)
+    return {"seconds": best, "median": median, "scale": round(scale, 4)}
+
+
+def bench_tiles(image, repeat):
+    """Render every viewport tile at 1:1 and at fit scale from a fresh pyramid"""
+    try:
+        from tiles import TiledView
+    except ImportError:
+        return None
+    scale = min(VIEWPORT[0] / image.width, VIEWPORT[1] / image.height, 1.0)
+
+    def run():
+        count = 0
+        for zoom in (scale, 1.0):
+            view = TiledView(RecordingCanvas(), PreviewPyramid(image))
+            view.set_scale(zoom)
+            for tx, ty in view.visible_tiles():
+                view.render_tile(tx, ty)
+                count += 1
+        return count
+
+    best, median, count = measure(run, repeat)
+    return {"seconds": best, "median": median, "tiles": count}
+
+
+def redraw_grid(canvas, x1, y1, x2, y2, rows, cols):
+    """The original draw_grid: delete every grid item and create them all again
+
+    Kept as the reference GridOverlay is measured against.
+    """
+    canvas.delete("grid")
+    canvas.create_rectangle(x1, y1, x2, y2, outline="red", width=2, tags="grid")
+    for i in range(1, cols):
+        x = x1 + i * (x2 - x1) / cols
+        canvas.create_line(x, y1, x, y2, fill="red", width=1, tags="grid")
+    for i in range(1, rows):
+        y = y1 + i * (y2 - y1) / rows
+        canvas.create_line(x1, y, x2, y, fill="red", width=1, tags="grid")
+    half = HANDLE_SIZE // 2
+    for hx, hy in ((x1, y1), (x2, y1), (x1, y2), (x2, y2), ((x1 + x2) // 2, y1),
+                   ((x1 + x2) // 2, y2), (x1, (y1 + y2) // 2), (x2, (y1 + y2) // 2)):
+        canvas.create_rectangle(hx - half, hy - half, hx + half, hy + half,
+                                fill="red", outline="darkred", width=1, tags="grid")
+
+
+def drag_grid(draw, steps):
+    """Call draw(x1, y1, x2, y2) like draw_grid is called during a mouse drag"""
+    x1, y1, x2, y2 = 10, 10, 610, 460
+    draw(x1, y1, x2, y2)
+    for step in range(steps):
+        # Alternate moves and resizes
+        if step % 2:
+            draw(x1 + step, y1 + step, x2 + step, y2 + step)
+        else:
+            draw(x1, y1, x2 + step, y2 + step)
+
+
+def bench_overlay(rows, cols, repeat, steps=200, baseline=False):
+    """Drag the grid around and resize it with GridOverlay, or with redraw_grid as baseline"""
+    def run():
+        canvas = RecordingCanvas()
+        if baseline:
+            drag_grid(lambda *box: redraw_grid(canvas, *box, rows, cols), steps)
+        else:
+            overlay = GridOverlay(canvas)
+            drag_grid(lambda *box: overlay.update(*box, rows, cols), steps)
+        return canvas.calls
+
+    best, median, calls = measure(run, repeat)
+    return {"seconds": best, "median": median, "updates": steps,
+            "canvas_calls": calls, "calls_per_update": round(calls / steps, 1)}
+
+
+def bench_export(path, spec, repeat, encoder, workers):
+    """Crop and encode every cell into a scratch directory"""
+    size = os.path.getsize(path)
+    output_dir = tempfile.mkdtemp(prefix="spritecutter-bench-")
+    try:
+        def run():
+            shutil.rmtree(output_dir, ignore_errors=True)
+            return slice_image(path, spec, output_dir, encoder=encoder, workers=workers)
+        best, median, result = measure(run, repeat)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return {"seconds": best, "median": median, "encoder": encoder, "tiles": result.saved,
+            "tiles_per_second": round(result.saved / best, 1),
+            "bytes_written": result.bytes_written, "source_bytes": size}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(cases, workdir, repeat=3, encoders=("png",), workers=None, log=print):
+    """Run every benchmark for every case and return the report dict"""
+    results = []
+
+    def record(case, name, values):
+        if values is None:
+            return
+        entry = {"case": case, "benchmark": name, **values}
+        results.append(entry)
+        log(f"{case:>10} {name:<16} {values['seconds'] * 1000:10.1f} ms")
+
+    for case in cases:
+        width, height, rows, cols = CASES[case]
+        path = sheet_for_case(case, workdir)
+        spec = GridSpec.from_region(0, 0, width, height, rows, cols)
+
+        record(case, "load", bench_load(path, repeat))
+        with open_image(path) as image:
+            image.load()
+            record(case, "preview", bench_preview(image, repeat))
+            record(case, "tiles", bench_tiles(image, repeat))
+        redraw = bench_overlay(rows, cols, repeat, baseline=True)
+        overlay = bench_overlay(rows, cols, repeat)
+        if overlay["seconds"]:
+            overlay["speedup"] = round(redraw["seconds"] / overlay["seconds"], 1)
+        record(case, "overlay-redraw", redraw)
+        record(case, "overlay", overlay)
+        for encoder in encoders:
+            record(case, f"export-{encoder}", bench_export(path, spec, repeat, encoder, workers))
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": workers or os.cpu_count(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=0.1):
+    """Print each benchmark against a baseline report; return the regressions"""
+    previous = {(r["case"], r["benchmark"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'case':>10} {'benchmark':<16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for result in report["results"]:
+        key = (result["case"], result["benchmark"])
+        if key not in previous:
+            continue
+        before, after = previous[key]["seconds"], result["seconds"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  slower"
+            regressions.append(key)
+        print(f"{key[0]:>10} {key[1]:<16} {before * 1000:8.1f}ms {after * 1000:8.1f}ms "
+              f"{change:+7.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SpriteCutter's hot paths.")
+    parser.add_argument("--cases", default=",".join(DEFAULT_CASES),
+                        help=f"comma separated cases from {', '.join(CASES)} "
+                             f"(default: {','.join(DEFAULT_CASES)})")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per benchmark; the fastest is reported (default: 3)")
+    parser.add_argument("--encoders", default="png",
+                        help="comma separated export presets to time (default: png)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="export workers (default: one per core)")
+    parser.add_argument("--workdir", help="where to keep generated sheets between runs "
+                                          "(default: a temporary directory)")
+    parser.add_argument("-o", "--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare against an earlier JSON report")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown that counts as a regression with --compare (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    cases = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="spritecutter-sheets-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        report = run_benchmarks(cases, workdir, args.repeat,
+                                [e.strip() for e in args.encoders.split(",")],
+                                args.workers, log=lambda line: print(line, file=sys.stderr))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Incremental export cache for SpriteCutter
+Remembers every encoded tile by the source file's content hash, its crop
+box and the encoder settings, so re-exports only encode cells that changed
+and copy the rest into place.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+
+# Bytes of cached tiles kept before the least recently used are deleted
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "spritecutter")
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """BLAKE2b hex digest of a file's contents"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def data_digest(data):
+    """BLAKE2b hex digest of a byte string, as file_digest gives for a file"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class ExportCache:
+    """Content-addressed store of encoded tiles under a cache directory
+
+    Tiles live in objects/<key[:2]>/<key><extension>, next to a
+    <key>.digest file holding the hash of the tile's bytes, which every
+    lookup checks.  Tiles are always copied in and out, never hard-linked,
+    so writing to an exported file cannot change the cache.  Source
+    hashes are remembered per (path, size, mtime) in sources.json, so an
+    unchanged source is not hashed again.
+
+    Tiles past max_bytes (None for no limit) are deleted least recently
+    used first by trim(), which the slicer calls after every cached run;
+    a hit marks a tile as used by touching its modification time.
+    """
+
+    SOURCES_FILE = "sources.json"
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or default_cache_dir()
+        self.objects = os.path.join(self.root, "objects")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sources = None
+        self._usage = None  # bytes of tiles at the last prune() plus those added since
+
+    def _load_sources(self):
+        if self._sources is None:
+            try:
+                with open(os.path.join(self.root, self.SOURCES_FILE)) as f:
+                    self._sources = json.load(f)
+            except (OSError, ValueError):
+                self._sources = {}
+        return self._sources
+
+    def source_digest(self, path):
+        """Content hash of a source image, reusing the last one if it is unchanged"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        sources = self._load_sources()
+        entry = sources.get(path)
+        if entry and entry["stamp"] == stamp:
+            return entry["digest"]
+
+        digest = file_digest(path)
+        sources[path] = {"stamp": stamp, "digest": digest}
+        os.makedirs(self.root, exist_ok=True)
+        self._write_atomic(os.path.join(self.root, self.SOURCES_FILE),
+                           json.dumps(sources).encode())
+        return digest
+
+    def key(self, source_digest, box, encoder, frame=0):
+        """Cache key of one cell: source contents, frame, crop box and encoder settings"""
+        description = json.dumps([source_digest, frame, list(box), encoder.settings()])
+        return hashlib.blake2b(description.encode(), digest_size=20).hexdigest()
+
+    def blob_path(self, key, extension):
+        return os.path.join(self.objects, key[:2], key + extension)
+
+    def digest_path(self, key):
+        return os.path.join(self.objects, key[:2], key + ".digest")
+
+    def lookup(self, key, extension):
+        """Bytes of the cached tile for key, or None
+
+        A tile whose bytes no longer match the digest stored with it is
+        dropped and counts as a miss.
+        """
+        blob = self.blob_path(key, extension)
+        try:
+            with open(blob, "rb") as f:
+                data = f.read()
+            with open(self.digest_path(key)) as f:
+                expected = f.read().strip()
+        except OSError:
+            self.misses += 1
+            return None
+        if data_digest(data) != expected:
+            for path in (blob, self.digest_path(key)):
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+            self.misses += 1
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(blob)
+        self.hits += 1
+        return data
+
+    def store(self, key, extension, path):
+        """Add a copy of a freshly written tile to the cache"""
+        if os.path.exists(self.blob_path(key, extension)):
+            return
+        with open(path, "rb") as f:
+            self.store_bytes(key, extension, f.read())
+
+    def store_bytes(self, key, extension, data):
+        """Add an encoded tile, e.g. one that was never written to a file (archive output)"""
+        blob = self.blob_path(key, extension)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            self._write_atomic(blob, data)
+            # Written last, so a blob without its digest is never trusted
+            self._write_atomic(self.digest_path(key), data_digest(data).encode())
+            if self._usage is not None:
+                self._usage += len(data)
+
+    def _write_atomic(self, path, data):
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(handle, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+    def clear(self):
+        """Delete every cached tile and source hash"""
+        shutil.rmtree(self.root, ignore_errors=True)
+        self._sources = None
+        self._usage = 0
+
+    def prune(self, max_bytes=None):
+        """Delete the least recently used tiles until at most max_bytes are cached
+
+        max_bytes defaults to the cache's own limit.  Returns the number of
+        tiles deleted.
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        tiles = []
+        total = 0
+        for directory, _, files in os.walk(self.objects):
+            for name in files:
+                if name.endswith((".digest", ".tmp")):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                tiles.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        if limit is not None:
+            for _, size, path in sorted(tiles):
+                if total <= limit:
+                    break
+                key = os.path.basename(path).split(".")[0]
+                for victim in (path, self.digest_path(key)):
+                    with contextlib.suppress(OSError):
+                        os.remove(victim)
+                total -= size
+                removed += 1
+        self.evictions += removed
+        self._usage = total
+        return removed
+
+    def trim(self):
+        """prune() when tiles added since the last look may have passed max_bytes
+
+        The cache directory is only walked the first time and whenever the
+        running total goes over the limit.
+        """
+        if self.max_bytes is None or (self._usage is not None and self._usage <= self.max_bytes):
+            return 0
+        return self.prune()
+
+    def size(self):
+        """Total bytes of cached tiles"""
+        total = 0
+        for directory, _, files in os.walk(self.objects):
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        return total
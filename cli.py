@@ -0,0 +1,524 @@
+"""
+Command line interface for SpriteCutter
+Slices sprite sheets without opening a window, e.g.
+
+    python spritecutter.py slice sheet.png --rows 3 --cols 4 --cell 100x100 -o out/
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from PIL import ImageColor
+
+from batch import SIDECAR_SUFFIX, run_batch
+from cache import DEFAULT_MAX_BYTES, ExportCache
+from encoders import DEFAULT_PRESET, PRESETS
+from frames import ANIMATION_FORMATS, slice_frames
+from grid import NAMING_SCHEMES, grid_for_image, naming_example
+from loader import open_image
+from profiling import format_summary
+from regions import RegionLayout
+from slicer import slice_image
+from watch import DEFAULT_DEBOUNCE, DEFAULT_INTERVAL, SheetWatcher
+
+
+def parse_pair(text, separator):
+    """Parse 'AxB' or 'A,B' into a pair of ints"""
+    parts = text.lower().split(separator)
+    if len(parts) != 2:
+        raise argparse.ArgumentTypeError(f"expected two numbers separated by '{separator}', got '{text}'")
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected two numbers separated by '{separator}', got '{text}'")
+
+
+def parse_size(text):
+    return parse_pair(text, "x")
+
+
+def parse_offset(text):
+    return parse_pair(text, ",")
+
+
+def add_grid_arguments(parser, required=True):
+    """Grid options shared by every slicing command"""
+    parser.add_argument("--rows", type=int, required=required, help="number of grid rows")
+    parser.add_argument("--cols", type=int, required=required, help="number of grid columns")
+    parser.add_argument("--cell", type=parse_size, metavar="WxH",
+                        help="cell size in pixels (default: split the image evenly)")
+    parser.add_argument("--offset", type=parse_offset, default=(0, 0), metavar="X,Y",
+                        help="top-left corner of the grid (default: 0,0)")
+    parser.add_argument("--gutter", type=int, default=0, metavar="PX",
+                        help="spacing between neighbouring cells (default: 0)")
+    parser.add_argument("--cell-padding", type=int, default=0, metavar="PX",
+                        help="pixels cut from every edge of each cell (default: 0)")
+
+
+def add_output_arguments(parser):
+    """Naming and worker options shared by every slicing command"""
+    parser.add_argument("--prefix", help="filename prefix (default: input file name)")
+    parser.add_argument("--naming", choices=NAMING_SCHEMES, default="row_col",
+                        help="file naming scheme (default: row_col)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of parallel workers (default: one per core)")
+    parser.add_argument("--processes", action="store_true",
+                        help="use a process pool instead of threads")
+    add_encoder_argument(parser)
+
+
+def add_encoder_argument(parser):
+    presets = ", ".join(f"{name}: {encoder.description}" for name, encoder in PRESETS.items())
+    parser.add_argument("--encoder", choices=PRESETS, default=DEFAULT_PRESET,
+                        help=f"output format preset (default: {DEFAULT_PRESET}); {presets}")
+
+
+def parse_color(text):
+    try:
+        return ImageColor.getrgb(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"unknown colour '{text}'")
+
+
+def add_dedupe_arguments(parser):
+    """Empty and duplicate tile elimination options"""
+    parser.add_argument("--skip-empty", action="store_true",
+                        help="do not write fully transparent (or background-only) tiles")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="write pixel-identical tiles once")
+    parser.add_argument("--background", type=parse_color, metavar="COLOR",
+                        help="with --skip-empty, also treat tiles of this flat colour as empty")
+    parser.add_argument("--manifest", action="store_true",
+                        help="write '<prefix>_manifest.json' mapping every cell to its file "
+                             "(implied by --skip-empty and --dedupe)")
+
+
+def add_sprite_arguments(parser):
+    """Options for cutting irregularly packed sheets without a grid"""
+    parser.add_argument("--sprites", action="store_true",
+                        help="cut every connected sprite on its own instead of a grid")
+    parser.add_argument("--merge", type=int, default=0, metavar="PX",
+                        help="with --sprites, join parts at most this many pixels apart (default: 0)")
+    parser.add_argument("--min-size", type=int, default=1, metavar="PX",
+                        help="with --sprites, drop sprites narrower or shorter than this (default: 1)")
+    parser.add_argument("--tolerance", type=int, default=16,
+                        help="with --sprites, colour difference from the background that counts "
+                             "as a sprite on opaque sheets (default: 16)")
+
+
+def add_frame_arguments(parser):
+    """Options for animated GIF/APNG and multi-page TIFF input"""
+    parser.add_argument("--frames", choices=("tiles", "animate"),
+                        help="slice every frame instead of only the first: 'tiles' writes "
+                             "one image per frame and cell, 'animate' one animation per cell")
+    parser.add_argument("--animation-format", choices=ANIMATION_FORMATS, default="apng",
+                        help="file format of per-cell animations (default: apng)")
+
+
+def add_atlas_arguments(parser):
+    """Texture atlas output options"""
+    parser.add_argument("--atlas", action="store_true",
+                        help="pack the cells into atlas pages with a JSON index "
+                             "instead of writing one file per cell")
+    parser.add_argument("--atlas-size", type=int, default=2048, metavar="PX",
+                        help="largest atlas page edge (default: 2048)")
+    parser.add_argument("--padding", type=int, default=1,
+                        help="transparent pixels between packed frames (default: 1)")
+    parser.add_argument("--no-trim", dest="trim", action="store_false",
+                        help="keep transparent borders around frames")
+
+
+def add_tensor_arguments(parser):
+    """Tile tensor output options"""
+    parser.add_argument("--tensor", action="store_true",
+                        help="write every cell into one memory-mappable .npy array with a "
+                             "JSON index instead of one file per cell")
+    parser.add_argument("--tensor-mode", choices=("RGBA", "RGB", "LA", "L"), default="RGBA",
+                        help="pixel layout of the tensor (default: RGBA)")
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--cache", nargs="?", const="", metavar="DIR",
+                        help="reuse tiles encoded by earlier runs from the export cache "
+                             "(default location: ~/.cache/spritecutter)")
+    parser.add_argument("--cache-limit", type=int, default=DEFAULT_MAX_BYTES >> 20, metavar="MB",
+                        help="with --cache, delete the least recently used tiles past this size "
+                             f"(default: {DEFAULT_MAX_BYTES >> 20})")
+
+
+def add_profiling_arguments(parser):
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write per-tile stage timings as a JSON trace "
+                             "(opens in chrome://tracing or Perfetto)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write a cProfile dump of the export; tiles are then "
+                             "processed one at a time")
+
+
+def add_archive_arguments(parser):
+    """Compression options for archive output"""
+    parser.add_argument("--compress-level", type=int, choices=range(10), metavar="0-9",
+                        help="compression level when writing to an archive")
+    parser.add_argument("--store", action="store_true",
+                        help="add tiles to zip archives uncompressed (PNGs already are); "
+                             "tar archives keep the compression their extension names")
+
+
+def grid_template_from_args(args):
+    """Partial grid spec dict from parsed --rows/--cols/--cell/--offset"""
+    template = {}
+    if args.rows is not None:
+        template["rows"] = args.rows
+    if args.cols is not None:
+        template["cols"] = args.cols
+    template["x"], template["y"] = args.offset
+    if args.cell:
+        template["cell_width"], template["cell_height"] = args.cell
+    if args.gutter:
+        template["gutter"] = args.gutter
+    if args.cell_padding:
+        template["padding"] = args.cell_padding
+    return template
+
+
+def grid_from_args(args, image_size):
+    """Build a GridSpec from parsed --rows/--cols/--cell/--offset"""
+    return grid_for_image(grid_template_from_args(args), image_size)
+
+
+def cache_from_args(args):
+    if args.cache is None:
+        return None
+    return ExportCache(args.cache or None, args.cache_limit << 20)
+
+
+def default_prefix(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+# Options of the slice command that only some kinds of output use
+FRAME_IGNORES = ("atlas", "tensor", "dedupe", "background", "manifest", "cache", "trace",
+                 "profile", "processes")
+ANIMATION_IGNORES = ("skip_empty", "encoder")
+TENSOR_IGNORES = ("atlas", "skip_empty", "dedupe", "background", "manifest", "encoder",
+                  "compress_level", "store", "cache", "trace", "profile", "processes", "workers")
+ATLAS_IGNORES = ("skip_empty", "background", "manifest", "compress_level", "store", "cache",
+                 "trace", "profile", "processes", "workers")
+
+# option -> (option it needs, value that option needs), None for any true value
+SLICE_REQUIRES = {
+    "background": ("skip_empty", None),
+    "atlas_size": ("atlas", None),
+    "padding": ("atlas", None),
+    "trim": ("atlas", None),
+    "tensor_mode": ("tensor", None),
+    "animation_format": ("frames", "animate"),
+    "merge": ("sprites", None),
+    "min_size": ("sprites", None),
+    "tolerance": ("sprites", None),
+}
+
+
+def option_flag(dest):
+    return "--no-trim" if dest == "trim" else "--" + dest.replace("_", "-")
+
+
+def check_slice_args(parser, args):
+    """Reject slice options that the chosen kind of output would silently ignore"""
+    def given(dest):
+        return getattr(args, dest) != parser.get_default(dest)
+
+    if args.frames:
+        mode, ignored = f"--frames {args.frames}", FRAME_IGNORES
+        if args.frames == "animate":
+            ignored += ANIMATION_IGNORES
+    elif args.tensor:
+        mode, ignored = "--tensor", TENSOR_IGNORES
+    elif args.atlas:
+        mode, ignored = "--atlas", ATLAS_IGNORES
+    else:
+        mode, ignored = None, ()
+    for dest in ignored:
+        if given(dest):
+            parser.error(f"{option_flag(dest)} cannot be combined with {mode}")
+
+    for dest, (needed, value) in SLICE_REQUIRES.items():
+        if given(dest) and not (getattr(args, needed) == value if value else getattr(args, needed)):
+            needs = option_flag(needed) + (f" {value}" if value else "")
+            parser.error(f"{option_flag(dest)} only applies with {needs}")
+
+    if args.regions and args.sprites:
+        parser.error("--regions cannot be combined with --sprites")
+    if not (args.regions or args.sprites) and (args.rows is None or args.cols is None):
+        parser.error("--rows and --cols are required unless --regions or --sprites is given")
+
+
+def run_slice(args):
+    if args.regions:
+        spec = RegionLayout.load(args.regions)
+    elif args.sprites:
+        # NumPy is only needed for sprite extraction
+        from components import SpriteLayout, find_sprites
+        with open_image(args.input) as image:
+            spec = SpriteLayout(find_sprites(image, tolerance=args.tolerance, merge=args.merge,
+                                             min_size=args.min_size))
+    else:
+        with open_image(args.input) as image:
+            spec = grid_from_args(args, image.size)
+    prefix = args.prefix or default_prefix(args.input)
+
+    if args.frames:
+        result = slice_frames(args.input, spec, args.output, prefix=prefix,
+                              naming_scheme=args.naming, animate=args.frames == "animate",
+                              animation_format=args.animation_format, workers=args.workers,
+                              skip_empty=args.skip_empty, encoder=args.encoder,
+                              compress_level=args.compress_level, stored=args.store)
+        kind = f"{args.animation_format} animations" if args.frames == "animate" else "images"
+        print(f"Saved {result.saved} {kind} to {args.output} in {result.elapsed:.2f}s")
+        return 0
+
+    if args.tensor:
+        # NumPy is only needed for tensor export
+        from tensor import export_tensor
+        with open_image(args.input) as image:
+            result = export_tensor(image, spec, args.output, prefix=prefix,
+                                   naming_scheme=args.naming, mode=args.tensor_mode,
+                                   source_path=args.input)
+        print(f"Wrote {result.saved} tiles to {result.path}, index in {result.index_path}")
+        return 0
+
+    if args.atlas:
+        from atlas import pack_atlas
+        with open_image(args.input) as image:
+            result = pack_atlas(image, spec, args.output, prefix=prefix,
+                                naming_scheme=args.naming, max_size=args.atlas_size,
+                                padding=args.padding, trim=args.trim, dedupe=args.dedupe,
+                                source_path=args.input, encoder=args.encoder)
+        print(f"Packed {result.saved} frames into {len(result.pages)} atlas pages, "
+              f"index in {result.index_path}")
+        return 0
+
+    result = slice_image(args.input, spec, args.output, prefix=prefix,
+                         naming_scheme=args.naming, workers=args.workers,
+                         use_processes=args.processes, skip_empty=args.skip_empty,
+                         dedupe=args.dedupe, background=args.background,
+                         manifest=args.manifest or args.skip_empty or args.dedupe,
+                         compress_level=args.compress_level, stored=args.store,
+                         encoder=args.encoder, cache=cache_from_args(args),
+                         trace=args.trace, profile=args.profile)
+    extension = PRESETS[args.encoder].extension
+    if args.regions:
+        example = ", ".join(f"{prefix}_{name}_*{extension}" for name, _ in spec)
+    else:
+        example = naming_example(prefix, args.naming, spec.total, extension)
+    print(f"Saved {result.saved} images to {args.output} ({example})")
+    print(f"Encoder {result.encoder}: {format_summary(result)}".replace("\n", "\n  "))
+    if args.cache is not None:
+        print(f"Reused {result.cached} of {result.saved} images from the cache")
+    if result.empty or result.duplicates:
+        print(f"Skipped {result.empty} empty and {result.duplicates} duplicate tiles")
+    return 0
+
+
+def run_batch_command(args):
+    template = grid_template_from_args(args)
+
+    def report(outcome):
+        if outcome.error:
+            print(f"FAILED {outcome.path}: {outcome.error}", file=sys.stderr)
+        elif args.verbose:
+            print(f"{outcome.path}: {outcome.saved} images -> {outcome.output_dir}")
+
+    result = run_batch(args.inputs, args.output, template=template,
+                       naming_scheme=args.naming, workers=args.workers,
+                       use_processes=args.processes, flat=args.flat,
+                       on_sheet=report, encoder=args.encoder)
+    print(f"Sliced {result.sheets} sheets into {result.saved} images in {args.output}"
+          + (f", {len(result.failures)} failed" if result.failures else ""))
+    return 1 if result.failures else 0
+
+
+def run_watch(args):
+    spec = None
+    if args.regions:
+        spec = RegionLayout.load(args.regions)
+    elif os.path.isfile(args.source) and args.rows is not None and args.cols is not None:
+        with open_image(args.source) as image:
+            spec = grid_from_args(args, image.size)
+
+    def report(update):
+        if update.error:
+            print(f"FAILED {update.path}: {update.error}", file=sys.stderr)
+        else:
+            print(f"{update.path}: wrote {update.saved} of {update.total} images "
+                  f"to {update.output_dir} in {update.elapsed:.2f}s"
+                  + (f", removed {update.removed}" if update.removed else ""))
+
+    watcher = SheetWatcher(args.source, args.output, spec=spec,
+                           template=grid_template_from_args(args), prefix=args.prefix,
+                           naming_scheme=args.naming, encoder=args.encoder,
+                           workers=args.workers, interval=args.interval,
+                           debounce=args.debounce, on_update=report)
+    print(f"Watching {args.source}, press Ctrl+C to stop")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_serve(args):
+    # The service pulls in http.server only when it is used
+    from service import serve
+
+    def ready(server):
+        where = args.socket or "http://{}:{}".format(*server.server_address[:2])
+        print(f"Serving slice jobs on {where} with a {args.cache_size} MB image cache, "
+              "press Ctrl+C to stop")
+
+    try:
+        serve(args.host, args.port, args.socket, args.cache_size << 20, args.workers,
+              args.verbose, on_ready=ready, allow_remote=args.allow_remote)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_detect(args):
+    # NumPy is only needed for detection
+    from detect import detect_grid
+
+    with open_image(args.input) as image:
+        spec = detect_grid(image, tolerance=args.tolerance)
+    text = json.dumps(spec.to_dict(), indent=2)
+    if args.sidecar:
+        path = os.path.splitext(args.input)[0] + SIDECAR_SUFFIX
+        with open(path, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {path}")
+    else:
+        print(text)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="spritecutter",
+                                     description="Slice images into grids of sprites.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    slice_parser = commands.add_parser("slice", help="slice one image with a uniform grid "
+                                                     "or several grid regions")
+    slice_parser.add_argument("input", help="source image")
+    slice_parser.add_argument("-o", "--output", default=".",
+                              help="output directory, or a .zip/.tar/.tar.gz file to stream "
+                                   "the tiles into (default: current directory)")
+    add_grid_arguments(slice_parser, required=False)
+    slice_parser.add_argument("--regions", metavar="FILE",
+                              help="JSON file of named grid regions to export together, "
+                                   "instead of --rows/--cols")
+    add_sprite_arguments(slice_parser)
+    add_frame_arguments(slice_parser)
+    add_output_arguments(slice_parser)
+    add_dedupe_arguments(slice_parser)
+    add_atlas_arguments(slice_parser)
+    add_tensor_arguments(slice_parser)
+    add_archive_arguments(slice_parser)
+    add_cache_arguments(slice_parser)
+    add_profiling_arguments(slice_parser)
+    slice_parser.set_defaults(handler=run_slice,
+                              check=lambda args: check_slice_args(slice_parser, args))
+
+    batch_parser = commands.add_parser(
+        "batch", help="slice many images, directories or glob patterns in one run",
+        description="Slice every matching image. A '<sheet>.grid.json' file next to a "
+                    "sheet overrides the grid given on the command line for that sheet.")
+    batch_parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    batch_parser.add_argument("-o", "--output", default=".", help="output directory (default: current)")
+    batch_parser.add_argument("--flat", action="store_true",
+                              help="write every sheet's images into the output directory "
+                                   "instead of one sub-directory per sheet")
+    batch_parser.add_argument("-v", "--verbose", action="store_true", help="report every sheet")
+    add_grid_arguments(batch_parser, required=False)
+    batch_parser.add_argument("--naming", choices=NAMING_SCHEMES, default="row_col",
+                              help="file naming scheme (default: row_col)")
+    batch_parser.add_argument("--workers", type=int, default=None,
+                              help="number of sheets processed at once (default: one per core)")
+    batch_parser.add_argument("--processes", action="store_true",
+                              help="use a process pool instead of threads")
+    add_encoder_argument(batch_parser)
+    batch_parser.set_defaults(handler=run_batch_command)
+
+    watch_parser = commands.add_parser(
+        "watch", help="slice a sheet, or every sheet in a directory, again whenever it changes",
+        description="Keep the tiles of a sheet up to date while it is edited. Only cells "
+                    "whose pixels changed are written again.")
+    watch_parser.add_argument("source", help="source image or directory of images")
+    watch_parser.add_argument("-o", "--output", default=".",
+                              help="output directory; sheets in a watched directory get "
+                                   "one sub-directory each (default: current)")
+    add_grid_arguments(watch_parser, required=False)
+    watch_parser.add_argument("--regions", metavar="FILE",
+                              help="JSON file of named grid regions, instead of --rows/--cols")
+    watch_parser.add_argument("--prefix", help="filename prefix (default: input file name)")
+    watch_parser.add_argument("--naming", choices=NAMING_SCHEMES, default="row_col",
+                              help="file naming scheme (default: row_col)")
+    watch_parser.add_argument("--workers", type=int, default=None,
+                              help="number of parallel workers (default: one per core)")
+    watch_parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, metavar="SECONDS",
+                              help=f"time between checks for changes (default: {DEFAULT_INTERVAL})")
+    watch_parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE, metavar="SECONDS",
+                              help="time a sheet must stay unchanged before it is sliced "
+                                   f"(default: {DEFAULT_DEBOUNCE})")
+    add_encoder_argument(watch_parser)
+    watch_parser.set_defaults(handler=run_watch)
+
+    serve_parser = commands.add_parser(
+        "serve", help="run a local slicing service that keeps decoded sheets in memory",
+        description="Accept slice jobs as JSON on POST /slice and report cache statistics "
+                    "on GET /stats. Sheets stay decoded between jobs until the cache is full.")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on "
+                                                                  "(default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8765, help="port to listen on "
+                                                                     "(default: 8765)")
+    serve_parser.add_argument("--allow-remote", action="store_true",
+                              help="allow --host to be an address other hosts can reach; "
+                                   "jobs can read and write any of your files, unauthenticated")
+    serve_parser.add_argument("--socket", metavar="PATH",
+                              help="listen on a Unix socket, readable by you only, instead of "
+                                   "a TCP port")
+    serve_parser.add_argument("--cache-size", type=int, default=1024, metavar="MB",
+                              help="memory for decoded sheets (default: 1024)")
+    serve_parser.add_argument("--workers", type=int, default=None,
+                              help="number of workers shared by all jobs (default: one per core)")
+    serve_parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    serve_parser.set_defaults(handler=run_serve)
+
+    detect_parser = commands.add_parser("detect", help="detect the grid of a sprite sheet")
+    detect_parser.add_argument("input", help="source image")
+    detect_parser.add_argument("--tolerance", type=int, default=16,
+                               help="colour difference from the background that counts "
+                                    "as content on opaque sheets (default: 16)")
+    detect_parser.add_argument("--sidecar", action="store_true",
+                               help=f"write the grid to '<sheet>{SIDECAR_SUFFIX}' for batch mode")
+    detect_parser.set_defaults(handler=run_detect)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "check", None):
+        args.check(args)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"spritecutter: error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
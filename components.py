@@ -0,0 +1,176 @@
+"""
+Sprite extraction for SpriteCutter
+Finds the sprites of irregularly packed sheets as connected regions of
+foreground pixels, for sheets that have no grid at all.  Runs of
+foreground pixels are found per row and joined with a vectorised
+union-find, so the work grows with the number of runs, not pixels.
+"""
+
+import numpy as np
+
+from detect import _as_pil, foreground_levels
+from grid import tile_filename
+
+
+def find_runs(mask):
+    """Return (rows, starts, ends) of every horizontal run of True pixels
+
+    Runs are in row-major order; ends are exclusive.
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    steps = np.diff(padded.ravel())
+    # Row padding keeps runs from wrapping onto the next row
+    starts = np.flatnonzero(steps == 1) + 1
+    ends = np.flatnonzero(steps == -1) + 1
+    rows = starts // (width + 2)
+    return rows, starts - rows * (width + 2) - 1, ends - rows * (width + 2) - 1
+
+
+def touching_runs(rows, starts, ends, width):
+    """Index pairs (a, b) of runs on neighbouring rows that touch, diagonals included"""
+    stride = width + 2
+    start_keys = rows * stride + starts
+    end_keys = rows * stride + ends
+    # Runs of the previous row that end at or after this run's start - 1
+    # and start at or before its end form one contiguous slice
+    above = (rows - 1) * stride
+    first = np.searchsorted(end_keys, above + starts, side="left")
+    last = np.searchsorted(start_keys, above + ends, side="right")
+    counts = np.maximum(last - first, 0)
+    b = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    a = np.repeat(first, counts) + offsets
+    return a, b
+
+
+def union_find(count, a, b):
+    """Component root of each of count nodes joined by the edges a-b
+
+    Hooks the larger root under the smaller one for every edge at once and
+    then flattens the trees, until no edge joins two different roots.
+    """
+    parent = np.arange(count)
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        joined = root_a != root_b
+        if not joined.any():
+            return parent
+        low = np.minimum(root_a[joined], root_b[joined])
+        high = np.maximum(root_a[joined], root_b[joined])
+        np.minimum.at(parent, high, low)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+def _group_boxes(labels, lefts, tops, rights, bottoms):
+    """Bounding box of every label group, as four arrays"""
+    _, groups = np.unique(labels, return_inverse=True)
+    count = groups.max() + 1 if len(groups) else 0
+    boxes = [np.full(count, np.iinfo(np.int64).max), np.full(count, np.iinfo(np.int64).max),
+             np.full(count, -1), np.full(count, -1)]
+    np.minimum.at(boxes[0], groups, lefts)
+    np.minimum.at(boxes[1], groups, tops)
+    np.maximum.at(boxes[2], groups, rights)
+    np.maximum.at(boxes[3], groups, bottoms)
+    return boxes
+
+
+def merge_boxes(lefts, tops, rights, bottoms, distance):
+    """Join boxes that overlap or are at most distance pixels apart, until none are"""
+    while len(lefts) > 1:
+        order = np.argsort(lefts, kind="stable")
+        lefts, tops, rights, bottoms = lefts[order], tops[order], rights[order], bottoms[order]
+        # Sorted by left edge, the boxes that can reach box i horizontally
+        # are the ones right after it
+        last = np.searchsorted(lefts, rights + distance, side="right")
+        counts = np.maximum(last - np.arange(len(lefts)) - 1, 0)
+        a = np.repeat(np.arange(len(lefts)), counts)
+        b = a + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        close = (tops[b] <= bottoms[a] + distance) & (tops[a] <= bottoms[b] + distance)
+        if not close.any():
+            break
+        labels = union_find(len(lefts), a[close], b[close])
+        lefts, tops, rights, bottoms = _group_boxes(labels, lefts, tops, rights, bottoms)
+    return lefts, tops, rights, bottoms
+
+
+def find_sprites(image, tolerance=16, merge=0, min_size=1):
+    """Bounding boxes of the sprites on a sheet, top to bottom
+
+    Foreground is decided as for grid detection: opaque pixels on sheets
+    with transparency, otherwise pixels differing from the border colour
+    by more than tolerance.  Pixels touching on a side or corner belong to
+    one sprite, and sprites whose boxes overlap or lie at most merge
+    pixels apart are joined, so detached parts such as sparks stay with
+    their sprite.  Boxes narrower or shorter than min_size are dropped.
+    """
+    levels, threshold = foreground_levels(_as_pil(image), tolerance)
+    mask = levels > threshold
+    rows, starts, ends = find_runs(mask)
+    if not len(rows):
+        return []
+
+    a, b = touching_runs(rows, starts, ends, mask.shape[1])
+    labels = union_find(len(rows), a, b)
+    boxes = _group_boxes(labels, starts, rows, ends, rows + 1)
+    lefts, tops, rights, bottoms = merge_boxes(*boxes, distance=merge)
+
+    keep = (rights - lefts >= min_size) & (bottoms - tops >= min_size)
+    return [(int(l), int(t), int(r), int(b_))
+            for l, t, r, b_ in zip(lefts[keep], tops[keep], rights[keep], bottoms[keep])]
+
+
+class SpriteLayout:
+    """Free-standing sprite boxes that export like the cells of a grid
+
+    Boxes are grouped into rows: a row ends where the next box starts
+    below everything in it.  Within a row boxes are numbered left to
+    right, which gives row_col names that follow the sheet.
+    """
+
+    def __init__(self, boxes):
+        self.cells = []
+        row, row_bottom, current = -1, None, []
+        for box in sorted(boxes, key=lambda box: (box[1], box[0])):
+            if row_bottom is None or box[1] >= row_bottom:
+                self._add_row(row, current)
+                row, row_bottom, current = row + 1, box[3], []
+            row_bottom = max(row_bottom, box[3])
+            current.append(box)
+        self._add_row(row, current)
+
+    def _add_row(self, row, boxes):
+        for col, box in enumerate(sorted(boxes)):
+            self.cells.append((row, col, tuple(box)))
+
+    @property
+    def total(self):
+        return len(self.cells)
+
+    def plan_tiles(self, image_size, prefix="sprite", naming_scheme="row_col", extension=".png"):
+        """(row, col, box, filename) for every sprite, clipped to the image"""
+        image_width, image_height = image_size
+        prefix = prefix.strip() or "sprite"
+        tiles = []
+        for row, col, (left, top, right, bottom) in self.cells:
+            box = (left, top, min(right, image_width), min(bottom, image_height))
+            if box[0] < box[2] and box[1] < box[3]:
+                filename = tile_filename(prefix, naming_scheme, row, col, len(tiles) + 1,
+                                         self.total, extension)
+                tiles.append((row, col, box, filename))
+        return tiles
+
+    def to_dict(self):
+        return {"sprites": [list(box) for _, _, box in self.cells]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(tuple(int(v) for v in box) for box in data["sprites"])
+
+    def __len__(self):
+        return len(self.cells)
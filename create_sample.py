@@ -7,12 +7,14 @@ from PIL import Image, ImageDraw, ImageFont
 import os
 
 
-def create_sample_sprite_sheet():
-    """Create a sample sprite sheet with numbered tiles"""
-    # Create a 400x300 image with a grid of colored squares
-    width, height = 400, 300
-    rows, cols = 3, 4
-    
+def create_sample_sprite_sheet(width=400, height=300, rows=3, cols=4,
+                               output_path="sample_sprite_sheet.png", numbered=True, verbose=True):
+    """Create a sample sprite sheet with numbered tiles
+
+    The defaults make the 400x300, 3x4 sheet shipped with the repo; the
+    benchmarks call this with larger sizes and grids.
+    """
+    # Create an image with a grid of colored squares
     image = Image.new('RGB', (width, height), 'white')
     draw = ImageDraw.Draw(image)
     
@@ -26,6 +28,13 @@ def create_sample_sprite_sheet():
     cell_width = width // cols
     cell_height = height // rows
     
+    # Try to use a font, fall back to default if not available
+    font_size = max(8, min(24, cell_height // 3))
+    try:
+        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
+    except:
+        font = ImageFont.load_default()
+    
     tile_num = 0
     for row in range(rows):
         for col in range(cols):
@@ -38,13 +47,12 @@ def create_sample_sprite_sheet():
             color = colors[tile_num % len(colors)]
             draw.rectangle([x1, y1, x2, y2], fill=color, outline='black', width=2)
             
+            tile_num += 1
+            if not numbered:
+                continue
+            
             # Add number to tile
-            text = str(tile_num + 1)
-            # Try to use a font, fall back to default if not available
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-            except:
-                font = ImageFont.load_default()
+            text = str(tile_num)
                 
             # Calculate text position (center of tile)
             bbox = draw.textbbox((0, 0), text, font=font)
@@ -55,12 +63,11 @@ def create_sample_sprite_sheet():
             text_y = y1 + (cell_height - text_height) // 2
             
             draw.text((text_x, text_y), text, fill='white', font=font, stroke_width=1, stroke_fill='black')
-            
-            tile_num += 1
     
     # Save the sample image
-    output_path = "sample_sprite_sheet.png"
     image.save(output_path)
+    if not verbose:
+        return output_path
     print(f"Sample sprite sheet saved as: {output_path}")
     print(f"Image size: {width}x{height}")
     print(f"Grid: {rows} rows x {cols} columns")
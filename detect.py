@@ -0,0 +1,187 @@
+"""
+Automatic grid detection for SpriteCutter
+Finds the cell pitch, offset, rows and columns of a sprite sheet from its
+pixels using NumPy projections and autocorrelation.
+"""
+
+import numpy as np
+from PIL import Image, ImageChops
+
+from grid import GridSpec
+
+# Smallest cell edge considered, in pixels
+MIN_CELL = 4
+
+# A lag must reach this fraction of the strongest autocorrelation peak to
+# count, so the fundamental pitch wins over its multiples
+PEAK_RATIO = 0.8
+
+# Profiles are summed over at most this many sampled lines per axis, which
+# keeps detection fast on very large sheets without losing resolution
+# along the axis being measured
+MAX_SAMPLES = 1024
+
+
+def _as_pil(image):
+    """Memory-mapped images are decoded in full for analysis"""
+    if isinstance(image, Image.Image):
+        return image
+    return image.crop((0, 0) + tuple(image.size))
+
+
+def foreground_levels(image, tolerance=16):
+    """Return (levels, threshold): pixels with levels > threshold are foreground
+
+    Transparent pixels are background when the sheet has transparency;
+    otherwise the most common colour along the border is.
+    """
+    image = _as_pil(image)
+    alpha = None
+    if image.mode in ("RGBA", "LA"):
+        alpha = image.getchannel("A")
+    elif image.mode in ("PA", "P") and (image.mode == "PA" or "transparency" in image.info):
+        alpha = image.convert("RGBA").getchannel("A")
+    if alpha is not None and alpha.getextrema()[0] < 255:
+        return np.asarray(alpha), 0
+
+    rgb = image.convert("RGB")
+    width, height = rgb.size
+    border = np.concatenate([
+        np.asarray(rgb.crop((0, 0, width, 1))).reshape(-1, 3),
+        np.asarray(rgb.crop((0, height - 1, width, height))).reshape(-1, 3),
+        np.asarray(rgb.crop((0, 0, 1, height))).reshape(-1, 3),
+        np.asarray(rgb.crop((width - 1, 0, width, height))).reshape(-1, 3),
+    ])
+    colors, counts = np.unique(border, axis=0, return_counts=True)
+    background = tuple(int(c) for c in colors[counts.argmax()])
+
+    difference = ImageChops.difference(rgb, Image.new("RGB", rgb.size, background))
+    return np.asarray(difference.convert("L")), tolerance
+
+
+def coverage_profile(levels, threshold, axis):
+    """Foreground pixel count on each line across the given axis, on sampled lines"""
+    other = 1 - axis
+    step = max(1, levels.shape[other] // MAX_SAMPLES)
+    sampled = levels[::step, :] if axis == 1 else levels[:, ::step]
+    return np.count_nonzero(sampled > threshold, axis=other)
+
+
+def edge_profile(gray, axis):
+    """Summed absolute gradient across the given axis, on sampled lines"""
+    other = 1 - axis
+    step = max(1, gray.shape[other] // MAX_SAMPLES)
+    sampled = gray[::step, :] if axis == 1 else gray[:, ::step]
+    gradient = np.abs(np.diff(sampled.astype(np.int16), axis=axis))
+    profile = gradient.sum(axis=other).astype(np.float64)
+    # Gradient i sits between pixels i and i+1; report it at i+1
+    return np.concatenate([[0.0], profile])
+
+
+def find_period(profile):
+    """Dominant repeat length of a 1-D profile, or None if it does not repeat"""
+    n = len(profile)
+    if n < MIN_CELL * 2:
+        return None
+    signal = profile - profile.mean()
+    if not signal.any():
+        return None
+
+    spectrum = np.fft.rfft(signal, 2 * n)
+    correlation = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    # Unbiased estimate so long lags are not penalised for overlapping less
+    correlation = correlation / (n - np.arange(n))
+    correlation /= correlation[0]
+
+    lags = np.arange(MIN_CELL, n // 2 + 1)
+    values = correlation[lags]
+    # Local maxima only
+    left = correlation[lags - 1]
+    right = correlation[np.minimum(lags + 1, n - 1)]
+    peaks = lags[(values >= left) & (values >= right) & (values > 0.1)]
+    if len(peaks) == 0:
+        return None
+    best = correlation[peaks].max()
+    return int(peaks[correlation[peaks] >= best * PEAK_RATIO][0])
+
+
+def find_phase(profile, period, boundary_high):
+    """Offset in [0, period) of the cell boundaries
+
+    The profile is folded onto one period; boundaries sit at the circular
+    centre of the strongest (edges) or emptiest (gutters) positions.
+    """
+    usable = len(profile) - len(profile) % period
+    folded = profile[:usable].reshape(-1, period).sum(axis=0)
+    if boundary_high:
+        weights = np.clip(folded - np.median(folded), 0, None)
+    else:
+        weights = (folded == folded.min()).astype(np.float64)
+    if not weights.any():
+        return 0
+    angles = 2 * np.pi * np.arange(period) / period
+    mean = np.arctan2((weights * np.sin(angles)).sum(), (weights * np.cos(angles)).sum())
+    return int(round(mean / (2 * np.pi) * period)) % period
+
+
+def fit_axis(coverage, edges, length):
+    """Detect (offset, count, pitch) along one axis
+
+    coverage counts the foreground pixels on each line.  edges is a
+    callable returning the edge profile, as it is only needed for sheets
+    without gutters.
+    """
+    occupancy = coverage > 0
+    occupied = np.flatnonzero(occupancy)
+    first, last = (occupied[0], occupied[-1]) if len(occupied) else (0, length - 1)
+
+    # Empty lines between content mean the sheet has gutters to go by;
+    # otherwise look for repeating edges such as cell outlines
+    gutters = len(occupied) and not occupancy[first:last + 1].all()
+    if gutters:
+        # Only the span with content repeats; empty margins would blur it
+        profile = coverage[first:last + 1].astype(np.float64)
+        start = first
+    else:
+        profile = edges()
+        start = 0
+    period = find_period(profile)
+    if period is None:
+        return first, 1, last - first + 1
+
+    phase = (start + find_phase(profile, period, boundary_high=not gutters)) % period
+    offset = phase - period if phase > period // 2 else phase
+    offset = max(0, offset)
+
+    # Skip empty cells before the content and stop after it
+    while offset + period <= first:
+        offset += period
+    count = max(1, (length - offset + period // 4) // period)
+    while count > 1 and offset + (count - 1) * period > last:
+        count -= 1
+    return offset, count, period
+
+
+def detect_grid(image, tolerance=16):
+    """Detect a uniform grid in a sprite sheet
+
+    Returns a GridSpec in source pixels.  Raises ValueError if the sheet
+    is blank.
+    """
+    image = _as_pil(image)
+    levels, threshold = foreground_levels(image, tolerance)
+    column_coverage = coverage_profile(levels, threshold, axis=1)
+    row_coverage = coverage_profile(levels, threshold, axis=0)
+    if not column_coverage.any() or not row_coverage.any():
+        raise ValueError("The image has no content to detect a grid from")
+
+    gray = []
+
+    def edges(axis):
+        if not gray:
+            gray.append(np.asarray(image.convert("L")))
+        return edge_profile(gray[0], axis)
+
+    x, cols, cell_width = fit_axis(column_coverage, lambda: edges(1), image.width)
+    y, rows, cell_height = fit_axis(row_coverage, lambda: edges(0), image.height)
+    return GridSpec(int(x), int(y), int(rows), int(cols), int(cell_width), int(cell_height))
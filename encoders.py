@@ -0,0 +1,123 @@
+"""
+Output encoders for SpriteCutter
+Named presets that decide the file format and encoder settings of every
+exported tile, trading export speed against file size.
+"""
+
+import io
+
+from PIL import Image, features
+
+
+def has_alpha(image):
+    """True if an image can hold transparent pixels"""
+    if "A" in image.getbands() or "transparency" in image.info:
+        return True
+    return image.mode == "P" and image.palette is not None and image.palette.mode == "RGBA"
+
+
+class Encoder:
+    """How tiles are written: a Pillow format, its save options and an extension
+
+    With palette set, tiles with at most 256 colours are also tried as
+    palette images, and whichever encoding is smaller is kept.  Palettes
+    are only used when they are lossless.
+    """
+
+    def __init__(self, name, format, extension, options=None, palette=False,
+                 description="", feature=None):
+        self.name = name
+        self.format = format
+        self.extension = extension
+        self.options = options or {}
+        self.palette = palette
+        self.description = description
+        self.feature = feature  # Pillow feature the format needs, if any
+
+    @property
+    def available(self):
+        Image.init()
+        if self.format not in Image.SAVE:
+            return False
+        return self.feature is None or bool(features.check(self.feature))
+
+    def settings(self):
+        """Everything that affects the encoded bytes, for cache keys"""
+        return [self.format, sorted(self.options.items()), self.palette]
+
+    def prepare(self, tile):
+        """Convert a tile to what the format can store, losslessly"""
+        if tile.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            tile = tile.convert("RGBA")
+        if self.format in ("WEBP", "QOI") and tile.mode not in ("RGB", "RGBA"):
+            tile = tile.convert("RGBA" if has_alpha(tile) else "RGB")
+        return tile
+
+    def to_palette(self, tile):
+        """Lossless palette version of an RGB(A) tile, or None"""
+        if tile.mode not in ("RGB", "RGBA"):
+            return None
+        colors = tile.getcolors(256)
+        if not colors:
+            return None
+        quantized = tile.quantize(colors=len(colors), method=Image.Quantize.FASTOCTREE)
+        if quantized.convert(tile.mode).tobytes() != tile.tobytes():
+            return None
+        return quantized
+
+    def encode(self, tile):
+        """Return the tile encoded as bytes"""
+        tile = self.prepare(tile)
+        data = self._save(tile)
+        if self.palette:
+            quantized = self.to_palette(tile)
+            if quantized is not None:
+                data = min(data, self._save(quantized), key=len)
+        return data
+
+    def _save(self, tile):
+        buffer = io.BytesIO()
+        tile.save(buffer, self.format, **self.options)
+        return buffer.getvalue()
+
+    def __repr__(self):
+        return f"Encoder({self.name!r})"
+
+
+PRESETS = {
+    "png": Encoder("png", "PNG", ".png",
+                   description="PNG with Pillow's default settings"),
+    "fast": Encoder("fast", "PNG", ".png", {"compress_level": 1},
+                    description="PNG at the lowest compression level, fastest to write"),
+    "uncompressed": Encoder("uncompressed", "PNG", ".png", {"compress_level": 0},
+                            description="PNG without compression, for archives and caches"),
+    "small": Encoder("small", "PNG", ".png", {"optimize": True}, palette=True,
+                     description="optimised PNG, palette images where lossless"),
+    "webp": Encoder("webp", "WEBP", ".webp", {"lossless": True, "quality": 100, "method": 4},
+                    description="lossless WebP", feature="webp"),
+    "qoi": Encoder("qoi", "QOI", ".qoi",
+                   description="QOI, fast lossless encode and decode"),
+}
+
+DEFAULT_PRESET = "png"
+
+
+def available_presets():
+    """Names of the presets this Pillow build can write"""
+    return [name for name, encoder in PRESETS.items() if encoder.available]
+
+
+def get_encoder(name=None):
+    """Look up a preset by name; None gives the default PNG encoder
+
+    Raises ValueError for unknown presets or formats this Pillow lacks.
+    """
+    if isinstance(name, Encoder):
+        return name
+    encoder = PRESETS.get(name or DEFAULT_PRESET)
+    if encoder is None:
+        raise ValueError(f"Unknown encoder preset '{name}' (choose from {', '.join(PRESETS)})")
+    if not encoder.available:
+        raise ValueError(f"This Pillow build cannot write {encoder.format} "
+                         f"for the '{encoder.name}' preset")
+    return encoder
@@ -0,0 +1,244 @@
+"""
+Multi-frame slicing for SpriteCutter
+Animated GIF and APNG files and multi-page TIFF stacks are read one frame
+at a time with ImageSequence, so long stacks are never decoded in full.
+Every frame is cut with the same grid, into one tile per frame and cell
+or into one animation per cell.
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageSequence
+
+from archive import ArchiveWriter, is_archive_path
+from encoders import PRESETS, get_encoder
+from grid import plan_tiles
+from profiling import STAGES
+from slicer import SliceEngine, SliceResult
+
+# name -> (Pillow format, extension, save options) for per-cell animations
+ANIMATION_FORMATS = {
+    "apng": ("PNG", ".png", {}),
+    "gif": ("GIF", ".gif", {"disposal": 2}),
+    "webp": ("WEBP", ".webp", {"lossless": True, "quality": 100}),
+}
+
+# Frame time in milliseconds when the file does not give one (TIFF stacks)
+DEFAULT_DURATION = 100
+
+
+def frame_count(image):
+    return getattr(image, "n_frames", 1)
+
+
+def iter_frames(image):
+    """Yield (index, frame, duration in ms) for every frame, decoding one at a time
+
+    The frame is the image itself seeked to that frame, so it is only valid
+    until the next one is requested.
+    """
+    for index, frame in enumerate(ImageSequence.Iterator(image)):
+        yield index, frame, frame.info.get("duration") or DEFAULT_DURATION
+
+
+def frame_prefix(prefix, index, frames):
+    """Prefix of one frame's tiles: prefix_f000, prefix_f001, ..."""
+    return f"{prefix}_f{index:0{max(3, len(str(frames - 1)))}d}"
+
+
+class _FrameSpool:
+    """Append-only temporary file of encoded cell crops
+
+    Used as the engine's sink while frames are read, so the crops of a
+    whole stack wait on disk rather than in memory until each cell's
+    animation is assembled.
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.entries = {}  # name -> [(offset, length), ...] in frame order
+        self.lock = threading.Lock()
+
+    def add(self, name, data):
+        with self.lock:
+            offset = self.file.seek(0, os.SEEK_END)
+            self.file.write(data)
+        self.entries.setdefault(name, []).append((offset, len(data)))
+
+    def read(self, name):
+        """Encoded frames of one cell, oldest first"""
+        chunks = []
+        with self.lock:
+            for offset, length in self.entries.get(name, ()):
+                self.file.seek(offset)
+                chunks.append(self.file.read(length))
+        return chunks
+
+    def close(self):
+        self.file.close()
+
+
+def _merge_result(total, results, encoder, started):
+    """One SliceResult for a run made of several engine runs"""
+    stages = dict.fromkeys(STAGES, 0.0)
+    outputs = []
+    for result in results:
+        outputs.extend(result.outputs)
+        for stage, seconds in result.stages.items():
+            stages[stage] += seconds
+    return SliceResult(sum(r.saved for r in results), total,
+                       any(r.cancelled for r in results), outputs,
+                       sum(r.empty for r in results), sum(r.duplicates for r in results),
+                       encoder, sum(r.bytes_written for r in results), stages,
+                       time.perf_counter() - started, sum(r.cached for r in results))
+
+
+def slice_frames(source, spec, output_dir, prefix="sprite", naming_scheme="row_col",
+                 animate=False, animation_format="apng", workers=None, progress=None,
+                 cancel_event=None, skip_empty=False, encoder=None, compress_level=None,
+                 stored=False):
+    """Slice every frame of a multi-frame image with the same grid
+
+    By default each frame's cells are written like slice_image would,
+    with the frame number after the prefix (prefix_f000_r00_c00.png).
+    With animate, every cell becomes one animation in animation_format
+    (see ANIMATION_FORMATS) that keeps the source's frame times.
+
+    Only one decoded frame is held at a time.  For animations the cell
+    crops are spooled to a temporary file, losslessly compressed, until
+    the last frame has been read.  output_dir may also be an archive path,
+    written with compress_level and stored as for archive.ArchiveWriter.
+    skip_empty and encoder only apply to per-frame tiles.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with Image.open(source) as image:
+            return slice_frames(image, spec, output_dir, prefix, naming_scheme, animate,
+                                animation_format, workers, progress, cancel_event,
+                                skip_empty, encoder, compress_level, stored)
+
+    prefix = prefix.strip() or "sprite"
+    archive = None
+    if is_archive_path(output_dir):
+        os.makedirs(os.path.dirname(os.path.abspath(output_dir)), exist_ok=True)
+        archive = ArchiveWriter(output_dir, compress_level, stored)
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+    try:
+        if animate:
+            return _slice_animations(source, spec, output_dir, archive, prefix, naming_scheme,
+                                     animation_format, workers, progress, cancel_event)
+        return _slice_frame_tiles(source, spec, output_dir, archive, prefix, naming_scheme,
+                                  workers, progress, cancel_event, skip_empty, encoder)
+    finally:
+        if archive is not None:
+            archive.close()
+
+
+def _slice_frame_tiles(image, spec, output_dir, archive, prefix, naming_scheme, workers,
+                       progress, cancel_event, skip_empty, encoder):
+    started = time.perf_counter()
+    encoder = get_encoder(encoder)
+    engine = SliceEngine(workers=workers)
+    frames = frame_count(image)
+    results = []
+
+    for index, frame, _ in iter_frames(image):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        tiles = plan_tiles(spec, frame.size, frame_prefix(prefix, index, frames),
+                           naming_scheme, encoder.extension)
+        tasks = [(box, filename if archive else os.path.join(output_dir, filename))
+                 for _, _, box, filename in tiles]
+
+        def frame_progress(done, total, index=index):
+            if progress:
+                progress(index * total + done, frames * total)
+
+        results.append(engine.run(frame, tasks, progress=frame_progress,
+                                  cancel_event=cancel_event, skip_empty=skip_empty,
+                                  sink=archive, encoder=encoder))
+        if results[-1].cancelled:
+            break
+
+    cells = len(plan_tiles(spec, image.size))
+    result = _merge_result(cells * frames, results, encoder.name, started)
+    result.cancelled = result.cancelled or len(results) < frames
+    return result
+
+
+def _slice_animations(image, spec, output_dir, archive, prefix, naming_scheme,
+                      animation_format, workers, progress, cancel_event):
+    if animation_format not in ANIMATION_FORMATS:
+        raise ValueError(f"Unknown animation format '{animation_format}' "
+                         f"(choose from {', '.join(ANIMATION_FORMATS)})")
+    started = time.perf_counter()
+    pil_format, extension, options = ANIMATION_FORMATS[animation_format]
+    engine = SliceEngine(workers=workers)
+    frames = frame_count(image)
+    tiles = plan_tiles(spec, image.size, prefix, naming_scheme, extension)
+    cells = len(tiles)
+    # Spool names are cell indices, as strings so the engine keeps them as is
+    tasks = [(box, str(i)) for i, (_, _, box, _) in enumerate(tiles)]
+    total = cells * frames + cells
+    outputs = [None] * cells
+    durations = []
+    spool = _FrameSpool()
+    try:
+        # Pass 1: crop every frame into the spool
+        for index, frame, duration in iter_frames(image):
+            def frame_progress(done, _, index=index):
+                if progress:
+                    progress(index * cells + done, total)
+
+            cropped = engine.run(frame, tasks, progress=frame_progress,
+                                 cancel_event=cancel_event, sink=spool,
+                                 encoder=PRESETS["fast"])
+            durations.append(duration)
+            if cropped.cancelled:
+                return SliceResult(0, cells, True, outputs, encoder=animation_format,
+                                   elapsed=time.perf_counter() - started)
+
+        # Pass 2: decode one cell's frames at a time and save its animation
+        def assemble(index):
+            cell_frames = [Image.open(io.BytesIO(data)).convert("RGBA")
+                           for data in spool.read(str(index))]
+            buffer = io.BytesIO()
+            cell_frames[0].save(buffer, pil_format, save_all=True,
+                                append_images=cell_frames[1:], duration=durations,
+                                loop=0, **options)
+            data = buffer.getvalue()
+            path = tiles[index][3]
+            if archive is None:
+                path = os.path.join(output_dir, path)
+                with open(path, "wb") as f:
+                    f.write(data)
+            return path, data
+
+        counts = {"saved": 0, "bytes": 0}
+
+        def on_assembled(index, value):
+            path, data = value
+            if archive is not None:
+                archive.add(path, data)
+            outputs[index] = path
+            counts["saved"] += 1
+            counts["bytes"] += len(data)
+            if progress:
+                progress(cells * frames + counts["saved"], total)
+
+        executor = ThreadPoolExecutor(max_workers=engine.workers)
+        try:
+            jobs = ((i, (i,)) for i in range(cells))
+            cancelled = engine._map(executor.submit, assemble, jobs, on_assembled, cancel_event)
+        finally:
+            executor.shutdown(wait=True)
+    finally:
+        spool.close()
+
+    return SliceResult(counts["saved"], cells, cancelled, outputs, encoder=animation_format,
+                       bytes_written=counts["bytes"], elapsed=time.perf_counter() - started)
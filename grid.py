@@ -0,0 +1,167 @@
+"""
+Grid geometry for SpriteCutter
+Pure crop-box and file-naming math, shared by the GUI, the command line
+and anything else that wants to slice a sheet without Tkinter.
+"""
+
+NAMING_SCHEMES = ("row_col", "sequential")
+
+
+class GridSpec:
+    """A uniform grid in source-image pixel coordinates
+
+    gutter is the spacing between neighbouring cells and padding is cut
+    from every side of a cell when it is exported.
+    """
+
+    def __init__(self, x, y, rows, cols, cell_width, cell_height, gutter=0, padding=0):
+        if rows < 1 or cols < 1:
+            raise ValueError("Grid needs at least one row and one column")
+        if gutter < 0 or padding < 0:
+            raise ValueError("Gutter and padding cannot be negative")
+        self.x = x
+        self.y = y
+        self.rows = rows
+        self.cols = cols
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.gutter = gutter
+        self.padding = padding
+
+    @classmethod
+    def from_region(cls, x, y, width, height, rows, cols, gutter=0, padding=0):
+        """Split a width x height region into rows x cols equal cells"""
+        return cls(x, y, rows, cols, (width - (cols - 1) * gutter) // cols,
+                   (height - (rows - 1) * gutter) // rows, gutter, padding)
+
+    @property
+    def width(self):
+        return self.cell_width * self.cols + self.gutter * (self.cols - 1)
+
+    @property
+    def height(self):
+        return self.cell_height * self.rows + self.gutter * (self.rows - 1)
+
+    @property
+    def bounds(self):
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    @property
+    def total(self):
+        return self.rows * self.cols
+
+    def to_dict(self):
+        data = {"x": self.x, "y": self.y, "rows": self.rows, "cols": self.cols,
+                "cell_width": self.cell_width, "cell_height": self.cell_height}
+        # Only written when used, so plain grids keep their old form
+        if self.gutter:
+            data["gutter"] = self.gutter
+        if self.padding:
+            data["padding"] = self.padding
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict; x, y, gutter and padding default to 0"""
+        return cls(int(data.get("x", 0)), int(data.get("y", 0)),
+                   int(data["rows"]), int(data["cols"]),
+                   int(data["cell_width"]), int(data["cell_height"]),
+                   int(data.get("gutter", 0)), int(data.get("padding", 0)))
+
+    def cell_at(self, px, py):
+        """(row, col) of the cell containing a point, or None for gutters and outside"""
+        pitch_x = self.cell_width + self.gutter
+        pitch_y = self.cell_height + self.gutter
+        dx, dy = px - self.x, py - self.y
+        if dx < 0 or dy < 0 or pitch_x <= 0 or pitch_y <= 0:
+            return None
+        col, offset_x = divmod(dx, pitch_x)
+        row, offset_y = divmod(dy, pitch_y)
+        if row >= self.rows or col >= self.cols:
+            return None
+        if offset_x >= self.cell_width or offset_y >= self.cell_height:
+            return None
+        return int(row), int(col)
+
+    def crop_boxes(self, image_width, image_height):
+        """Yield (row, col, box) for every cell that starts inside the image
+
+        Cells running past the right or bottom edge are clipped to it, and
+        cells starting outside the image are skipped, as are cells that
+        padding leaves empty.
+        """
+        pad = self.padding
+        for row in range(self.rows):
+            for col in range(self.cols):
+                left = self.x + col * (self.cell_width + self.gutter) + pad
+                top = self.y + row * (self.cell_height + self.gutter) + pad
+                right = min(left + self.cell_width - 2 * pad, image_width)
+                bottom = min(top + self.cell_height - 2 * pad, image_height)
+
+                if left < min(right, image_width) and top < min(bottom, image_height):
+                    yield row, col, (left, top, right, bottom)
+
+    def __repr__(self):
+        extra = ""
+        if self.gutter or self.padding:
+            extra = f", gutter={self.gutter}, padding={self.padding}"
+        return (f"GridSpec(x={self.x}, y={self.y}, rows={self.rows}, cols={self.cols}, "
+                f"cell_width={self.cell_width}, cell_height={self.cell_height}{extra})")
+
+
+def grid_for_image(template, image_size):
+    """Build a GridSpec from a partial spec dict for an image of the given size
+
+    The dict needs rows and cols; x and y default to 0, and when the cell
+    size is missing the rest of the image is split evenly.
+    """
+    if "rows" not in template or "cols" not in template:
+        raise ValueError("grid needs rows and cols")
+    if "cell_width" in template and "cell_height" in template:
+        spec = GridSpec.from_dict(template)
+    else:
+        x, y = int(template.get("x", 0)), int(template.get("y", 0))
+        width, height = image_size
+        spec = GridSpec.from_region(x, y, width - x, height - y,
+                                    int(template["rows"]), int(template["cols"]),
+                                    int(template.get("gutter", 0)),
+                                    int(template.get("padding", 0)))
+    if spec.cell_width < 1 or spec.cell_height < 1:
+        raise ValueError(f"grid cells would be {spec.cell_width}x{spec.cell_height} pixels")
+    return spec
+
+
+def tile_filename(prefix, naming_scheme, row, col, index, total, extension=".png"):
+    """File name for one cell; index is 1-based and only used for sequential naming"""
+    if naming_scheme == "sequential":
+        # Sequential numbering: prefix_001.png, prefix_002.png, etc.
+        digits = len(str(total))
+        return f"{prefix}_{index:0{digits}d}{extension}"
+    # Row and column: prefix_r00_c00.png (default)
+    return f"{prefix}_r{row:02d}_c{col:02d}{extension}"
+
+
+def naming_example(prefix, naming_scheme, total, extension=".png"):
+    """Short human readable example of the names a scheme produces"""
+    if naming_scheme == "sequential":
+        digits = len(str(total))
+        return f"{prefix}_{'1'.zfill(digits)}{extension}, {prefix}_{'2'.zfill(digits)}{extension}, etc."
+    return f"{prefix}_r00_c00{extension}, {prefix}_r00_c01{extension}, etc."
+
+
+def plan_tiles(spec, image_size, prefix="sprite", naming_scheme="row_col", extension=".png"):
+    """Return (row, col, box, filename) for every cell the grid exports
+
+    spec may also be a layout of several grids with its own plan_tiles,
+    such as regions.RegionLayout.
+    """
+    if not isinstance(spec, GridSpec):
+        return spec.plan_tiles(image_size, prefix, naming_scheme, extension)
+    image_width, image_height = image_size
+    prefix = prefix.strip() or "sprite"
+    tiles = []
+    for row, col, box in spec.crop_boxes(image_width, image_height):
+        filename = tile_filename(prefix, naming_scheme, row, col, len(tiles) + 1, spec.total,
+                                 extension)
+        tiles.append((row, col, box, filename))
+    return tiles
@@ -0,0 +1,220 @@
+"""
+Image loading for SpriteCutter
+Uncompressed formats (BMP, raw TIFF strips and tiles) are memory-mapped
+and decoded one region at a time, so slicing or previewing a huge sheet
+only keeps the working set resident instead of the whole bitmap.
+"""
+
+import mmap
+
+from PIL import Image
+
+# Modes Image.reduce() can work on directly
+REDUCIBLE_MODES = ("L", "LA", "RGB", "RGBA", "I", "F")
+
+# Not every platform (or Python before 3.8) can release mapped pages early
+_DONTNEED = getattr(mmap, "MADV_DONTNEED", None)
+
+# Rows decoded at a time when streaming over the whole image
+BAND_HEIGHT = 256
+
+
+def open_image(path):
+    """Open an image, memory-mapping it when the format allows
+
+    Returns a MappedImage for uncompressed single-frame files and a lazily
+    loaded PIL image for everything else.  Both support size, mode, crop()
+    and reduce(), which is all the slicer and the preview need.
+    """
+    image = Image.open(path)
+    try:
+        mapped = MappedImage.from_image(image)
+    except (OSError, ValueError):
+        mapped = None
+    if mapped is None:
+        return image
+    image.close()
+    return mapped
+
+
+def _bytes_per_row(mode, rawmode, width):
+    """Packed size of one row of width pixels, or None if Pillow cannot tell"""
+    try:
+        return len(Image.new(mode, (width, 1)).tobytes("raw", rawmode))
+    except (ValueError, SystemError):
+        return None
+
+
+class _RawTile:
+    """One 'raw' tile descriptor of an uncompressed file"""
+
+    def __init__(self, extents, offset, rawmode, stride, ystep, pixel_bytes):
+        self.left, self.top, self.right, self.bottom = extents
+        self.offset = offset
+        self.rawmode = rawmode
+        self.stride = stride
+        self.ystep = ystep
+        # Bytes per pixel when pixels are byte aligned, otherwise None
+        self.pixel_bytes = pixel_bytes
+
+    @property
+    def width(self):
+        return self.right - self.left
+
+    @property
+    def height(self):
+        return self.bottom - self.top
+
+
+class MappedImage:
+    """Read-only, memory-mapped view of an uncompressed image file
+
+    Pixels are decoded on demand by crop(); nothing is read up front apart
+    from the header that Pillow already parsed.
+    """
+
+    def __init__(self, path, mode, size, tiles, palette=None, info=None):
+        self.filename = path
+        self.mode = mode
+        self.size = size
+        self.tiles = tiles
+        self.palette = palette
+        self.info = info or {}
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def from_image(cls, image):
+        """Build a MappedImage from an opened, not yet loaded PIL image
+
+        Returns None when the file is compressed, multi-frame or uses a
+        layout this reader does not understand.
+        """
+        if not image.filename or getattr(image, "n_frames", 1) != 1 or not image.tile:
+            return None
+
+        tiles = []
+        end_of_data = 0
+        for tile in image.tile:
+            codec, extents, offset, args = tile[:4]
+            if codec != "raw":
+                return None
+            if isinstance(args, str):
+                args = (args,)
+            rawmode = args[0]
+            stride = args[1] if len(args) > 1 else 0
+            ystep = args[2] if len(args) > 2 else 1
+
+            # Tiles at the right and bottom edges may extend past the image
+            left, top, right, bottom = extents
+            tile_width = right - left
+            if not stride:
+                stride = _bytes_per_row(image.mode, rawmode, tile_width)
+                if not stride:
+                    return None
+            pixel_bytes = None
+            row_of_eight = _bytes_per_row(image.mode, rawmode, 8)
+            if row_of_eight and row_of_eight % 8 == 0:
+                pixel_bytes = row_of_eight // 8
+
+            tiles.append(_RawTile(extents, offset, rawmode, stride, ystep, pixel_bytes))
+            end_of_data = max(end_of_data, offset + stride * (bottom - top))
+
+        palette = image.getpalette() if image.mode in ("P", "PA") else None
+        mapped = cls(image.filename, image.mode, image.size, tiles, palette, dict(image.info))
+        if len(mapped._map) < end_of_data:
+            mapped.close()
+            return None
+        return mapped
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    def load(self):
+        """Nothing to do; regions are decoded when they are cropped"""
+        return None
+
+    def _read(self, start, end):
+        """Copy bytes out of the mapping and let the kernel drop those pages
+
+        The pages stay in the page cache, but no longer count towards this
+        process's resident set once the region has been decoded.
+        """
+        data = self._map[start:end]
+        if _DONTNEED is not None:
+            aligned = start - start % mmap.PAGESIZE
+            self._map.madvise(_DONTNEED, aligned, end - aligned)
+        return data
+
+    def _decode(self, tile, left, top, right, bottom):
+        """Decode a region given in tile-relative coordinates"""
+        rows = bottom - top
+        width = right - left
+        if tile.ystep < 0:
+            # Bottom-up storage: image row r lives at stored row height-1-r
+            first_row = tile.height - bottom
+        else:
+            first_row = top
+        start = tile.offset + first_row * tile.stride
+
+        if tile.pixel_bytes:
+            # Read only the requested columns of each row
+            start += left * tile.pixel_bytes
+            end = start + (rows - 1) * tile.stride + width * tile.pixel_bytes
+            data = self._read(start, end)
+            return Image.frombytes(self.mode, (width, rows), data, "raw",
+                                   tile.rawmode, tile.stride, tile.ystep)
+
+        data = self._read(start, start + rows * tile.stride)
+        band = Image.frombytes(self.mode, (tile.width, rows), data, "raw",
+                               tile.rawmode, tile.stride, tile.ystep)
+        return band.crop((left, 0, right, rows))
+
+    def crop(self, box):
+        """Decode just the pixels inside box and return them as a PIL image"""
+        left, top, right, bottom = (int(v) for v in box)
+        result = Image.new(self.mode, (max(0, right - left), max(0, bottom - top)))
+        if self.palette:
+            result.putpalette(self.palette)
+
+        for tile in self.tiles:
+            # Intersection of the box, the tile and the image
+            x0 = max(left, tile.left)
+            y0 = max(top, tile.top)
+            x1 = min(right, tile.right, self.width)
+            y1 = min(bottom, tile.bottom, self.height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            region = self._decode(tile, x0 - tile.left, y0 - tile.top,
+                                  x1 - tile.left, y1 - tile.top)
+            result.paste(region, (x0 - left, y0 - top))
+        return result
+
+    def reduce(self, factor):
+        """Downscale by an integer factor, streaming over bands of rows"""
+        band_height = max(factor, BAND_HEIGHT - BAND_HEIGHT % factor)
+        mode = self.mode if self.mode in REDUCIBLE_MODES else "RGBA"
+        result = Image.new(mode, ((self.width + factor - 1) // factor,
+                                  (self.height + factor - 1) // factor))
+
+        for top in range(0, self.height, band_height):
+            band = self.crop((0, top, self.width, min(top + band_height, self.height)))
+            if band.mode != mode:
+                band = band.convert(mode)
+            result.paste(band.reduce(factor), (0, top // factor))
+        return result
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
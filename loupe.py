@@ -0,0 +1,125 @@
+"""
+Pixel loupe for SpriteCutter
+Shows the source pixels around the pointer at 1:1 or larger, with cell
+edges drawn in source coordinates, so seams the scaled preview hides can
+be checked.  Each update crops only the few pixels it shows and pastes
+them into the same PhotoImage.
+"""
+
+from PIL import Image, ImageTk
+
+MAGNIFICATIONS = (1, 2, 4, 8)
+
+
+def cell_edges(spec, start, end, axis):
+    """Source coordinates of the cell edges of a GridSpec between start and end
+
+    axis 0 gives the left and right edges of the columns, 1 the top and
+    bottom edges of the rows, as the padded crop boxes have them.
+    """
+    if axis == 0:
+        origin, count, size = spec.x, spec.cols, spec.cell_width
+    else:
+        origin, count, size = spec.y, spec.rows, spec.cell_height
+    pitch = size + spec.gutter
+    inner = size - 2 * spec.padding
+    if pitch <= 0 or inner <= 0:
+        return []
+    first = max(0, (start - origin) // pitch)
+    last = min(count, (end - origin) // pitch + 1)
+    edges = set()
+    for index in range(first, last):
+        low = origin + index * pitch + spec.padding
+        for edge in (low, low + inner):
+            if start <= edge <= end:
+                edges.add(edge)
+    return sorted(edges)
+
+
+class Loupe:
+    """Magnified view of the source image around one pixel, on its own canvas"""
+
+    def __init__(self, canvas, size=160, magnification=4, color="red", cursor_color="cyan"):
+        self.canvas = canvas
+        self.size = size
+        self.magnification = magnification
+        self.color = color
+        self.photo = ImageTk.PhotoImage("RGBA", (size, size))
+        self.image_item = canvas.create_image(0, 0, anchor="nw", image=self.photo)
+        self.lines = []  # [item id, last coords]
+        self.cursor = canvas.create_rectangle(0, 0, 0, 0, outline=cursor_color, state="hidden")
+        self.updates = 0
+
+    def window(self, x, y):
+        """Source box shown around source pixel (x, y)"""
+        span = -(-self.size // self.magnification)
+        left, top = x - span // 2, y - span // 2
+        return left, top, left + span, top + span
+
+    def show(self, image, x, y, specs=()):
+        """Show the pixels of image around source pixel (x, y) and the edges of specs' cells
+
+        Pixels outside the image are left transparent.
+        """
+        scale = self.magnification
+        left, top, right, bottom = self.window(x, y)
+        # Only the part inside the image is cropped, so the rest stays
+        # transparent whatever the image's mode
+        width, height = image.size
+        inside = (max(left, 0), max(top, 0), min(right, width), min(bottom, height))
+        patch = Image.new("RGBA", (right - left, bottom - top))
+        if inside[0] < inside[2] and inside[1] < inside[3]:
+            region = image.crop(inside)
+            if region.mode != "RGBA":
+                region = region.convert("RGBA")
+            patch.paste(region, (inside[0] - left, inside[1] - top))
+        if scale > 1:
+            patch = patch.resize((patch.width * scale, patch.height * scale), Image.Resampling.NEAREST)
+        if patch.size != (self.size, self.size):
+            patch = patch.crop((0, 0, self.size, self.size))
+        self.photo.paste(patch)
+
+        coords = []
+        for spec in specs:
+            grid_left, grid_top, grid_right, grid_bottom = spec.bounds
+            y1 = (max(top, grid_top) - top) * scale
+            y2 = (min(bottom, grid_bottom) - top) * scale
+            if y1 < y2:
+                for edge in cell_edges(spec, left, right, 0):
+                    position = (edge - left) * scale
+                    coords.append((position, y1, position, y2))
+            x1 = (max(left, grid_left) - left) * scale
+            x2 = (min(right, grid_right) - left) * scale
+            if x1 < x2:
+                for edge in cell_edges(spec, top, bottom, 1):
+                    position = (edge - top) * scale
+                    coords.append((x1, position, x2, position))
+        self._draw_lines(coords)
+
+        cx, cy = (x - left) * scale, (y - top) * scale
+        self.canvas.coords(self.cursor, cx, cy, cx + scale, cy + scale)
+        self.canvas.itemconfigure(self.cursor, state="normal")
+        self.updates += 1
+
+    def _draw_lines(self, coords):
+        """Move pooled line items onto coords, creating and hiding items as needed"""
+        while len(self.lines) < len(coords):
+            item = self.canvas.create_line(0, 0, 0, 0, fill=self.color, width=1)
+            self.lines.append([item, None])
+        for entry, line in zip(self.lines, coords):
+            if entry[1] != line:
+                if entry[1] is None:
+                    self.canvas.itemconfigure(entry[0], state="normal")
+                self.canvas.coords(entry[0], *line)
+                entry[1] = line
+        for entry in self.lines[len(coords):]:
+            if entry[1] is not None:
+                self.canvas.itemconfigure(entry[0], state="hidden")
+                entry[1] = None
+        self.canvas.tag_raise(self.cursor)
+
+    def clear(self):
+        """Blank the loupe, e.g. when the pointer leaves the image"""
+        self.photo.paste(Image.new("RGBA", (self.size, self.size)))
+        self._draw_lines([])
+        self.canvas.itemconfigure(self.cursor, state="hidden")
@@ -0,0 +1,132 @@
+"""
+Grid overlay for SpriteCutter
+Keeps the grid's canvas items alive between redraws and only moves the
+ones whose coordinates changed, so dragging large grids stays smooth.
+"""
+
+HANDLE_SIZE = 8
+HANDLES = ("nw", "ne", "sw", "se", "n", "s", "w", "e")
+
+
+class GridOverlay:
+    """Persistent outline, grid lines and resize handles on a canvas"""
+
+    def __init__(self, canvas, tag="grid", color="red", handle_color="darkred", handles=True):
+        self.canvas = canvas
+        self.tag = tag
+        self.color = color
+        self.handle_color = handle_color
+        self.show_handles = handles  # False for grids that are only displayed
+        self.reset()
+
+    def reset(self):
+        """Forget all items, e.g. after the canvas was cleared"""
+        self.outline = None
+        self.handles = {}
+        self.vlines = []  # [item id, last coords]
+        self.hlines = []
+        self.bounds = None
+        self.created = 0
+        self.moved = 0
+
+    def clear(self):
+        """Delete the overlay from the canvas"""
+        self.canvas.delete(self.tag)
+        self.reset()
+
+    def _set_coords(self, entry, coords):
+        if entry[1] != coords:
+            self.canvas.coords(entry[0], *coords)
+            entry[1] = coords
+            self.moved += 1
+
+    def _resize_pool(self, pool, count):
+        """Grow or shrink a list of line items to exactly count entries"""
+        while len(pool) > count:
+            self.canvas.delete(pool.pop()[0])
+        while len(pool) < count:
+            item = self.canvas.create_line(0, 0, 0, 0, fill=self.color, width=1, tags=self.tag)
+            pool.append([item, None])
+            self.created += 1
+
+    def update(self, x1, y1, x2, y2, rows, cols, gutter=0):
+        """Bring the overlay in line with a grid rectangle split into rows x cols
+
+        With a gutter between cells, the lines run down the middle of it.
+        """
+        bounds = (x1, y1, x2, y2, rows, cols, gutter)
+        if bounds == self.bounds:
+            return
+        previous, self.bounds = self.bounds, bounds
+
+        if self.outline is None:
+            self._create(x1, y1, x2, y2)
+        elif (previous[4:] == (rows, cols, gutter) and
+              previous[2] - previous[0] == x2 - x1 and previous[3] - previous[1] == y2 - y1):
+            # Pure translation: one Tk call moves every item
+            dx, dy = x1 - previous[0], y1 - previous[1]
+            self.canvas.move(self.tag, dx, dy)
+            self.moved += 1
+            for entry in self.vlines + self.hlines:
+                x_a, y_a, x_b, y_b = entry[1]
+                entry[1] = (x_a + dx, y_a + dy, x_b + dx, y_b + dy)
+            return
+
+        self.canvas.coords(self.outline, x1, y1, x2, y2)
+        self._resize_pool(self.vlines, cols - 1)
+        self._resize_pool(self.hlines, rows - 1)
+
+        pitch_x = (x2 - x1 + gutter) / cols
+        pitch_y = (y2 - y1 + gutter) / rows
+        for i, entry in enumerate(self.vlines, start=1):
+            x = x1 + i * pitch_x - gutter / 2
+            self._set_coords(entry, (x, y1, x, y2))
+        for i, entry in enumerate(self.hlines, start=1):
+            y = y1 + i * pitch_y - gutter / 2
+            self._set_coords(entry, (x1, y, x2, y))
+
+        positions = self._handle_positions(x1, y1, x2, y2)
+        for name, item in self.handles.items():
+            hx, hy = positions[name]
+            self.canvas.coords(item, hx, hy, hx + HANDLE_SIZE, hy + HANDLE_SIZE)
+
+    def _create(self, x1, y1, x2, y2):
+        self.outline = self.canvas.create_rectangle(x1, y1, x2, y2, outline=self.color,
+                                                    width=2, tags=self.tag)
+        if not self.show_handles:
+            self.created += 1
+            return
+        for name, (hx, hy) in self._handle_positions(x1, y1, x2, y2).items():
+            self.handles[name] = self.canvas.create_rectangle(
+                hx, hy, hx + HANDLE_SIZE, hy + HANDLE_SIZE,
+                fill=self.color, outline=self.handle_color, width=1,
+                tags=(self.tag, f"handle_{name}")
+            )
+        self.created += 1 + len(HANDLES)
+
+    def handle_at(self, x, y, slop=2):
+        """Name of the resize handle under a canvas point, or None
+
+        Computed from the grid rectangle, without asking the canvas.
+        """
+        if not self.handles or self.bounds is None:
+            return None
+        x1, y1, x2, y2 = self.bounds[:4]
+        for name, (hx, hy) in self._handle_positions(x1, y1, x2, y2).items():
+            if hx - slop <= x <= hx + HANDLE_SIZE + slop and hy - slop <= y <= hy + HANDLE_SIZE + slop:
+                return name
+        return None
+
+    def _handle_positions(self, x1, y1, x2, y2):
+        half = HANDLE_SIZE // 2
+        return {
+            "nw": (x1 - half, y1 - half),  # Top-left
+            "ne": (x2 - half, y1 - half),  # Top-right
+            "sw": (x1 - half, y2 - half),  # Bottom-left
+            "se": (x2 - half, y2 - half),  # Bottom-right
+            "n": ((x1 + x2) // 2 - half, y1 - half),  # Top
+            "s": ((x1 + x2) // 2 - half, y2 - half),  # Bottom
+            "w": (x1 - half, (y1 + y2) // 2 - half),  # Left
+            "e": (x2 - half, (y1 + y2) // 2 - half),  # Right
+        }
+
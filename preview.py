@@ -0,0 +1,88 @@
+"""
+Preview pyramid for SpriteCutter
+Keeps successive 2x reductions of the source image so the canvas can be
+redrawn at any zoom with only a small final resample.
+"""
+
+import math
+
+from PIL import Image
+
+from loader import REDUCIBLE_MODES
+
+
+class PreviewPyramid:
+    """Lazily built 2x reduction levels of a source image
+
+    Level 0 is the source itself, level n is 1/2**n of its size.  A missing
+    level is made from the nearest smaller-index level that already exists
+    with a single Image.reduce, which is a cheap box filter, and then kept
+    for the lifetime of the loaded image.  The source may also be a
+    memory-mapped image from loader.open_image, which reduces band by band.
+    """
+
+    def __init__(self, image, min_size=64):
+        self.image = image
+        self.min_size = min_size
+        self.levels = {0: image}
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def max_level(self):
+        return max(0, int(math.log2(max(1, min(self.size)))))
+
+    def level(self, index):
+        """Return reduction level index, building it if needed"""
+        index = max(0, min(index, self.max_level))
+        if index not in self.levels:
+            base_index = max(i for i in self.levels if i < index)
+            base = self.levels[base_index]
+            if isinstance(base, Image.Image) and base.mode not in REDUCIBLE_MODES:
+                # reduce() works on plain pixel data, not palettes or bitmaps
+                base = base.convert("RGBA")
+            self.levels[index] = base.reduce(2 ** (index - base_index))
+        return self.levels[index]
+
+    def add_level(self, index, image):
+        """Use an existing reduction, such as a saved thumbnail, as level index
+
+        Raises ValueError unless image has exactly that level's size.
+        """
+        factor = 2 ** index
+        expected = tuple(-(-side // factor) for side in self.size)
+        if index < 1 or tuple(image.size) != expected:
+            raise ValueError(f"A level {index} image must be {expected[0]}x{expected[1]} pixels")
+        self.levels[index] = image
+
+    def level_for_scale(self, scale):
+        """Index of the smallest level that is still at least scale x the source"""
+        if scale >= 1.0:
+            return 0
+        index = int(math.floor(math.log2(1.0 / scale)))
+        # Never go below min_size on the short side unless the source already is
+        while index > 0 and min(self.size) / (2 ** index) < self.min_size:
+            index -= 1
+        return index
+
+    def render(self, scale, resample=Image.Resampling.LANCZOS):
+        """Return the source image resized by scale
+
+        Downscales start from the nearest pyramid level; upscales use
+        nearest-neighbour so individual source pixels stay crisp.
+        """
+        width, height = self.size
+        target = (max(1, int(width * scale)), max(1, int(height * scale)))
+
+        if scale >= 1.0:
+            source = self.image.crop((0, 0) + self.size)
+            if target == self.size:
+                return source
+            return source.resize(target, Image.Resampling.NEAREST)
+
+        level = self.level(self.level_for_scale(scale))
+        if level.size == target:
+            return level.copy()
+        return level.resize(target, resample)
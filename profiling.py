@@ -0,0 +1,116 @@
+"""
+Export instrumentation for SpriteCutter
+Per-stage timings and throughput for slicing runs, written as a JSON
+trace that chrome://tracing or Perfetto can open, plus optional cProfile
+dumps, so slow storage can be told apart from slow encoding.
+"""
+
+import cProfile
+import json
+import os
+
+# Stages a slicing run reports, in pipeline order.  Worker stages (crop,
+# encode, write) add up across workers; the others run on the calling
+# thread.
+STAGES = ("inspect", "cache", "crop", "encode", "write", "archive", "progress")
+
+
+class ExportTrace:
+    """Timeline of one slicing run
+
+    The engine calls add_tile for every tile a worker produced and
+    add_span for work on the calling thread.  Times are time.perf_counter
+    values, which are comparable between worker processes on one machine.
+    """
+
+    def __init__(self):
+        self.tiles = []
+        self.spans = []
+        self.start = None
+        self.end = None
+        self.summary = {}
+
+    def begin(self, start):
+        self.start = start
+
+    def add_tile(self, path, size, timing):
+        """Record one tile; timing is (start, crop, encode, write, (pid, tid))"""
+        start, crop, encode, write, worker = timing
+        self.tiles.append({"file": path, "bytes": size, "start": start, "crop": crop,
+                           "encode": encode, "write": write, "worker": worker})
+
+    def add_span(self, stage, start, duration):
+        self.spans.append((stage, start, duration))
+
+    def finish(self, result, end):
+        self.end = end
+        self.summary = summarize(result)
+
+    def to_chrome(self):
+        """Trace Event Format dict; every stage is a complete ('X') event"""
+        origin = self.start or 0.0
+        events = []
+        own = (os.getpid(), 0)
+        for stage, start, duration in self.spans:
+            events.append(_event(stage, start - origin, duration, own))
+        for tile in self.tiles:
+            offset = tile["start"] - origin
+            args = {"file": tile["file"], "bytes": tile["bytes"]}
+            for stage in ("crop", "encode", "write"):
+                if tile[stage]:
+                    events.append(_event(stage, offset, tile[stage], tile["worker"], args))
+                    offset += tile[stage]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "summary": self.summary}
+
+    def write(self, path):
+        """Write the trace as JSON; per-tile records are under 'tiles'"""
+        data = self.to_chrome()
+        origin = self.start or 0.0
+        data["tiles"] = [dict(tile, start=tile["start"] - origin, worker=list(tile["worker"]))
+                         for tile in self.tiles]
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+
+def _event(name, start, duration, worker, args=None):
+    event = {"name": name, "ph": "X", "ts": round(start * 1e6, 1),
+             "dur": round(duration * 1e6, 1), "pid": worker[0], "tid": worker[1]}
+    if args:
+        event["args"] = args
+    return event
+
+
+def summarize(result):
+    """Throughput and stage totals of a SliceResult as a plain dict"""
+    elapsed = result.elapsed or 0.0
+    stages = {stage: round(seconds, 6) for stage, seconds in result.stages.items() if seconds}
+    return {
+        "tiles": result.saved,
+        "bytes": result.bytes_written,
+        "elapsed": round(elapsed, 6),
+        "tiles_per_second": round(result.saved / elapsed, 1) if elapsed else None,
+        "mb_per_second": round(result.bytes_written / 1e6 / elapsed, 2) if elapsed else None,
+        "stages": stages,
+    }
+
+
+def format_summary(result):
+    """Human readable throughput and stage breakdown, one item per line"""
+    summary = summarize(result)
+    lines = [f"{summary['tiles']} tiles, {summary['bytes'] / 1e6:.2f} MB in {summary['elapsed']:.2f}s"]
+    if summary["elapsed"]:
+        lines.append(f"{summary['tiles_per_second']:.0f} tiles/s, {summary['mb_per_second']:.2f} MB/s")
+    stages = summary["stages"]
+    if stages:
+        lines.append(", ".join(f"{stage} {stages[stage]:.2f}s" for stage in STAGES if stage in stages))
+    return "\n".join(lines)
+
+
+def profile_call(path, func, *args, **kwargs):
+    """Run func under cProfile, dump the stats to path and return its result"""
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args, **kwargs)
+    finally:
+        profile.dump_stats(path)
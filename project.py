@@ -0,0 +1,154 @@
+"""
+Project files for SpriteCutter
+Save the grid, regions and export settings of a sheet together with the
+source's content hash and a preview thumbnail, so reopening a big sheet
+shows it at once instead of decoding and resampling it again.
+"""
+
+import base64
+import io
+import json
+import os
+
+from PIL import Image
+
+from cache import file_digest
+from grid import GridSpec
+from regions import RegionLayout
+
+PROJECT_EXTENSION = ".spritecut"
+PROJECT_VERSION = 1
+
+# Longest edge of the saved preview thumbnail
+MAX_THUMBNAIL = 2048
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class Project:
+    """Everything needed to pick up work on one sheet where it was left
+
+    grid is a GridSpec in source pixels, regions a RegionLayout (or None)
+    and settings a plain dict of export options such as prefix and
+    naming_scheme.  The thumbnail is one PreviewPyramid level of the
+    source, kept with the level index it was taken from.
+    """
+
+    def __init__(self, source_path, grid=None, regions=None, settings=None,
+                 source_digest=None, source_stamp=None, thumbnail=None, thumbnail_level=None):
+        self.source_path = source_path
+        self.grid = grid
+        self.regions = regions
+        self.settings = settings or {}
+        self.source_digest = source_digest
+        self.source_stamp = source_stamp
+        self.thumbnail = thumbnail
+        self.thumbnail_level = thumbnail_level
+
+    @classmethod
+    def capture(cls, source_path, grid, regions=None, settings=None, pyramid=None, scale=1.0,
+                digest=None):
+        """Project for the current state; pyramid supplies the thumbnail
+
+        The level shown at scale is kept, or a smaller one if that level
+        would be larger than MAX_THUMBNAIL.  digest saves hashing the
+        source when the caller already knows it.
+        """
+        project = cls(source_path, grid, regions, settings,
+                      digest or file_digest(source_path), source_stamp(source_path))
+        if pyramid is not None:
+            index = max(1, pyramid.level_for_scale(scale))
+            while max(pyramid.size) / 2 ** index > MAX_THUMBNAIL and index < pyramid.max_level:
+                index += 1
+            if index <= pyramid.max_level:
+                project.thumbnail = pyramid.level(index)
+                project.thumbnail_level = index
+        return project
+
+    def source_changed(self):
+        """True if the source file is missing or its contents differ from when saved
+
+        Files with the same size and modification time are taken as
+        unchanged without reading them.
+        """
+        if not os.path.exists(self.source_path):
+            return True
+        if self.source_stamp is not None and source_stamp(self.source_path) == self.source_stamp:
+            return False
+        return file_digest(self.source_path) != self.source_digest
+
+    def seed_preview(self, pyramid):
+        """Put the thumbnail into a PreviewPyramid of the unchanged source
+
+        Returns True if it was used; the caller should check source_changed
+        first.
+        """
+        if self.thumbnail is None:
+            return False
+        try:
+            pyramid.add_level(self.thumbnail_level, self.thumbnail)
+        except ValueError:
+            return False
+        return True
+
+    def to_dict(self, base_dir=None):
+        """JSON-ready dict; the source path is stored relative to base_dir too"""
+        source = {"path": os.path.abspath(self.source_path), "digest": self.source_digest,
+                  "stamp": self.source_stamp}
+        if base_dir is not None:
+            source["relative"] = os.path.relpath(os.path.abspath(self.source_path), base_dir)
+        data = {
+            "version": PROJECT_VERSION,
+            "source": source,
+            "grid": self.grid.to_dict() if self.grid is not None else None,
+            "regions": self.regions.to_dict()["regions"] if self.regions else [],
+            "settings": self.settings,
+        }
+        if self.thumbnail is not None:
+            buffer = io.BytesIO()
+            self.thumbnail.save(buffer, "PNG", compress_level=1)
+            data["thumbnail"] = {"level": self.thumbnail_level,
+                                 "png": base64.b64encode(buffer.getvalue()).decode("ascii")}
+        return data
+
+    @classmethod
+    def from_dict(cls, data, base_dir=None):
+        if data.get("version", 1) > PROJECT_VERSION:
+            raise ValueError("The project was saved by a newer SpriteCutter")
+        source = data["source"]
+        path = source["path"]
+        # Projects moved together with their sheet still find it
+        if not os.path.exists(path) and base_dir is not None and source.get("relative"):
+            relative = os.path.join(base_dir, source["relative"])
+            if os.path.exists(relative):
+                path = relative
+
+        thumbnail = level = None
+        if data.get("thumbnail"):
+            thumbnail = Image.open(io.BytesIO(base64.b64decode(data["thumbnail"]["png"])))
+            thumbnail.load()
+            level = int(data["thumbnail"]["level"])
+
+        grid = GridSpec.from_dict(data["grid"]) if data.get("grid") else None
+        regions = RegionLayout.from_dict(data["regions"]) if data.get("regions") else None
+        return cls(path, grid, regions, data.get("settings"), source.get("digest"),
+                   source.get("stamp"), thumbnail, level)
+
+    def save(self, path):
+        data = self.to_dict(os.path.dirname(os.path.abspath(path)))
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Read a project file; raises ValueError if it is not one"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls.from_dict(data, os.path.dirname(os.path.abspath(path)))
+        except (KeyError, TypeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Not a SpriteCutter project: {path} ({e})")
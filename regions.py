@@ -0,0 +1,177 @@
+"""
+Multi-region layouts for SpriteCutter
+Sheets often pack several grids with different cell sizes side by side.
+A RegionLayout holds any number of named GridSpecs, exports them together
+and answers "what is under this point" through a bucket-grid index, so
+hit-testing does not slow down as regions are added.
+"""
+
+import json
+import re
+
+from grid import GridSpec, tile_filename
+
+
+class BucketIndex:
+    """Uniform grid of buckets mapping rectangles to keys
+
+    Every rectangle is listed in each bucket it overlaps, so a point query
+    only looks at the few rectangles sharing its bucket, whatever the
+    total number of rectangles.
+    """
+
+    def __init__(self, bucket_size=256):
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        self.boxes = {}
+
+    def _cells(self, box):
+        size = self.bucket_size
+        left, top, right, bottom = box
+        for by in range(int(top // size), int((bottom - 1) // size) + 1):
+            for bx in range(int(left // size), int((right - 1) // size) + 1):
+                yield bx, by
+
+    def insert(self, key, box):
+        """Add or move key's rectangle (left, top, right, bottom)"""
+        if key in self.boxes:
+            self.remove(key)
+        self.boxes[key] = box
+        for cell in self._cells(box):
+            self.buckets.setdefault(cell, []).append(key)
+
+    def remove(self, key):
+        box = self.boxes.pop(key, None)
+        if box is None:
+            return
+        for cell in self._cells(box):
+            bucket = self.buckets[cell]
+            bucket.remove(key)
+            if not bucket:
+                del self.buckets[cell]
+
+    def query_point(self, x, y):
+        """Keys whose rectangle contains the point, in insertion order"""
+        size = self.bucket_size
+        hits = []
+        for key in self.buckets.get((int(x // size), int(y // size)), ()):
+            left, top, right, bottom = self.boxes[key]
+            if left <= x < right and top <= y < bottom:
+                hits.append(key)
+        return hits
+
+    def query_rect(self, box):
+        """Keys whose rectangle overlaps box"""
+        left, top, right, bottom = box
+        hits = set()
+        for cell in self._cells(box):
+            for key in self.buckets.get(cell, ()):
+                other = self.boxes[key]
+                if other[0] < right and left < other[2] and other[1] < bottom and top < other[3]:
+                    hits.add(key)
+        return hits
+
+    def __len__(self):
+        return len(self.boxes)
+
+
+class RegionLayout:
+    """Named grid regions of one sheet, in source-image pixel coordinates
+
+    Regions are kept in the order they were added; where regions overlap,
+    the one added last is on top for hit-testing.
+    """
+
+    def __init__(self, bucket_size=256):
+        self.regions = {}
+        self.index = BucketIndex(bucket_size)
+
+    def add(self, name, spec):
+        """Add a region, or replace the grid of an existing one in place"""
+        name = name.strip()
+        if not name or not re.fullmatch(r"[\w.-]+", name):
+            raise ValueError(f"Region names may only use letters, digits, '_', '-' and '.': '{name}'")
+        self.regions[name] = spec
+        self.index.insert(name, spec.bounds)
+
+    def remove(self, name):
+        del self.regions[name]
+        self.index.remove(name)
+
+    def unique_name(self, base="region"):
+        """First of base_1, base_2, ... not used yet"""
+        number = len(self.regions) + 1
+        while f"{base}_{number}" in self.regions:
+            number += 1
+        return f"{base}_{number}"
+
+    def region_at(self, x, y, exclude=None):
+        """Name of the topmost region containing the point, or None"""
+        hits = [name for name in self.index.query_point(x, y) if name != exclude]
+        if not hits:
+            return None
+        if len(hits) == 1:
+            return hits[0]
+        order = {key: position for position, key in enumerate(self.regions)}
+        return max(hits, key=order.__getitem__)
+
+    def cell_at(self, x, y):
+        """(name, row, col) of the cell under the point, or None"""
+        name = self.region_at(x, y)
+        if name is None:
+            return None
+        cell = self.regions[name].cell_at(x, y)
+        return None if cell is None else (name, *cell)
+
+    @property
+    def total(self):
+        return sum(spec.total for spec in self.regions.values())
+
+    def plan_tiles(self, image_size, prefix="sprite", naming_scheme="row_col", extension=".png"):
+        """(row, col, box, filename) for the cells of every region
+
+        File names get the region name after the prefix, and sequential
+        numbers restart for each region.
+        """
+        image_width, image_height = image_size
+        prefix = prefix.strip() or "sprite"
+        tiles = []
+        for name, spec in self.regions.items():
+            count = 0
+            for row, col, box in spec.crop_boxes(image_width, image_height):
+                count += 1
+                filename = tile_filename(f"{prefix}_{name}", naming_scheme, row, col, count,
+                                         spec.total, extension)
+                tiles.append((row, col, box, filename))
+        return tiles
+
+    def to_dict(self):
+        return {"regions": [dict(spec.to_dict(), name=name) for name, spec in self.regions.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict; a bare list of regions is accepted too"""
+        entries = data["regions"] if isinstance(data, dict) else data
+        layout = cls()
+        for number, entry in enumerate(entries, start=1):
+            layout.add(str(entry.get("name") or f"region_{number}"), GridSpec.from_dict(entry))
+        return layout
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+
+    def __contains__(self, name):
+        return name in self.regions
+
+    def __iter__(self):
+        return iter(self.regions.items())
+
+    def __len__(self):
+        return len(self.regions)
@@ -0,0 +1,56 @@
+"""
+Frame scheduler for SpriteCutter
+Coalesces redraw requests from key presses and mouse motion so that at
+most one render of each kind runs per frame.
+"""
+
+from collections import OrderedDict
+
+
+class FrameScheduler:
+    """Run named update callbacks at most once per frame
+
+    Requesting a name that is already pending replaces its callback, so
+    the stale update is dropped and only the latest one runs.
+    """
+
+    def __init__(self, root, interval=16):
+        self.root = root
+        self.interval = interval  # Milliseconds per frame (~60 Hz)
+        self.pending = OrderedDict()
+        self.after_id = None
+        self.requested = 0
+        self.executed = 0
+        self.skipped = 0
+        self.frames = 0
+
+    def request(self, name, callback):
+        """Schedule callback for the next frame under the given name"""
+        self.requested += 1
+        if name in self.pending:
+            self.skipped += 1
+        self.pending[name] = callback
+        if self.after_id is None:
+            self.after_id = self.root.after(self.interval, self.flush)
+
+    def cancel(self, name):
+        """Drop a pending update without running it"""
+        if self.pending.pop(name, None) is not None:
+            self.skipped += 1
+
+    def flush(self):
+        """Run every pending update now"""
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        jobs, self.pending = self.pending, OrderedDict()
+        if not jobs:
+            return
+        self.frames += 1
+        for callback in jobs.values():
+            callback()
+            self.executed += 1
+
+    def stats(self):
+        return {"requested": self.requested, "executed": self.executed,
+                "skipped": self.skipped, "frames": self.frames}
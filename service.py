@@ -0,0 +1,370 @@
+"""
+Slicing service for SpriteCutter
+A long-running local HTTP server, on a TCP port or a Unix socket, that
+takes slice jobs as JSON.  Decoded sheets stay in an LRU cache bounded by
+a memory budget, so repeated jobs against the same sheet skip decoding,
+and the crops and encodes of every job share one worker pool.
+
+    POST /slice   run a job, see SliceService.run_job
+    GET  /stats   cache hit rate and job counts
+"""
+
+import contextlib
+import io
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+from archive import ArchiveWriter, archive_format
+from batch import load_sidecar
+from encoders import get_encoder
+from grid import grid_for_image, plan_tiles
+from loader import open_image
+from regions import RegionLayout
+from slicer import SliceEngine, slice_image
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Bytes of decoded pixels kept in the image cache
+DEFAULT_BUDGET = 1 << 30
+
+# Content types of archives returned in the response body
+ARCHIVE_TYPES = {"zip": "application/zip", "tar": "application/x-tar"}
+
+
+def decoded_size(image):
+    """Bytes Pillow holds for a decoded image
+
+    Multi-band modes are stored as four bytes per pixel, one-band modes
+    with their own pixel size.
+    """
+    width, height = image.size
+    bands = len(image.getbands())
+    if bands > 1:
+        return width * height * 4
+    if image.mode in ("I", "F"):
+        return width * height * 4
+    if image.mode.startswith("I;16"):
+        return width * height * 2
+    return width * height
+
+
+class ImageCache:
+    """Least-recently-used cache of decoded source images within a byte budget
+
+    Entries are keyed by absolute path and checked against the file's
+    size and modification time on every lookup, so an edited sheet is
+    decoded again.  Sheets bigger than the whole budget are opened for the
+    job alone (memory-mapped where the format allows) and not cached.
+    An evicted image stays alive until the jobs still using it finish.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.items = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, path, stamp):
+        with self._lock:
+            entry = self.items.get(path)
+            if entry is not None and entry[0] == stamp:
+                self.items.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(path)
+            self.misses += 1
+            return None
+
+    def _remove(self, path):
+        _, _, size = self.items.pop(path)
+        self.bytes -= size
+
+    def _store(self, path, stamp, image, size):
+        with self._lock:
+            if path in self.items:
+                self._remove(path)
+            self.items[path] = (stamp, image, size)
+            self.bytes += size
+            while self.bytes > self.budget and len(self.items) > 1:
+                self._remove(next(iter(self.items)))
+                self.evictions += 1
+
+    @contextlib.contextmanager
+    def open(self, path):
+        """Yield (image, hit) for a source file; hit is True if decoding was skipped"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        image = self._lookup(path, stamp)
+        if image is not None:
+            yield image, True
+            return
+
+        image = Image.open(path)
+        size = decoded_size(image)
+        if size > self.budget:
+            image.close()
+            with open_image(path) as image:
+                yield image, False
+            return
+        image.load()
+        self._store(path, stamp, image, size)
+        yield image, False
+
+    def clear(self):
+        with self._lock:
+            self.items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "entries": len(self.items), "bytes": self.bytes, "budget": self.budget}
+
+    def __len__(self):
+        return len(self.items)
+
+
+class SliceService:
+    """Runs slice jobs against cached decoded sheets on one shared worker pool
+
+    Jobs may run concurrently, each from its own request thread; they
+    interleave their tiles on the pool rather than each starting workers
+    of their own.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, workers=None):
+        self.cache = ImageCache(budget)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.engine = SliceEngine(workers=self.workers, executor=self.executor)
+        self.jobs = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _spec(self, job, image):
+        if job.get("regions") is not None:
+            return RegionLayout.from_dict(job["regions"])
+        template = dict(load_sidecar(job["source"]), **(job.get("grid") or {}))
+        return grid_for_image(template, image.size)
+
+    def run_job(self, job):
+        """Slice job["source"] and return (summary dict, archive bytes or None)
+
+        The grid is job["grid"], a partial spec as for grid.grid_for_image,
+        merged over the sheet's '.grid.json' sidecar, or job["regions"] in
+        the regions file format.  Tiles are written to job["output"], a
+        directory or archive path; without one, job["archive"] names an
+        archive type ('zip', 'tar', 'tar.gz', ...) whose bytes are returned
+        instead.  prefix, naming, encoder, skip_empty, dedupe, manifest,
+        compress_level and store (stored) work as for slicer.slice_image.
+        """
+        if "source" not in job:
+            raise ValueError("job needs a source")
+        output = job.get("output")
+        archive = job.get("archive")
+        if output is None and archive is None:
+            raise ValueError("job needs an output path or an archive type")
+        try:
+            with self.cache.open(job["source"]) as (image, hit):
+                spec = self._spec(job, image)
+                prefix = job.get("prefix") or os.path.splitext(os.path.basename(job["source"]))[0]
+                options = dict(naming_scheme=job.get("naming", "row_col"),
+                               skip_empty=bool(job.get("skip_empty")),
+                               dedupe=bool(job.get("dedupe")), encoder=job.get("encoder"))
+                if output is not None:
+                    result = slice_image(image, spec, output, prefix=prefix,
+                                         manifest=bool(job.get("manifest")),
+                                         compress_level=job.get("compress_level"),
+                                         stored=bool(job.get("store")),
+                                         engine=self.engine, **options)
+                    data = None
+                else:
+                    result, data = self._slice_to_bytes(image, spec, prefix, archive,
+                                                        job.get("compress_level"),
+                                                        bool(job.get("store")), **options)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        with self._lock:
+            self.jobs += 1
+
+        summary = {"source": job["source"], "output": output, "saved": result.saved,
+                   "total": result.total, "empty": result.empty,
+                   "duplicates": result.duplicates, "elapsed": round(result.elapsed, 4),
+                   "decoded": not hit}
+        if output is not None:
+            summary["files"] = result.outputs
+        return summary, data
+
+    def _slice_to_bytes(self, image, spec, prefix, archive, compress_level=None, stored=False,
+                        naming_scheme="row_col", skip_empty=False, dedupe=False, encoder=None):
+        """Encode every tile into an in-memory archive of the given type"""
+        name = f"{prefix}.{str(archive).lstrip('.')}"
+        if archive_format(name) is None:
+            raise ValueError(f"Unsupported archive type: {archive}")
+        encoder = get_encoder(encoder)
+        tiles = plan_tiles(spec, image.size, prefix, naming_scheme, encoder.extension)
+        buffer = io.BytesIO()
+        with ArchiveWriter(name, compress_level, stored, fileobj=buffer) as writer:
+            result = self.engine.run(image, [(box, filename) for _, _, box, filename in tiles],
+                                     skip_empty=skip_empty, dedupe=dedupe, sink=writer,
+                                     encoder=encoder)
+        return result, buffer.getvalue()
+
+    def stats(self):
+        with self._lock:
+            return {"jobs": self.jobs, "failures": self.failures, "workers": self.workers,
+                    "cache": self.cache.stats()}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.cache.clear()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a SliceService (server.service)"""
+
+    server_version = "SpriteCutter"
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data):
+        self._send(status, (json.dumps(data) + "\n").encode())
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.service.stats())
+        else:
+            self._send_json(404, {"error": f"no such endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/slice":
+            self._send_json(404, {"error": f"no such endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            job = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(job, dict):
+                raise ValueError("job must be a JSON object")
+            summary, data = self.server.service.run_job(job)
+        except FileNotFoundError as e:
+            self._send_json(404, {"error": str(e)})
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            if data is None:
+                self._send_json(200, summary)
+            else:
+                kind, _ = archive_format(f".{str(job['archive']).lstrip('.')}")
+                # Escaped to ASCII, as header values must be latin-1
+                self._send(200, data, ARCHIVE_TYPES[kind],
+                           {"X-SpriteCutter-Result": json.dumps(summary, ensure_ascii=True)})
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class UnixServiceHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def is_loopback(host):
+    """Whether every address host resolves to is a loopback address"""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return bool(infos) and all(ipaddress.ip_address(info[4][0].split("%")[0]).is_loopback
+                               for info in infos)
+
+
+def remove_stale_socket(path):
+    """Delete a Unix socket left behind at path; refuse to touch anything else"""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError(f"{path} exists and is not a socket")
+    os.remove(path)
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False,
+                allow_remote=False):
+    """HTTP server for service on host:port, or on a Unix socket at socket_path
+
+    Jobs read and write any path the service's user can, without any
+    authentication, so TCP servers only listen on loopback addresses
+    unless allow_remote is set, and Unix sockets are only accessible to
+    their owner.
+    """
+    if socket_path:
+        remove_stale_socket(socket_path)
+        server = UnixServiceHTTPServer(socket_path, ServiceHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        if not allow_remote and not is_loopback(host):
+            raise ValueError(f"refusing to listen on {host}, which is not a loopback address; "
+                             "the service has no authentication")
+        server = ServiceHTTPServer((host, port), ServiceHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, budget=DEFAULT_BUDGET,
+          workers=None, verbose=False, on_ready=None, allow_remote=False):
+    """Run a slicing service until interrupted"""
+    service = SliceService(budget, workers)
+    try:
+        server = make_server(service, host, port, socket_path, verbose, allow_remote)
+    except Exception:
+        service.close()
+        raise
+    if on_ready:
+        on_ready(server)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path:
+            with contextlib.suppress(OSError, ValueError):
+                remove_stale_socket(socket_path)
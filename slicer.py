@@ -0,0 +1,560 @@
+"""
+Slicing engine for SpriteCutter
+Crops and encodes grid cells on a thread or process pool so large exports
+use every core and can run off the Tk main thread.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import (Future, ThreadPoolExecutor, ProcessPoolExecutor,
+                                FIRST_COMPLETED, wait)
+
+from archive import ArchiveWriter, is_archive_path
+from encoders import get_encoder, has_alpha
+from grid import GridSpec, plan_tiles
+from loader import open_image
+from profiling import STAGES, ExportTrace, profile_call
+
+
+class SliceResult:
+    """Outcome of a slicing run
+
+    outputs has one entry per task: the file holding that cell (another
+    cell's file for duplicates), or None if the cell was skipped as empty
+    or never written because the run was cancelled.
+
+    stages maps each name in profiling.STAGES to seconds.  Worker stages
+    (crop, encode, write) add up across workers, so with several workers
+    they can exceed elapsed, the wall-clock time of the whole run.
+    """
+
+    def __init__(self, saved, total, cancelled=False, outputs=None, empty=0, duplicates=0,
+                 encoder=None, bytes_written=0, stages=None, elapsed=0.0, cached=0):
+        self.saved = saved
+        self.total = total
+        self.cancelled = cancelled
+        self.outputs = outputs if outputs is not None else []
+        self.empty = empty
+        self.duplicates = duplicates
+        self.encoder = encoder
+        self.bytes_written = bytes_written
+        self.stages = stages if stages is not None else dict.fromkeys(STAGES, 0.0)
+        self.elapsed = elapsed
+        self.cached = cached
+
+    @property
+    def encode_time(self):
+        return self.stages.get("encode", 0.0)
+
+    def __repr__(self):
+        return (f"SliceResult(saved={self.saved}, total={self.total}, "
+                f"cancelled={self.cancelled}, empty={self.empty}, "
+                f"duplicates={self.duplicates})")
+
+
+def save_tile(image, box, filepath, encoder=None):
+    """Crop a single cell out of the image and write it (as PNG by default)"""
+    _write_tile(image, box, filepath, get_encoder(encoder))
+    return filepath
+
+
+def encode_tile(image, box, encoder=None):
+    """Crop a single cell and return it encoded (as PNG by default)"""
+    return get_encoder(encoder).encode(image.crop(box))
+
+
+def _encode_timed(image, box, encoder):
+    """Return (data, timing) for one cell
+
+    timing is (start, crop seconds, encode seconds, write seconds, worker)
+    where worker is (process id, thread id).
+    """
+    start = time.perf_counter()
+    tile = image.crop(box)
+    cropped = time.perf_counter()
+    data = encoder.encode(tile)
+    return data, (start, cropped - start, time.perf_counter() - cropped, 0.0,
+                  (os.getpid(), threading.get_native_id()))
+
+
+def write_bytes(filepath, data):
+    """Write data to a new file at filepath, replacing any file already there
+
+    The old file is unlinked rather than written through, so a hard link
+    to it elsewhere keeps its contents.
+    """
+    if os.path.lexists(filepath):
+        os.remove(filepath)
+    with open(filepath, "wb") as f:
+        f.write(data)
+
+
+def _write_tile(image, box, filepath, encoder):
+    """Return (filepath, bytes written, timing) for one cell, see _encode_timed"""
+    data, (start, crop, encode, _, worker) = _encode_timed(image, box, encoder)
+    written = time.perf_counter()
+    write_bytes(filepath, data)
+    return filepath, len(data), (start, crop, encode, time.perf_counter() - written, worker)
+
+
+def is_empty_tile(tile, background=None):
+    """True if a cropped tile is fully transparent or one flat background colour"""
+    if tile.width == 0 or tile.height == 0:
+        return True
+    if "A" in tile.getbands():
+        if tile.getchannel("A").getextrema()[1] == 0:
+            return True
+    elif has_alpha(tile):
+        if tile.convert("RGBA").getchannel("A").getextrema()[1] == 0:
+            return True
+    if background is not None:
+        colors = tile.convert("RGBA").getcolors(1)
+        if colors and colors[0][1][:len(background)] == tuple(background):
+            return True
+    return False
+
+
+def tile_digest(tile):
+    """Content hash of a tile
+
+    The digest covers the mode, size and raw pixel bytes, so identical
+    cells hash the same wherever they sit in the sheet.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{tile.mode}:{tile.width}x{tile.height}:".encode())
+    digest.update(tile.tobytes())
+    return digest.hexdigest()
+
+
+def inspect_tile(image, box, background=None):
+    """Return (digest, empty) for one cell"""
+    tile = image.crop(box)
+    return tile_digest(tile), is_empty_tile(tile, background)
+
+
+def _frame_of(image):
+    """Frame an animated or multi-page image is seeked to, 0 for anything else"""
+    return image.tell() if hasattr(image, "tell") else 0
+
+
+# Per-process source image, opened once by the pool initializer so that
+# tasks only need to carry a crop box and a file path across the pipe.
+_worker_image = None
+
+
+def _init_worker(source_path, frame=0):
+    global _worker_image
+    _worker_image = open_image(source_path)
+    if frame:
+        _worker_image.seek(frame)
+    _worker_image.load()
+
+
+def _apply_in_worker(func, args):
+    return func(_worker_image, *args)
+
+
+class InlineExecutor:
+    """Executor that runs each task immediately on the calling thread
+
+    Used when profiling, so cProfile sees the crop and encode calls too.
+    """
+
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class SliceEngine:
+    """Run crop-and-save tasks for a list of crop boxes on a worker pool
+
+    Threads share the already-decoded image; Pillow releases the GIL while
+    cropping and encoding, so throughput scales with cores.  Processes each
+    decode their own copy of the source file, which costs memory per worker
+    but sidesteps the GIL entirely.
+
+    executor is an optional long-lived ThreadPoolExecutor shared between
+    runs, e.g. by the jobs of the slicing service; it is left running
+    when a run ends.
+    """
+
+    def __init__(self, workers=None, use_processes=False, inline=False, executor=None):
+        self.workers = 1 if inline else max(1, workers or os.cpu_count() or 1)
+        self.use_processes = use_processes
+        self.inline = inline
+        self.executor = executor
+
+    def _open_pool(self, image, source_path):
+        """Return (executor, submit) where submit(func, *args) runs func(image, *args)"""
+        if self.inline:
+            image.load()
+            executor = InlineExecutor()
+            return executor, lambda func, *args: executor.submit(func, image, *args)
+
+        if self.use_processes and source_path:
+            executor = ProcessPoolExecutor(max_workers=self.workers,
+                                           initializer=_init_worker,
+                                           initargs=(source_path, _frame_of(image)))
+            return executor, lambda func, *args: executor.submit(_apply_in_worker, func, args)
+
+        # Decode up front so worker threads never race on the lazy load;
+        # memory-mapped images decode each crop on demand instead
+        image.load()
+        executor = self.executor or ThreadPoolExecutor(max_workers=self.workers)
+        return executor, lambda func, *args: executor.submit(func, image, *args)
+
+    def _map(self, submit, func, jobs, on_done, cancel_event):
+        """Run func over (index, args) jobs, calling on_done(index, value)
+
+        Keeps a bounded number of jobs in flight so cancellation is prompt
+        and the pending queue does not grow with the grid size.  Returns
+        True if the run was cancelled; jobs already running still finish so
+        the results match the files on disk.
+        """
+        max_pending = self.workers * 2
+        pending = {}
+        jobs = iter(jobs)
+        exhausted = False
+        cancelled = False
+
+        while not exhausted or pending:
+            if not exhausted and cancel_event is not None and cancel_event.is_set():
+                cancelled = exhausted = True
+
+            while not exhausted and len(pending) < max_pending:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                    break
+                index, args = job
+                pending[submit(func, *args)] = index
+
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                on_done(pending.pop(future), future.result())
+
+        return cancelled
+
+    def run(self, image, tasks, source_path=None, progress=None, cancel_event=None,
+            skip_empty=False, dedupe=False, background=None, sink=None, encoder=None,
+            cache=None, trace=None, inspector=None):
+        """Crop and save every (box, filepath) task
+
+        progress is called as progress(done, total) from the calling thread.
+        Setting cancel_event stops new tasks from being scheduled; tasks that
+        are already running are allowed to finish.
+
+        With skip_empty, fully transparent cells (or cells of one flat
+        background colour) are not written.  With dedupe, pixel-identical
+        cells are written once and the repeats point at the first file.
+        Both need every cell hashed first, which progress counts as extra
+        steps.  inspector is an optional function returning the (digest,
+        empty) pair of every task at once, or None where it cannot, in which
+        case the workers inspect cropped cells.
+
+        With a sink such as an ArchiveWriter, workers only encode and each
+        tile is handed to sink.add(filepath, data) on the calling thread, so
+        nothing is written to output files directly.
+
+        encoder is a preset name or Encoder from encoders.PRESETS; the
+        default writes PNG with Pillow's default settings.
+
+        With an ExportCache and a source_path, cells encoded by an earlier
+        run with the same source contents, crop box and encoder are taken
+        from the cache instead of being encoded again.
+
+        Per-stage timings always end up in the result's stages; pass a
+        profiling.ExportTrace as trace to also keep a timeline of every tile.
+        """
+        started = time.perf_counter()
+        encoder = get_encoder(encoder)
+        total = len(tasks)
+        outputs = [None] * total
+        if total == 0:
+            return SliceResult(0, 0, outputs=outputs)
+        if trace is not None:
+            trace.begin(started)
+
+        inspect = skip_empty or dedupe
+        stages = dict.fromkeys(STAGES, 0.0)
+        counts = {"done": 0, "total": total * 2 if inspect else total, "saved": 0,
+                  "bytes": 0, "cached": 0}
+
+        def advance():
+            counts["done"] += 1
+            if progress:
+                start = time.perf_counter()
+                progress(counts["done"], counts["total"])
+                stages["progress"] += time.perf_counter() - start
+
+        def span(stage, start):
+            duration = time.perf_counter() - start
+            stages[stage] += duration
+            if trace is not None:
+                trace.add_span(stage, start, duration)
+
+        def finish(result):
+            # Repeats hold the index of their first occurrence until now
+            for index, output in enumerate(outputs):
+                if isinstance(output, int):
+                    outputs[index] = outputs[output]
+            result.stages = stages
+            if trace is not None:
+                trace.finish(result, time.perf_counter())
+            return result
+
+        executor, submit = self._open_pool(image, source_path)
+        try:
+            # Pass 1: hash and classify every cell, then decide what to store
+            store = range(total)
+            empty = duplicates = 0
+            if inspect:
+                inspect_start = time.perf_counter()
+                inspected = inspector() if inspector is not None else None
+                if inspected is not None:
+                    counts["done"] = total - 1
+                    advance()
+                else:
+                    inspected = [None] * total
+
+                    def on_inspected(index, value):
+                        inspected[index] = value
+                        advance()
+
+                    jobs = ((i, (box, background)) for i, (box, _) in enumerate(tasks))
+                    if self._map(submit, inspect_tile, jobs, on_inspected, cancel_event):
+                        return finish(SliceResult(0, total, True, outputs, encoder=encoder.name,
+                                                  elapsed=time.perf_counter() - started))
+
+                store = []
+                first_by_digest = {}
+                for index, (digest, is_empty) in enumerate(inspected):
+                    if skip_empty and is_empty:
+                        empty += 1
+                    elif dedupe and digest in first_by_digest:
+                        outputs[index] = first_by_digest[digest]
+                        duplicates += 1
+                    else:
+                        first_by_digest.setdefault(digest, index)
+                        store.append(index)
+                counts["total"] = total + len(store)
+                span("inspect", inspect_start)
+
+            # Pass 2: encode and write the cells being stored
+            def on_saved(index, path, size, timing=None):
+                outputs[index] = path
+                counts["saved"] += 1
+                counts["bytes"] += size
+                if timing is not None:
+                    stages["crop"] += timing[1]
+                    stages["encode"] += timing[2]
+                    stages["write"] += timing[3]
+                    if trace is not None:
+                        trace.add_tile(path, size, timing)
+                advance()
+
+            keys = {}
+            if cache is not None and source_path:
+                cache_start = time.perf_counter()
+                store = self._take_cached(image, cache, source_path, tasks, store, encoder,
+                                          sink, keys, on_saved, cancel_event)
+                span("cache", cache_start)
+                if store is None:
+                    return finish(SliceResult(counts["saved"], total, True, outputs,
+                                              encoder=encoder.name,
+                                              elapsed=time.perf_counter() - started))
+                counts["cached"] = counts["saved"]
+
+            if sink is None:
+                def on_written(index, value):
+                    if index in keys:
+                        cache_start = time.perf_counter()
+                        cache.store(keys[index], encoder.extension, value[0])
+                        stages["cache"] += time.perf_counter() - cache_start
+                    on_saved(index, *value)
+
+                jobs = ((i, (*tasks[i], encoder)) for i in store)
+                cancelled = self._map(submit, _write_tile, jobs, on_written, cancel_event)
+            else:
+                def on_encoded(index, value):
+                    data, timing = value
+                    name = tasks[index][1]
+                    archive_start = time.perf_counter()
+                    sink.add(name, data)
+                    span("archive", archive_start)
+                    if index in keys:
+                        cache.store_bytes(keys[index], encoder.extension, data)
+                    on_saved(index, name, len(data), timing)
+
+                jobs = ((i, (tasks[i][0], encoder)) for i in store)
+                cancelled = self._map(submit, _encode_timed, jobs, on_encoded, cancel_event)
+
+            if keys:
+                # New tiles went in, so the cache may have outgrown its limit
+                cache_start = time.perf_counter()
+                cache.trim()
+                span("cache", cache_start)
+        finally:
+            if executor is not self.executor:
+                executor.shutdown(wait=True)
+
+        return finish(SliceResult(counts["saved"], total, cancelled, outputs, empty, duplicates,
+                                  encoder.name, counts["bytes"], stages,
+                                  time.perf_counter() - started, counts["cached"]))
+
+    def _take_cached(self, image, cache, source_path, tasks, store, encoder, sink, keys,
+                     on_saved, cancel_event):
+        """Fill cells from the cache and return the indices still to encode
+
+        Cache keys of the remaining cells are put in keys so they can be
+        added once encoded.  Returns None if cancelled.
+        """
+        source = cache.source_digest(source_path)
+        # Frames of animated and multi-page sheets share the source hash
+        frame = _frame_of(image)
+        remaining = []
+        for index in store:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            box, path = tasks[index]
+            key = cache.key(source, box, encoder, frame)
+            data = cache.lookup(key, encoder.extension)
+            if data is None:
+                keys[index] = key
+                remaining.append(index)
+            else:
+                if sink is None:
+                    write_bytes(path, data)
+                else:
+                    sink.add(path, data)
+                on_saved(index, path, len(data))
+        return remaining
+
+
+def slice_image(source, spec, output_dir, prefix="sprite", naming_scheme="row_col",
+                workers=None, use_processes=False, progress=None, cancel_event=None,
+                skip_empty=False, dedupe=False, background=None, manifest=False,
+                compress_level=None, stored=False, encoder=None, cache=None,
+                trace=None, profile=None, engine=None):
+    """Slice an image (or the path to one) with a GridSpec into output_dir
+
+    This is the headless counterpart of the GUI's "Save Sliced Images".
+    With manifest set, a JSON file mapping every cell to its stored image
+    is written alongside the tiles.
+
+    If output_dir names an archive ('.zip', '.tar', '.tar.gz', ...) the
+    tiles are streamed into it instead, using compress_level or no
+    compression at all with stored; see archive.ArchiveWriter.  encoder
+    picks the output format preset, see encoders.PRESETS.  cache is an
+    ExportCache that lets unchanged cells skip encoding.
+
+    trace is a path to write a JSON timeline of the run to (see
+    profiling.ExportTrace).  profile is a path for a cProfile dump; the
+    tiles are then processed one at a time on the calling thread so the
+    profile covers cropping and encoding as well.  engine is a SliceEngine
+    to use instead of a new one sized by workers.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        source_path = os.fspath(source)
+        image = open_image(source_path)
+    else:
+        image = source
+        source_path = getattr(image, "filename", None) or None
+
+    encoder = get_encoder(encoder)
+    tiles = plan_tiles(spec, image.size, prefix, naming_scheme, encoder.extension)
+    if engine is None or profile:
+        engine = SliceEngine(workers=workers, use_processes=use_processes, inline=bool(profile))
+    export_trace = ExportTrace() if trace else None
+    options = dict(source_path=source_path, progress=progress, cancel_event=cancel_event,
+                   skip_empty=skip_empty, dedupe=dedupe, background=background,
+                   encoder=encoder, cache=cache, trace=export_trace)
+
+    if (skip_empty or dedupe) and isinstance(spec, GridSpec):
+        # Classify every cell from array views of one buffer instead of
+        # cropping each one; without NumPy the workers inspect crops
+        try:
+            from tileview import inspect_grid
+        except ImportError:
+            pass
+        else:
+            options["inspector"] = lambda: inspect_grid(image, spec, background)
+
+    def run(tasks, **extra):
+        if profile:
+            return profile_call(profile, engine.run, image, tasks, **options, **extra)
+        return engine.run(image, tasks, **options, **extra)
+
+    if is_archive_path(output_dir):
+        parent = os.path.dirname(os.path.abspath(output_dir))
+        os.makedirs(parent, exist_ok=True)
+        tasks = [(box, filename) for _, _, box, filename in tiles]
+        with ArchiveWriter(output_dir, compress_level, stored) as archive:
+            result = run(tasks, sink=archive)
+            if manifest and not result.cancelled:
+                data = json.dumps(build_manifest(spec, tiles, result, source_path), indent=2)
+                archive.add(manifest_name(prefix), data.encode())
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        tasks = [(box, os.path.join(output_dir, filename)) for _, _, box, filename in tiles]
+        result = run(tasks)
+        if manifest and not result.cancelled:
+            write_manifest(output_dir, prefix, spec, tiles, result, source_path)
+
+    if export_trace is not None:
+        export_trace.write(trace)
+    return result
+
+
+def manifest_name(prefix):
+    return f"{prefix}_manifest.json"
+
+
+def build_manifest(spec, tiles, result, source_path=None, output_dir=None):
+    """Manifest dict mapping every (row, col) to its stored file
+
+    Files are given relative to output_dir, or as stored if it is None;
+    empty cells map to null.  A loader can use the file names to share one
+    texture between repeats.
+    """
+    cells = []
+    for (row, col, box, _), output in zip(tiles, result.outputs):
+        if output and output_dir is not None:
+            output = os.path.relpath(output, output_dir)
+        cells.append({
+            "row": row,
+            "col": col,
+            "box": list(box),
+            "file": output,
+        })
+
+    manifest = {
+        "source": os.path.basename(source_path) if source_path else None,
+        "grid": spec.to_dict(),
+        "stored": result.saved,
+        "empty": result.empty,
+        "duplicates": result.duplicates,
+        "cells": cells,
+    }
+    return manifest
+
+
+def write_manifest(output_dir, prefix, spec, tiles, result, source_path=None):
+    """Write '<prefix>_manifest.json' into output_dir, see build_manifest"""
+    manifest = build_manifest(spec, tiles, result, source_path, output_dir)
+    path = os.path.join(output_dir, manifest_name(prefix))
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return path
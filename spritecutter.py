@@ -3,14 +3,39 @@ SpriteCutter - A GUI application for slicing images into grids
 Allows users to drag a resizable grid across an image and slice it into multiple images.
 """
 
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk, ImageDraw
 import os
+import sys
 import math
+import threading
+
+# Tkinter is only needed for the GUI; the command line works without it
+try:
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+    from tiles import TiledView
+    from loupe import MAGNIFICATIONS, Loupe
+except ImportError:
+    tk = None
+
+from grid import GridSpec, naming_example
+from loader import open_image
+from overlay import GridOverlay
+from scheduler import FrameScheduler
+from preview import PreviewPyramid
+from slicer import slice_image
+from archive import is_archive_path
+from encoders import DEFAULT_PRESET, PRESETS, available_presets
+from cache import ExportCache
+from profiling import format_summary
+from regions import RegionLayout
+from frames import ANIMATION_FORMATS, frame_count, slice_frames
+from project import PROJECT_EXTENSION, Project
 
 
 class SpriteCutter:
+    ZOOM_STEP = 1.25
+    MAX_ZOOM = 32.0
+    
     def __init__(self, root):
         self.root = root
         self.root.title("SpriteCutter - Image Grid Slicer")
@@ -18,9 +43,13 @@ class SpriteCutter:
         
         # Initialize variables
         self.image = None
-        self.display_image = None
-        self.canvas_image = None
+        self.image_path = None
+        self.frame_index = tk.IntVar(value=0)  # Frame shown of multi-frame images
+        self.view = None  # Tiled view of the loaded image
+        self.preview = None
         self.image_scale = 1.0
+        self.zoom = None  # None fits the image to the canvas
+        self.loupe_zoom = tk.IntVar(value=4)  # Loupe pixels per source pixel
         self.grid_x = 50
         self.grid_y = 50
         self.grid_width = 200
@@ -37,11 +66,48 @@ class SpriteCutter:
         self.cell_height = tk.IntVar(value=100)
         self.maintain_aspect = tk.BooleanVar(value=False)
         self.aspect_ratio = tk.DoubleVar(value=1.0)
+        self.gutter = tk.IntVar(value=0)  # Source pixels between cells
+        self.cell_padding = tk.IntVar(value=0)  # Source pixels cut from every cell edge
+        
+        # Named grid regions; the active one is edited through the grid above
+        self.regions = RegionLayout()
+        self.active_region = None
+        self.region_overlays = {}
+        
+        # Sprites found on irregular sheets; exported instead of the grid
+        self.sprites = None
+        
+        # Grid from an opened project, placed once the image is on screen
+        self.pending_grid = None
         
         # File naming
         self.filename_prefix = tk.StringVar(value="sprite")
         self.naming_scheme = tk.StringVar(value="row_col")  # "row_col" or "sequential"
         
+        # Export settings
+        self.export_workers = tk.IntVar(value=os.cpu_count() or 1)
+        self.use_processes = tk.BooleanVar(value=False)
+        self.skip_empty = tk.BooleanVar(value=False)
+        self.dedupe_tiles = tk.BooleanVar(value=False)
+        self.pack_atlas = tk.BooleanVar(value=False)
+        self.write_tensor = tk.BooleanVar(value=False)
+        self.save_archive = tk.BooleanVar(value=False)
+        self.store_archive = tk.BooleanVar(value=True)  # Zip tiles without deflating them again
+        self.encoder_preset = tk.StringVar(value=DEFAULT_PRESET)
+        self.use_cache = tk.BooleanVar(value=True)
+        self.write_trace = tk.BooleanVar(value=False)
+        self.frame_export = tk.StringVar(value="Current frame")
+        self.animation_format = tk.StringVar(value="apng")
+        self.export_cache = ExportCache()
+        self.export_thread = None
+        self.export_cancel = None
+        self.export_progress = (0, 0)
+        self.export_outcome = None
+        self.released_images = []  # Replaced images a running export may still read
+        
+        # Grid, info and cursor updates are coalesced to one render per frame
+        self.scheduler = FrameScheduler(self.root)
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -69,6 +135,11 @@ class SpriteCutter:
         
         ttk.Button(file_frame, text="Load Image", command=self.load_image).pack(fill=tk.X, pady=2)
         
+        project_frame = ttk.Frame(file_frame)
+        project_frame.pack(fill=tk.X, pady=2)
+        ttk.Button(project_frame, text="Open Project", command=self.open_project).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(project_frame, text="Save Project", command=self.save_project).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        
         # Filename prefix
         prefix_frame = ttk.Frame(file_frame)
         prefix_frame.pack(fill=tk.X, pady=2)
@@ -90,7 +161,63 @@ class SpriteCutter:
         ttk.Radiobutton(naming_frame, text="Sequential Number (prefix_001.png)", 
                        variable=self.naming_scheme, value="sequential").pack(anchor=tk.W)
         
-        ttk.Button(file_frame, text="Save Sliced Images", command=self.save_sliced_images).pack(fill=tk.X, pady=2)
+        # Export workers
+        workers_frame = ttk.Frame(file_frame)
+        workers_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(workers_frame, text="Workers:").pack(side=tk.LEFT)
+        ttk.Spinbox(workers_frame, from_=1, to=64, textvariable=self.export_workers, width=5).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Checkbutton(workers_frame, text="Processes", variable=self.use_processes).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Output format preset
+        encoder_frame = ttk.Frame(file_frame)
+        encoder_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(encoder_frame, text="Format:").pack(side=tk.LEFT)
+        ttk.Combobox(encoder_frame, textvariable=self.encoder_preset, values=available_presets(),
+                     state="readonly", width=12).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Empty and duplicate tile elimination
+        ttk.Checkbutton(file_frame, text="Skip empty tiles", variable=self.skip_empty).pack(anchor=tk.W)
+        ttk.Checkbutton(file_frame, text="Store duplicate tiles once", variable=self.dedupe_tiles).pack(anchor=tk.W)
+        ttk.Checkbutton(file_frame, text="Pack into texture atlas", variable=self.pack_atlas).pack(anchor=tk.W)
+        ttk.Checkbutton(file_frame, text="Write one tile array (.npy)", variable=self.write_tensor).pack(anchor=tk.W)
+        ttk.Checkbutton(file_frame, text="Save into one archive (.zip/.tar)", variable=self.save_archive).pack(anchor=tk.W)
+        ttk.Checkbutton(file_frame, text="Store zipped tiles uncompressed", variable=self.store_archive).pack(anchor=tk.W, padx=(20, 0))
+        ttk.Checkbutton(file_frame, text="Reuse unchanged tiles (cache)", variable=self.use_cache).pack(anchor=tk.W)
+        ttk.Checkbutton(file_frame, text="Write timing trace", variable=self.write_trace).pack(anchor=tk.W)
+        
+        # What to do with animated and multi-page images
+        frames_frame = ttk.Frame(file_frame)
+        frames_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(frames_frame, text="Frames:").pack(side=tk.LEFT)
+        ttk.Combobox(frames_frame, textvariable=self.frame_export, state="readonly", width=16,
+                     values=("Current frame", "Every frame", "Animation per cell")).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Combobox(frames_frame, textvariable=self.animation_format, values=list(ANIMATION_FORMATS),
+                     state="readonly", width=5).pack(side=tk.LEFT, padx=(5, 0))
+        
+        self.save_button = ttk.Button(file_frame, text="Save Sliced Images", command=self.save_sliced_images)
+        self.save_button.pack(fill=tk.X, pady=2)
+        
+        # Export progress
+        self.export_progressbar = ttk.Progressbar(file_frame, mode='determinate')
+        self.export_progressbar.pack(fill=tk.X, pady=2)
+        self.cancel_button = ttk.Button(file_frame, text="Cancel Export", command=self.cancel_export, state=tk.DISABLED)
+        self.cancel_button.pack(fill=tk.X, pady=2)
+        
+        # View / zoom
+        view_frame = ttk.LabelFrame(parent, text="View", padding=10)
+        view_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Button(view_frame, text="−", width=3, command=self.zoom_out).pack(side=tk.LEFT)
+        ttk.Button(view_frame, text="Fit", width=5, command=self.zoom_fit).pack(side=tk.LEFT, padx=5)
+        ttk.Button(view_frame, text="+", width=3, command=self.zoom_in).pack(side=tk.LEFT)
+        self.zoom_label = ttk.Label(view_frame, text="")
+        self.zoom_label.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.frame_spin = ttk.Spinbox(view_frame, from_=0, to=0, textvariable=self.frame_index, width=5,
+                                      command=self.show_frame, state=tk.DISABLED)
+        self.frame_spin.pack(side=tk.RIGHT)
+        self.frame_spin.bind('<Return>', lambda e: self.show_frame())
+        ttk.Label(view_frame, text="Frame:").pack(side=tk.RIGHT, padx=(10, 5))
         
         # Grid settings
         grid_frame = ttk.LabelFrame(parent, text="Grid Settings", padding=10)
@@ -100,12 +227,12 @@ class SpriteCutter:
         ttk.Label(grid_frame, text="Rows:").grid(row=0, column=0, sticky=tk.W, pady=2)
         rows_spin = ttk.Spinbox(grid_frame, from_=1, to=50, textvariable=self.rows, width=10, command=self.update_grid)
         rows_spin.grid(row=0, column=1, sticky=tk.W, padx=(5, 0), pady=2)
-        rows_spin.bind('<KeyRelease>', lambda e: self.root.after(100, self.update_grid))
+        rows_spin.bind('<KeyRelease>', lambda e: self.scheduler.request("grid", self.update_grid))
         
         ttk.Label(grid_frame, text="Columns:").grid(row=1, column=0, sticky=tk.W, pady=2)
         cols_spin = ttk.Spinbox(grid_frame, from_=1, to=50, textvariable=self.cols, width=10, command=self.update_grid)
         cols_spin.grid(row=1, column=1, sticky=tk.W, padx=(5, 0), pady=2)
-        cols_spin.bind('<KeyRelease>', lambda e: self.root.after(100, self.update_grid))
+        cols_spin.bind('<KeyRelease>', lambda e: self.scheduler.request("grid", self.update_grid))
         
         # Cell dimensions
         ttk.Separator(grid_frame, orient='horizontal').grid(row=2, column=0, columnspan=2, sticky='ew', pady=10)
@@ -113,12 +240,12 @@ class SpriteCutter:
         ttk.Label(grid_frame, text="Cell Width:").grid(row=3, column=0, sticky=tk.W, pady=2)
         width_spin = ttk.Spinbox(grid_frame, from_=1, to=1000, textvariable=self.cell_width, width=10, command=self.update_grid_size)
         width_spin.grid(row=3, column=1, sticky=tk.W, padx=(5, 0), pady=2)
-        width_spin.bind('<KeyRelease>', lambda e: self.root.after(100, self.update_grid_size))
+        width_spin.bind('<KeyRelease>', lambda e: self.scheduler.request("grid", self.update_grid_size))
         
         ttk.Label(grid_frame, text="Cell Height:").grid(row=4, column=0, sticky=tk.W, pady=2)
         height_spin = ttk.Spinbox(grid_frame, from_=1, to=1000, textvariable=self.cell_height, width=10, command=self.update_grid_size)
         height_spin.grid(row=4, column=1, sticky=tk.W, padx=(5, 0), pady=2)
-        height_spin.bind('<KeyRelease>', lambda e: self.root.after(100, self.update_grid_size))
+        height_spin.bind('<KeyRelease>', lambda e: self.scheduler.request("grid", self.update_grid_size))
         
         # Aspect ratio
         ttk.Separator(grid_frame, orient='horizontal').grid(row=5, column=0, columnspan=2, sticky='ew', pady=10)
@@ -129,7 +256,41 @@ class SpriteCutter:
         ttk.Label(grid_frame, text="Aspect Ratio:").grid(row=7, column=0, sticky=tk.W, pady=2)
         aspect_spin = ttk.Spinbox(grid_frame, from_=0.1, to=10.0, increment=0.1, textvariable=self.aspect_ratio, width=10, command=self.update_aspect_ratio)
         aspect_spin.grid(row=7, column=1, sticky=tk.W, padx=(5, 0), pady=2)
-        aspect_spin.bind('<KeyRelease>', lambda e: self.root.after(100, self.update_aspect_ratio))
+        aspect_spin.bind('<KeyRelease>', lambda e: self.scheduler.request("grid", self.update_aspect_ratio))
+        
+        ttk.Separator(grid_frame, orient='horizontal').grid(row=8, column=0, columnspan=2, sticky='ew', pady=10)
+        
+        # Spacing in source pixels
+        ttk.Label(grid_frame, text="Gutter:").grid(row=9, column=0, sticky=tk.W, pady=2)
+        gutter_spin = ttk.Spinbox(grid_frame, from_=0, to=1000, textvariable=self.gutter, width=10, command=self.schedule_redraw)
+        gutter_spin.grid(row=9, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        gutter_spin.bind('<KeyRelease>', lambda e: self.schedule_redraw())
+        
+        ttk.Label(grid_frame, text="Padding:").grid(row=10, column=0, sticky=tk.W, pady=2)
+        padding_spin = ttk.Spinbox(grid_frame, from_=0, to=1000, textvariable=self.cell_padding, width=10, command=self.schedule_redraw)
+        padding_spin.grid(row=10, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        padding_spin.bind('<KeyRelease>', lambda e: self.schedule_redraw())
+        
+        ttk.Separator(grid_frame, orient='horizontal').grid(row=11, column=0, columnspan=2, sticky='ew', pady=10)
+        ttk.Button(grid_frame, text="Auto Detect Grid", command=self.auto_detect_grid).grid(row=12, column=0, columnspan=2, sticky='ew')
+        
+        sprite_buttons = ttk.Frame(grid_frame)
+        sprite_buttons.grid(row=13, column=0, columnspan=2, sticky='ew', pady=(5, 0))
+        ttk.Button(sprite_buttons, text="Find Sprites", command=self.find_sprites).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(sprite_buttons, text="Clear", command=self.clear_sprites).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Grid regions
+        regions_frame = ttk.LabelFrame(parent, text="Regions", padding=10)
+        regions_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.region_list = tk.Listbox(regions_frame, height=4, exportselection=False)
+        self.region_list.pack(fill=tk.X)
+        self.region_list.bind('<<ListboxSelect>>', self.on_region_select)
+        
+        region_buttons = ttk.Frame(regions_frame)
+        region_buttons.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(region_buttons, text="Add Region", command=self.add_region).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(region_buttons, text="Remove", command=self.remove_region).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
         
         # Grid position info
         info_frame = ttk.LabelFrame(parent, text="Grid Info", padding=10)
@@ -138,6 +299,27 @@ class SpriteCutter:
         self.info_label = ttk.Label(info_frame, text="No image loaded", wraplength=200)
         self.info_label.pack()
         
+        self.hover_label = ttk.Label(info_frame, text="")
+        self.hover_label.pack(fill=tk.X, pady=(5, 0))
+        
+        self.render_stats_label = ttk.Label(info_frame, text="", font=('TkDefaultFont', 8), foreground='gray')
+        self.render_stats_label.pack(fill=tk.X, pady=(5, 0))
+        
+        # Source pixels around the pointer, unscaled or magnified
+        loupe_frame = ttk.LabelFrame(parent, text="Loupe", padding=10)
+        loupe_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        loupe_canvas = tk.Canvas(loupe_frame, width=160, height=160, bg='white', highlightthickness=0)
+        loupe_canvas.pack()
+        self.loupe = Loupe(loupe_canvas, size=160, magnification=self.loupe_zoom.get())
+        
+        zoom_row = ttk.Frame(loupe_frame)
+        zoom_row.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(zoom_row, text="Zoom:").pack(side=tk.LEFT)
+        for value in MAGNIFICATIONS:
+            ttk.Radiobutton(zoom_row, text=f"{value}x", variable=self.loupe_zoom,
+                            value=value).pack(side=tk.LEFT, padx=(5, 0))
+        
         # Instructions
         instructions_frame = ttk.LabelFrame(parent, text="Instructions", padding=10)
         instructions_frame.pack(fill=tk.X)
@@ -149,6 +331,8 @@ class SpriteCutter:
 • Adjust rows/columns as needed
 • Set cell dimensions manually
 • Use aspect ratio for proportional cells
+• Add regions for sheets with several grids
+• Find Sprites cuts sheets without a grid
 • Customize filename prefix for output
 • Save to slice the image
         """
@@ -163,8 +347,8 @@ class SpriteCutter:
         self.canvas = tk.Canvas(canvas_container, bg='white', cursor='cross')
         
         # Scrollbars
-        v_scrollbar = ttk.Scrollbar(canvas_container, orient=tk.VERTICAL, command=self.canvas.yview)
-        h_scrollbar = ttk.Scrollbar(canvas_container, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        v_scrollbar = ttk.Scrollbar(canvas_container, orient=tk.VERTICAL, command=self.on_yview)
+        h_scrollbar = ttk.Scrollbar(canvas_container, orient=tk.HORIZONTAL, command=self.on_xview)
         
         self.canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
         
@@ -174,24 +358,41 @@ class SpriteCutter:
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Bind events
+        self.overlay = GridOverlay(self.canvas)
+        
         self.canvas.bind('<Button-1>', self.on_canvas_click)
         self.canvas.bind('<B1-Motion>', self.on_canvas_drag)
         self.canvas.bind('<ButtonRelease-1>', self.on_canvas_release)
         self.canvas.bind('<Motion>', self.on_canvas_motion)
+        self.canvas.bind('<Leave>', lambda e: self.scheduler.request("loupe", self.loupe.clear))
+        self.canvas.bind('<Configure>', lambda e: self.refresh_view())
+        
+        # Zoom with Ctrl + wheel, pan with the wheel or by dragging the middle button
+        self.canvas.bind('<Control-MouseWheel>', self.on_canvas_zoom)
+        self.canvas.bind('<Control-Button-4>', lambda e: self.zoom_in((e.x, e.y)))
+        self.canvas.bind('<Control-Button-5>', lambda e: self.zoom_out((e.x, e.y)))
+        self.canvas.bind('<MouseWheel>', lambda e: self.on_yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind('<Shift-MouseWheel>', lambda e: self.on_xview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind('<Button-4>', lambda e: self.on_yview("scroll", -1, "units"))
+        self.canvas.bind('<Button-5>', lambda e: self.on_yview("scroll", 1, "units"))
+        self.canvas.bind('<Shift-Button-4>', lambda e: self.on_xview("scroll", -1, "units"))
+        self.canvas.bind('<Shift-Button-5>', lambda e: self.on_xview("scroll", 1, "units"))
+        self.canvas.bind('<Button-2>', lambda e: self.canvas.scan_mark(e.x, e.y))
+        self.canvas.bind('<B2-Motion>', self.on_canvas_pan)
         
     def load_image(self):
         """Load an image file"""
         file_path = filedialog.askopenfilename(
             title="Select Image",
             filetypes=[
-                ("Image files", "*.png *.jpg *.jpeg *.gif *.bmp *.tiff"),
+                ("Image files", "*.png *.apng *.jpg *.jpeg *.gif *.bmp *.tif *.tiff *.webp"),
                 ("All files", "*.*")
             ]
         )
         
         if file_path:
             try:
-                self.image = Image.open(file_path)
+                self.set_image(file_path)
                 # Only update filename prefix if it's empty or still has the default value
                 current_prefix = self.filename_prefix.get().strip()
                 if not current_prefix or current_prefix == "sprite":
@@ -203,7 +404,142 @@ class SpriteCutter:
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load image: {str(e)}")
                 
-    def display_image_on_canvas(self):
+    def set_image(self, file_path, frame=0):
+        """Open a source image and forget everything tied to the previous one"""
+        image, self.image = self.image, open_image(file_path)
+        self.release_image(image)
+        self.image_path = file_path
+        frames = frame_count(self.image)
+        frame = min(max(frame, 0), frames - 1)
+        if frame:
+            self.image.seek(frame)
+        self.frame_index.set(frame)
+        self.frame_spin.configure(to=frames - 1, state=tk.NORMAL if frames > 1 else tk.DISABLED)
+        self.preview = PreviewPyramid(self.image)
+        self.loupe.clear()
+        self.zoom = None
+        self.regions = RegionLayout()
+        self.active_region = None
+        self.sprites = None
+        self.refresh_region_list()
+        
+    def release_image(self, image):
+        """Close an image that is no longer shown, once no export reads it"""
+        if image is None:
+            return
+        if self.export_thread and self.export_thread.is_alive():
+            self.released_images.append(image)
+        else:
+            image.close()
+        
+    def save_project(self):
+        """Save the grid, regions, settings and a preview thumbnail to a project file"""
+        if not self.image or not self.image_path:
+            messagebox.showwarning("Warning", "Please load an image first!")
+            return
+            
+        base_name = os.path.splitext(os.path.basename(self.image_path))[0]
+        path = filedialog.asksaveasfilename(
+            title="Save Project",
+            initialdir=os.path.dirname(os.path.abspath(self.image_path)),
+            initialfile=base_name + PROJECT_EXTENSION,
+            defaultextension=PROJECT_EXTENSION,
+            filetypes=[("SpriteCutter project", f"*{PROJECT_EXTENSION}"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+            
+        self.commit_active_region()
+        settings = {
+            "prefix": self.filename_prefix.get(),
+            "naming_scheme": self.naming_scheme.get(),
+            "encoder": self.encoder_preset.get(),
+            "skip_empty": self.skip_empty.get(),
+            "dedupe": self.dedupe_tiles.get(),
+            "maintain_aspect": self.maintain_aspect.get(),
+            "aspect_ratio": self.aspect_ratio.get(),
+            "zoom": self.zoom,
+            "frame": self.frame_index.get(),
+            "active_region": self.active_region,
+        }
+        if self.sprites:
+            settings["sprites"] = self.sprites.to_dict()["sprites"]
+        try:
+            # The export cache usually knows the source hash already
+            digest = self.export_cache.source_digest(self.image_path)
+            project = Project.capture(self.image_path, self.grid_spec(), self.regions, settings,
+                                      self.preview, self.image_scale, digest)
+            project.save(path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save project: {str(e)}")
+            
+    def open_project(self):
+        """Reopen a project; an unchanged source is shown from the saved thumbnail"""
+        path = filedialog.askopenfilename(
+            title="Open Project",
+            filetypes=[("SpriteCutter project", f"*{PROJECT_EXTENSION}"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+            
+        try:
+            project = Project.load(path)
+            changed = project.source_changed()
+            settings = project.settings
+            self.set_image(project.source_path, settings.get("frame", 0))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open project: {str(e)}")
+            return
+            
+        # The thumbnail stands in for the pyramid level it was taken from,
+        # so the fit-to-window view needs no decode or resample of the source
+        if not changed:
+            project.seed_preview(self.preview)
+            
+        self.filename_prefix.set(settings.get("prefix", self.filename_prefix.get()))
+        self.naming_scheme.set(settings.get("naming_scheme", "row_col"))
+        if settings.get("encoder") in available_presets():
+            self.encoder_preset.set(settings["encoder"])
+        self.skip_empty.set(settings.get("skip_empty", False))
+        self.dedupe_tiles.set(settings.get("dedupe", False))
+        self.maintain_aspect.set(settings.get("maintain_aspect", False))
+        self.aspect_ratio.set(settings.get("aspect_ratio", 1.0))
+        self.zoom = settings.get("zoom")
+        
+        if project.regions:
+            self.regions = project.regions
+            if settings.get("active_region") in self.regions:
+                self.active_region = settings["active_region"]
+            self.refresh_region_list()
+        if settings.get("sprites"):
+            from components import SpriteLayout
+            self.sprites = SpriteLayout.from_dict(settings)
+        
+        self.pending_grid = project.grid
+        self.display_image_on_canvas()
+        self.update_info()
+        if changed:
+            messagebox.showwarning("Source Changed",
+                                   "The image has changed since the project was saved. "
+                                   "Check that the grid still fits.")
+        
+    def show_frame(self):
+        """Show another frame of an animated or multi-page image, keeping the grid"""
+        if not self.image or frame_count(self.image) < 2:
+            return
+        if self.export_thread and self.export_thread.is_alive():
+            return
+        try:
+            index = min(max(self.frame_index.get(), 0), frame_count(self.image) - 1)
+        except tk.TclError:
+            return
+        # Only the frame on screen is decoded
+        self.image.seek(index)
+        self.preview = PreviewPyramid(self.image)
+        self.display_image_on_canvas(reset_grid=False)
+        self.update_info()
+        
+    def display_image_on_canvas(self, reset_grid=True):
         """Display the image on the canvas"""
         if not self.image:
             return
@@ -214,38 +550,124 @@ class SpriteCutter:
         
         if canvas_width <= 1 or canvas_height <= 1:
             # Canvas not ready, try again later
-            self.root.after(100, self.display_image_on_canvas)
+            self.root.after(100, self.display_image_on_canvas, reset_grid)
             return
             
         img_width, img_height = self.image.size
         
         scale_x = canvas_width / img_width
         scale_y = canvas_height / img_height
-        self.image_scale = min(scale_x, scale_y, 1.0)  # Don't scale up
+        fit_scale = min(scale_x, scale_y, 1.0)  # Don't scale up when fitting
         
-        # Resize image for display
+        old_scale = self.image_scale
+        self.image_scale = self.zoom if self.zoom else fit_scale
+        
+        # Size of the image at the display scale
         display_width = int(img_width * self.image_scale)
         display_height = int(img_height * self.image_scale)
         
-        self.display_image = self.image.resize((display_width, display_height), Image.Resampling.LANCZOS)
-        self.photo = ImageTk.PhotoImage(self.display_image)
+        # Only the tiles in view are rendered, from the nearest pyramid level
+        if self.view is None or self.view.pyramid is not self.preview:
+            self.canvas.delete("all")
+            self.overlay.reset()
+            self.region_overlays = {}
+            self.view = TiledView(self.canvas, self.preview)
+        self.view.set_scale(self.image_scale)
+        self.zoom_label.config(text=f"{self.image_scale * 100:.0f}%")
+        
+        if reset_grid:
+            self.canvas.xview_moveto(0)
+            self.canvas.yview_moveto(0)
+            
+            # Initialize grid position and size
+            self.grid_x = 50
+            self.grid_y = 50
+            self.grid_width = min(200, display_width - 100)
+            self.grid_height = min(200, display_height - 100)
+            
+            # Update cell dimensions based on current grid
+            self.update_cell_dimensions_from_grid()
+            
+            if self.pending_grid is not None:
+                spec, self.pending_grid = self.pending_grid, None
+                self.apply_grid_spec(spec)
+        else:
+            # Keep the grid over the same source pixels at the new scale
+            ratio = self.image_scale / old_scale if old_scale > 0 else 1.0
+            self.grid_x *= ratio
+            self.grid_y *= ratio
+            self.grid_width *= ratio
+            self.grid_height *= ratio
+        self.view.refresh()
+        self.draw_regions()
+        self.draw_sprites()
+        self.draw_grid()
         
-        # Clear canvas and add image
-        self.canvas.delete("all")
-        self.canvas_image = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+    def refresh_view(self):
+        """Render any tiles that scrolling or resizing brought into view"""
+        if self.view:
+            self.view.refresh()
+            
+    def on_xview(self, *args):
+        self.canvas.xview(*args)
+        self.refresh_view()
         
-        # Update canvas scroll region
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+    def on_yview(self, *args):
+        self.canvas.yview(*args)
+        self.refresh_view()
         
-        # Initialize grid position and size
-        self.grid_x = 50
-        self.grid_y = 50
-        self.grid_width = min(200, display_width - 100)
-        self.grid_height = min(200, display_height - 100)
+    def on_canvas_pan(self, event):
+        """Middle-button drag pans the view"""
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.refresh_view()
         
-        # Update cell dimensions based on current grid
-        self.update_cell_dimensions_from_grid()
-        self.draw_grid()
+    def set_zoom(self, zoom, focus=None):
+        """Change the display scale, keeping the grid on the same source pixels
+
+        focus is a point in window coordinates that should stay over the same
+        source pixel; it defaults to the middle of the canvas.
+        """
+        if not self.view:
+            return
+        if focus is None:
+            focus = (self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2)
+        if zoom is not None:
+            zoom = max(min(zoom, self.MAX_ZOOM), 16 / max(self.image.size))
+            
+        # Source pixel currently under the focus point
+        old_scale = self.image_scale
+        source_x = self.canvas.canvasx(focus[0]) / old_scale
+        source_y = self.canvas.canvasy(focus[1]) / old_scale
+        
+        self.zoom = zoom
+        self.display_image_on_canvas(reset_grid=False)
+        
+        # Scroll so that pixel is under the focus point again
+        display_width, display_height = self.view.display_size
+        self.canvas.xview_moveto((source_x * self.image_scale - focus[0]) / display_width)
+        self.canvas.yview_moveto((source_y * self.image_scale - focus[1]) / display_height)
+        self.refresh_view()
+        self.update_info()
+        
+    def zoom_in(self, focus=None):
+        self.set_zoom(self.image_scale * self.ZOOM_STEP, focus)
+        
+    def zoom_out(self, focus=None):
+        self.set_zoom(self.image_scale / self.ZOOM_STEP, focus)
+        
+    def zoom_fit(self):
+        self.set_zoom(None)
+        
+    def on_canvas_zoom(self, event):
+        """Ctrl + mouse wheel zooms the view around the pointer"""
+        if event.delta > 0:
+            self.zoom_in((event.x, event.y))
+        else:
+            self.zoom_out((event.x, event.y))
+            
+    def canvas_coords(self, event):
+        """Event position in canvas coordinates, accounting for scrolling"""
+        return self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
         
     def update_cell_dimensions_from_grid(self):
         """Update cell dimension variables based on current grid size"""
@@ -264,8 +686,7 @@ class SpriteCutter:
             self.update_grid_size_with_aspect()
         else:
             self.update_cell_dimensions_from_grid()
-        self.draw_grid()
-        self.update_info()
+        self.schedule_redraw()
         
     def update_grid_size(self):
         """Update grid size based on cell dimensions"""
@@ -275,8 +696,7 @@ class SpriteCutter:
         if self.maintain_aspect.get() and self.cell_width.get() > 0:
             self.aspect_ratio.set(round(self.cell_height.get() / self.cell_width.get(), 2))
             
-        self.draw_grid()
-        self.update_info()
+        self.schedule_redraw()
         
     def toggle_aspect_ratio(self):
         """Toggle aspect ratio maintenance"""
@@ -295,91 +715,201 @@ class SpriteCutter:
             self.cell_height.set(new_height)
             self.grid_width = self.cell_width.get() * self.cols.get()
             self.grid_height = self.cell_height.get() * self.rows.get()
-            self.draw_grid()
-            self.update_info()
+            self.schedule_redraw()
+        
+    def auto_detect_grid(self):
+        """Find the grid from the image content and apply it"""
+        if not self.image:
+            messagebox.showwarning("Warning", "Please load an image first!")
+            return
+            
+        try:
+            from detect import detect_grid
+            spec = detect_grid(self.image)
+        except ImportError:
+            messagebox.showerror("Error", "Grid detection needs NumPy (pip install numpy)")
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to detect grid: {str(e)}")
+            return
+            
+        self.apply_grid_spec(spec)
+        
+    def find_sprites(self):
+        """Find the sprites of an irregularly packed sheet; they replace the grid on export"""
+        if not self.image:
+            messagebox.showwarning("Warning", "Please load an image first!")
+            return
+            
+        try:
+            from components import SpriteLayout, find_sprites
+            self.sprites = SpriteLayout(find_sprites(self.image, merge=2))
+        except ImportError:
+            messagebox.showerror("Error", "Sprite extraction needs NumPy (pip install numpy)")
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to find sprites: {str(e)}")
+            return
+            
+        if not self.sprites:
+            messagebox.showinfo("Find Sprites", "No sprites found on this image")
+        self.draw_sprites()
+        self.update_info()
+        
+    def clear_sprites(self):
+        """Go back to exporting the grid"""
+        self.sprites = None
+        self.draw_sprites()
+        self.update_info()
+        
+    def draw_sprites(self):
+        """Outline the sprites found by find_sprites"""
+        self.canvas.delete("sprites")
+        if not self.sprites or not self.view:
+            return
+        scale = self.image_scale
+        for _, _, (left, top, right, bottom) in self.sprites.cells:
+            self.canvas.create_rectangle(left * scale, top * scale, right * scale, bottom * scale,
+                                         outline="green", tags="sprites")
+            
+    def apply_grid_spec(self, spec):
+        """Place the grid over a GridSpec given in source pixels"""
+        self.rows.set(spec.rows)
+        self.cols.set(spec.cols)
+        self.gutter.set(spec.gutter)
+        self.cell_padding.set(spec.padding)
+        
+        self.grid_x = spec.x * self.image_scale
+        self.grid_y = spec.y * self.image_scale
+        self.grid_width = spec.width * self.image_scale
+        self.grid_height = spec.height * self.image_scale
+        
+        # Cell dimension controls follow the on-screen grid like everywhere else
+        self.update_cell_dimensions_from_grid()
+        self.schedule_redraw()
         
     def draw_grid(self):
         """Draw the grid overlay on the canvas"""
-        if not self.display_image:
+        if not self.view:
             return
             
-        # Remove existing grid
-        self.canvas.delete("grid")
-        
-        # Draw grid rectangle
+        # Existing items are moved into place rather than recreated
         x1, y1 = self.grid_x, self.grid_y
         x2, y2 = self.grid_x + self.grid_width, self.grid_y + self.grid_height
+        self.overlay.update(x1, y1, x2, y2, self.rows.get(), self.cols.get(),
+                            self.gutter.get() * self.image_scale)
         
-        # Main grid outline
-        self.canvas.create_rectangle(x1, y1, x2, y2, outline='red', width=2, tags="grid")
-        
-        # Grid lines
-        rows = self.rows.get()
-        cols = self.cols.get()
-        
-        # Vertical lines
-        for i in range(1, cols):
-            x = x1 + (i * self.grid_width / cols)
-            self.canvas.create_line(x, y1, x, y2, fill='red', width=1, tags="grid")
-            
-        # Horizontal lines
-        for i in range(1, rows):
-            y = y1 + (i * self.grid_height / rows)
-            self.canvas.create_line(x1, y, x2, y, fill='red', width=1, tags="grid")
-            
-        # Resize handles
-        handle_size = 8
-        handles = [
-            (x1 - handle_size//2, y1 - handle_size//2, "nw"),  # Top-left
-            (x2 - handle_size//2, y1 - handle_size//2, "ne"),  # Top-right
-            (x1 - handle_size//2, y2 - handle_size//2, "sw"),  # Bottom-left
-            (x2 - handle_size//2, y2 - handle_size//2, "se"),  # Bottom-right
-            ((x1 + x2)//2 - handle_size//2, y1 - handle_size//2, "n"),   # Top
-            ((x1 + x2)//2 - handle_size//2, y2 - handle_size//2, "s"),   # Bottom
-            (x1 - handle_size//2, (y1 + y2)//2 - handle_size//2, "w"),   # Left
-            (x2 - handle_size//2, (y1 + y2)//2 - handle_size//2, "e"),   # Right
-        ]
-        
-        for hx, hy, cursor in handles:
-            self.canvas.create_rectangle(
-                hx, hy, hx + handle_size, hy + handle_size,
-                fill='red', outline='darkred', width=1,
-                tags=("grid", f"handle_{cursor}")
-            )
+    def draw_regions(self):
+        """Draw every region except the active one, which the grid overlay shows"""
+        if not self.view:
+            return
+            
+        for name in list(self.region_overlays):
+            if name not in self.regions or name == self.active_region:
+                self.region_overlays.pop(name).clear()
+                
+        scale = self.image_scale
+        for name, spec in self.regions:
+            if name == self.active_region:
+                continue
+            overlay = self.region_overlays.get(name)
+            if overlay is None:
+                overlay = GridOverlay(self.canvas, tag=f"region:{name}", color="royalblue", handles=False)
+                self.region_overlays[name] = overlay
+            x1, y1, x2, y2 = (value * scale for value in spec.bounds)
+            overlay.update(x1, y1, x2, y2, spec.rows, spec.cols, spec.gutter * scale)
             
+    def refresh_region_list(self):
+        """Show the region names, with the active one selected"""
+        self.region_list.delete(0, tk.END)
+        for index, (name, spec) in enumerate(self.regions):
+            self.region_list.insert(tk.END, f"{name} ({spec.rows}×{spec.cols})")
+            if name == self.active_region:
+                self.region_list.selection_set(index)
+                
+    def commit_active_region(self):
+        """Store the grid being edited back into its region"""
+        if self.active_region in self.regions:
+            self.regions.add(self.active_region, self.grid_spec())
+            
+    def add_region(self):
+        """Keep the current grid as a new region and carry on editing it"""
+        if not self.image:
+            messagebox.showwarning("Warning", "Please load an image first!")
+            return
+            
+        self.commit_active_region()
+        self.active_region = self.regions.unique_name()
+        self.regions.add(self.active_region, self.grid_spec())
+        self.refresh_region_list()
+        self.draw_regions()
+        self.schedule_redraw()
+        
+    def remove_region(self):
+        """Delete the active region; the grid stays for further editing"""
+        if self.active_region not in self.regions:
+            return
+        self.regions.remove(self.active_region)
+        self.active_region = None
+        self.refresh_region_list()
+        self.draw_regions()
+        self.schedule_redraw()
+        
+    def select_region(self, name):
+        """Make a region the one edited by the grid controls"""
+        if name == self.active_region:
+            return
+        self.commit_active_region()
+        self.active_region = name
+        self.apply_grid_spec(self.regions.regions[name])
+        self.refresh_region_list()
+        self.draw_regions()
+        
+    def on_region_select(self, event):
+        selection = self.region_list.curselection()
+        if selection:
+            self.select_region(list(self.regions.regions)[selection[0]])
+            
+    def schedule_redraw(self):
+        """Redraw the grid and info on the next frame"""
+        self.scheduler.request("overlay", self.draw_grid)
+        self.scheduler.request("info", self.update_info)
+        
     def on_canvas_click(self, event):
         """Handle canvas click events"""
-        if not self.display_image:
+        if not self.view:
             return
             
-        self.last_x = event.x
-        self.last_y = event.y
+        x, y = self.canvas_coords(event)
+        self.last_x = x
+        self.last_y = y
         
         # Check if clicking on a resize handle
-        clicked_items = self.canvas.find_overlapping(event.x-2, event.y-2, event.x+2, event.y+2)
-        
-        self.resize_mode = None
-        for item in clicked_items:
-            tags = self.canvas.gettags(item)
-            for tag in tags:
-                if tag.startswith("handle_"):
-                    self.resize_mode = tag.replace("handle_", "")
-                    self.dragging = True
-                    return
-                    
-        # Check if clicking inside grid for moving
-        if (self.grid_x <= event.x <= self.grid_x + self.grid_width and
-            self.grid_y <= event.y <= self.grid_y + self.grid_height):
+        self.resize_mode = self.overlay.handle_at(x, y)
+        if self.resize_mode:
             self.dragging = True
-            self.resize_mode = "move"
+            return
+            
+        # Clicking another region makes it the active grid
+        if not self.inside_grid(x, y):
+            name = self.region_at(x, y)
+            if name is None:
+                return
+            self.select_region(name)
+            self.draw_grid()
+            
+        # Drag the grid that was clicked
+        self.dragging = True
+        self.resize_mode = "move"
             
     def on_canvas_drag(self, event):
         """Handle canvas drag events"""
-        if not self.dragging or not self.display_image:
+        if not self.dragging or not self.view:
             return
             
-        dx = event.x - self.last_x
-        dy = event.y - self.last_y
+        x, y = self.canvas_coords(event)
+        dx = x - self.last_x
+        dy = y - self.last_y
         
         if self.resize_mode == "move":
             # Move the grid
@@ -387,8 +917,7 @@ class SpriteCutter:
             self.grid_y += dy
             
             # Keep grid within image bounds
-            img_width = self.display_image.width
-            img_height = self.display_image.height
+            img_width, img_height = self.view.display_size
             
             self.grid_x = max(0, min(self.grid_x, img_width - self.grid_width))
             self.grid_y = max(0, min(self.grid_y, img_height - self.grid_height))
@@ -428,11 +957,11 @@ class SpriteCutter:
             # Update cell dimensions
             self.update_cell_dimensions_from_grid()
             
-        self.last_x = event.x
-        self.last_y = event.y
+        self.last_x = x
+        self.last_y = y
         
-        self.draw_grid()
-        self.update_info()
+        self.schedule_redraw()
+        self.scheduler.request("loupe", lambda: self.update_loupe(x, y))
         
     def on_canvas_release(self, event):
         """Handle canvas button release"""
@@ -441,42 +970,72 @@ class SpriteCutter:
         
     def on_canvas_motion(self, event):
         """Handle canvas mouse motion for cursor changes"""
-        if not self.display_image or self.dragging:
+        if not self.view or self.dragging:
+            return
+            
+        # Only the latest pointer position matters
+        x, y = self.canvas_coords(event)
+        self.scheduler.request("cursor", lambda: self.update_cursor(x, y))
+        self.scheduler.request("loupe", lambda: self.update_loupe(x, y))
+        
+    def update_cursor(self, x, y):
+        """Pick the cursor for the pointer position"""
+        if not self.view or self.dragging:
             return
             
         # Check if hovering over resize handles
-        items = self.canvas.find_overlapping(event.x-2, event.y-2, event.x+2, event.y+2)
+        direction = self.overlay.handle_at(x, y)
         
         cursor = 'cross'
-        for item in items:
-            tags = self.canvas.gettags(item)
-            for tag in tags:
-                if tag.startswith("handle_"):
-                    direction = tag.replace("handle_", "")
-                    cursor_map = {
-                        'nw': 'top_left_corner', 'se': 'bottom_right_corner',
-                        'ne': 'top_right_corner', 'sw': 'bottom_left_corner',
-                        'n': 'top_side', 's': 'bottom_side',
-                        'w': 'left_side', 'e': 'right_side'
-                    }
-                    cursor = cursor_map.get(direction, 'cross')
-                    break
-                    
-        # Check if inside grid
-        if (cursor == 'cross' and 
-            self.grid_x <= event.x <= self.grid_x + self.grid_width and
-            self.grid_y <= event.y <= self.grid_y + self.grid_height):
+        if direction:
+            cursor_map = {
+                'nw': 'top_left_corner', 'se': 'bottom_right_corner',
+                'ne': 'top_right_corner', 'sw': 'bottom_left_corner',
+                'n': 'top_side', 's': 'bottom_side',
+                'w': 'left_side', 'e': 'right_side'
+            }
+            cursor = cursor_map.get(direction, 'cross')
+        elif self.inside_grid(x, y):
             cursor = 'fleur'
+        elif self.region_at(x, y) is not None:
+            cursor = 'hand2'
             
         self.canvas.configure(cursor=cursor)
+        self.update_hover(x, y)
+        
+    def inside_grid(self, x, y):
+        """Whether a canvas point is inside the active grid"""
+        return (self.grid_x <= x <= self.grid_x + self.grid_width and
+                self.grid_y <= y <= self.grid_y + self.grid_height)
+        
+    def region_at(self, x, y):
+        """Name of the inactive region under a canvas point, or None"""
+        return self.regions.region_at(x / self.image_scale, y / self.image_scale,
+                                      exclude=self.active_region)
+        
+    def update_hover(self, x, y):
+        """Show which cell is under the pointer"""
+        source_x, source_y = int(x / self.image_scale), int(y / self.image_scale)
+        if self.inside_grid(x, y):
+            cell = self.grid_spec().cell_at(source_x, source_y)
+            name = self.active_region or "grid"
+        else:
+            hit = self.regions.cell_at(source_x, source_y)
+            name, cell = (hit[0], hit[1:]) if hit else (None, None)
+        self.hover_label.config(text=f"Cell: {name} r{cell[0]} c{cell[1]}" if cell else "")
         
-    def update_info(self):
-        """Update the info label"""
-        if not self.image:
-            self.info_label.config(text="No image loaded")
+    def update_loupe(self, x, y):
+        """Show the source pixels under a canvas point, with the grid in source pixels"""
+        if not self.image or self.image_scale <= 0:
             return
-            
-        # Calculate actual pixel coordinates and sizes
+        self.loupe.magnification = self.loupe_zoom.get()
+        specs = [spec for name, spec in self.regions if name != self.active_region]
+        if not self.sprites:
+            specs.append(self.grid_spec())
+        self.loupe.show(self.image, int(x / self.image_scale), int(y / self.image_scale), specs)
+        
+    def grid_spec(self):
+        """The current grid in source-image pixel coordinates"""
         scale_factor = 1.0 / self.image_scale if self.image_scale > 0 else 1.0
         
         actual_x = int(self.grid_x * scale_factor)
@@ -484,102 +1043,279 @@ class SpriteCutter:
         actual_w = int(self.grid_width * scale_factor)
         actual_h = int(self.grid_height * scale_factor)
         
-        cell_w = actual_w // self.cols.get()
-        cell_h = actual_h // self.rows.get()
+        return GridSpec.from_region(actual_x, actual_y, actual_w, actual_h,
+                                    self.rows.get(), self.cols.get(),
+                                    self.gutter.get(), self.cell_padding.get())
+        
+    def export_spec(self):
+        """What to export: found sprites, else every region if there are any, else the grid"""
+        if self.sprites:
+            return self.sprites
+        if not len(self.regions):
+            return self.grid_spec()
+        self.commit_active_region()
+        # A copy, so editing during a background export changes nothing
+        return RegionLayout.from_dict(self.regions.to_dict())
+        
+    def update_info(self):
+        """Update the info label"""
+        if not self.image:
+            self.info_label.config(text="No image loaded")
+            return
+            
+        spec = self.grid_spec()
         
-        info_text = f"""Image: {self.image.width}×{self.image.height}
-Grid: {actual_x},{actual_y} ({actual_w}×{actual_h})
-Cells: {self.rows.get()}×{self.cols.get()} ({cell_w}×{cell_h} each)
+        frames = frame_count(self.image)
+        frame_info = f" ({frames} frames)" if frames > 1 else ""
+        info_text = f"""Image: {self.image.width}×{self.image.height}{frame_info}
+Grid: {spec.x},{spec.y} ({spec.width}×{spec.height})
+Cells: {self.rows.get()}×{self.cols.get()} ({spec.cell_width}×{spec.cell_height} each)
 Total sprites: {self.rows.get() * self.cols.get()}"""
+        if len(self.regions):
+            info_text += f"\nRegions: {len(self.regions)} ({self.regions.total} sprites)"
+        if self.sprites:
+            info_text += f"\nFound sprites: {self.sprites.total} (exported instead of the grid)"
         
         self.info_label.config(text=info_text)
         
+        stats = self.scheduler.stats()
+        self.render_stats_label.config(
+            text=f"Renders: {stats['executed']} run, {stats['skipped']} skipped")
+        
     def save_sliced_images(self):
         """Save the sliced images to a folder"""
         if not self.image:
             messagebox.showwarning("Warning", "Please load an image first!")
             return
             
-        # Choose output directory
-        output_dir = filedialog.askdirectory(
-            title="Select Directory to Save Sliced Images",
-            initialdir=os.path.expanduser("~")  # Start from user's home directory
-        )
+        if self.export_thread and self.export_thread.is_alive():
+            messagebox.showwarning("Warning", "An export is already running!")
+            return
+            
+        # Choose output directory, or the archive to stream the tiles into
+        archive = self.save_archive.get() and not (self.pack_atlas.get() or self.write_tensor.get())
+        if archive:
+            output_dir = filedialog.asksaveasfilename(
+                title="Save Sliced Images to Archive",
+                initialdir=os.path.expanduser("~"),
+                initialfile=f"{self.filename_prefix.get().strip() or 'sprite'}.zip",
+                defaultextension=".zip",
+                filetypes=[("Zip archive", "*.zip"), ("Tar archive", "*.tar"),
+                           ("Gzipped tar archive", "*.tar.gz"), ("All files", "*.*")]
+            )
+        else:
+            output_dir = filedialog.askdirectory(
+                title="Select Directory to Save Sliced Images",
+                initialdir=os.path.expanduser("~")  # Start from user's home directory
+            )
         if not output_dir:
             return
             
         try:
-            # Calculate actual coordinates
-            scale_factor = 1.0 / self.image_scale if self.image_scale > 0 else 1.0
-            
-            actual_x = int(self.grid_x * scale_factor)
-            actual_y = int(self.grid_y * scale_factor)
-            actual_w = int(self.grid_width * scale_factor)
-            actual_h = int(self.grid_height * scale_factor)
-            
-            cell_w = actual_w // self.cols.get()
-            cell_h = actual_h // self.rows.get()
+            spec = self.export_spec()
             
             # Get the filename prefix
             prefix = self.filename_prefix.get().strip()
             if not prefix:
                 prefix = "sprite"  # Default fallback
             
-            # Slice and save images directly to the selected directory
-            saved_count = 0
-            image_index = 1  # For sequential numbering
-            
-            for row in range(self.rows.get()):
-                for col in range(self.cols.get()):
-                    # Calculate crop box
-                    left = actual_x + col * cell_w
-                    top = actual_y + row * cell_h
-                    right = left + cell_w
-                    bottom = top + cell_h
-                    
-                    # Ensure we don't go beyond image boundaries
-                    right = min(right, self.image.width)
-                    bottom = min(bottom, self.image.height)
-                    
-                    if left < self.image.width and top < self.image.height:
-                        # Crop and save
-                        cropped = self.image.crop((left, top, right, bottom))
-                        
-                        # Generate filename based on selected naming scheme
-                        if self.naming_scheme.get() == "sequential":
-                            # Sequential numbering: prefix_001.png, prefix_002.png, etc.
-                            total_images = self.rows.get() * self.cols.get()
-                            digits = len(str(total_images))  # Calculate needed digits
-                            filename = f"{prefix}_{image_index:0{digits}d}.png"
-                            image_index += 1
-                        else:
-                            # Row and column: prefix_r00_c00.png (default)
-                            filename = f"{prefix}_r{row:02d}_c{col:02d}.png"
-                            
-                        filepath = os.path.join(output_dir, filename)
-                        cropped.save(filepath, "PNG")
-                        saved_count += 1
-                        
-            # Show success message with appropriate example
-            if self.naming_scheme.get() == "sequential":
-                total_images = self.rows.get() * self.cols.get()
-                digits = len(str(total_images))
-                example = f"{prefix}_{'1'.zfill(digits)}.png, {prefix}_{'2'.zfill(digits)}.png, etc."
+            scheme = self.naming_scheme.get()
+            encoder = PRESETS[self.encoder_preset.get()]
+            if isinstance(spec, RegionLayout):
+                name, first = next(iter(spec))
+                example = naming_example(f"{prefix}_{name}", scheme, first.total, encoder.extension)
+            else:
+                example = naming_example(prefix, scheme, spec.total, encoder.extension)
+            
+            frames = self.frame_export.get()
+            if frame_count(self.image) > 1 and frames != "Current frame":
+                animate = frames == "Animation per cell"
+                job = self.frames_job(spec, output_dir, prefix, scheme, encoder.name, animate)
+                if animate:
+                    example = naming_example(prefix, scheme, spec.total,
+                                             ANIMATION_FORMATS[self.animation_format.get()][1])
+                else:
+                    example = naming_example(f"{prefix}_f000", scheme, spec.total, encoder.extension)
+            elif self.write_tensor.get():
+                job = self.tensor_job(spec, output_dir, prefix, scheme)
+                example = f"{prefix}_tiles.npy + {prefix}_tiles.json"
+            elif self.pack_atlas.get():
+                job = self.atlas_job(spec, output_dir, prefix, scheme, encoder.name)
+                example = f"{prefix}_atlas_0{encoder.extension} + {prefix}_atlas.json"
             else:
-                example = f"{prefix}_r00_c00.png, {prefix}_r00_c01.png, etc."
+                job = self.slice_job(spec, output_dir, prefix, scheme, encoder.name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save images: {str(e)}")
+            return
+            
+        self.start_export(job, spec.total, output_dir, example)
+        
+    def export_image(self):
+        """The image a "Current frame" export reads, and whether it is a handle of its own
+
+        Multi-frame images get a separate handle seeked to the frame on
+        screen, so the export never sees show_frame() seek self.image.
+        """
+        if frame_count(self.image) < 2:
+            return self.image, False
+        image = open_image(self.image_path)
+        image.seek(self.image.tell())
+        return image, True
+        
+    def slice_job(self, spec, output, prefix, scheme, encoder):
+        """Export one image per cell into a directory or an archive file"""
+        image, owned = self.export_image()
+        options = dict(encoder=encoder, workers=self.export_workers.get(),
+                       use_processes=self.use_processes.get(),
+                       skip_empty=self.skip_empty.get(),
+                       dedupe=self.dedupe_tiles.get(),
+                       stored=self.store_archive.get())
+        # Skipping or sharing tiles needs a manifest to map cells to files
+        options["manifest"] = options["skip_empty"] or options["dedupe"]
+        options["cache"] = self.export_cache if self.use_cache.get() else None
+        if self.write_trace.get():
+            # Next to the images, or next to the archive
+            trace_dir = os.path.dirname(output) if is_archive_path(output) else output
+            options["trace"] = os.path.join(trace_dir, f"{prefix}_trace.json")
+        
+        def job(progress, cancel_event):
+            try:
+                return slice_image(image, spec, output, prefix, scheme, progress=progress,
+                                   cancel_event=cancel_event, **options)
+            finally:
+                if owned:
+                    image.close()
+        return job
+        
+    def frames_job(self, spec, output, prefix, scheme, encoder, animate):
+        """Export every frame of a multi-frame image, as tiles or per-cell animations"""
+        # A file handle of its own, so showing other frames does not interfere
+        path = self.image_path
+        options = dict(animate=animate, animation_format=self.animation_format.get(),
+                       workers=self.export_workers.get(), skip_empty=self.skip_empty.get(),
+                       encoder=encoder, stored=self.store_archive.get())
+        
+        def job(progress, cancel_event):
+            return slice_frames(path, spec, output, prefix, scheme, progress=progress,
+                                cancel_event=cancel_event, **options)
+        return job
+        
+    def atlas_job(self, spec, output_dir, prefix, scheme, encoder):
+        """Export the cells packed into texture atlas pages"""
+        from atlas import pack_atlas
+        
+        (image, owned), image_path = self.export_image(), self.image_path
+        dedupe = self.dedupe_tiles.get()
+        
+        def job(progress, cancel_event):
+            try:
+                return pack_atlas(image, spec, output_dir, prefix, scheme, dedupe=dedupe,
+                                  progress=progress, cancel_event=cancel_event,
+                                  source_path=image_path, encoder=encoder)
+            finally:
+                if owned:
+                    image.close()
+        return job
+        
+    def tensor_job(self, spec, output_dir, prefix, scheme):
+        """Export every cell into one memory-mappable array with a JSON index"""
+        from tensor import export_tensor
+        
+        (image, owned), image_path = self.export_image(), self.image_path
+        
+        def job(progress, cancel_event):
+            try:
+                return export_tensor(image, spec, output_dir, prefix, scheme, progress=progress,
+                                     cancel_event=cancel_event, source_path=image_path)
+            finally:
+                if owned:
+                    image.close()
+        return job
+        
+    def start_export(self, job, total, output_dir, example):
+        """Run an export job(progress, cancel_event) on a background thread"""
+        self.export_cancel = threading.Event()
+        self.export_progress = (0, total)
+        self.export_outcome = None
+        
+        def progress(done, total):
+            # Read by poll_export on the Tk thread
+            self.export_progress = (done, total)
+            
+        def worker():
+            try:
+                result = job(progress, self.export_cancel)
+                self.export_outcome = (result, None)
+            except Exception as e:
+                self.export_outcome = (None, e)
                 
+        self.export_progressbar.configure(maximum=max(1, total), value=0)
+        self.save_button.configure(state=tk.DISABLED)
+        self.cancel_button.configure(state=tk.NORMAL)
+        # The export was planned for the frame on screen
+        self.frame_spin.configure(state=tk.DISABLED)
+        
+        self.export_thread = threading.Thread(target=worker, daemon=True)
+        self.export_thread.start()
+        self.root.after(50, self.poll_export, output_dir, example)
+        
+    def poll_export(self, output_dir, example):
+        """Update export progress and report the result once finished"""
+        done, total = self.export_progress
+        self.export_progressbar.configure(maximum=max(1, total), value=done)
+        
+        if self.export_thread.is_alive():
+            self.root.after(50, self.poll_export, output_dir, example)
+            return
+            
+        self.save_button.configure(state=tk.NORMAL)
+        self.cancel_button.configure(state=tk.DISABLED)
+        while self.released_images:
+            self.released_images.pop().close()
+        if self.image and frame_count(self.image) > 1:
+            self.frame_spin.configure(state=tk.NORMAL)
+        
+        result, error = self.export_outcome
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to save images: {str(error)}")
+        elif result.cancelled:
+            messagebox.showinfo("Cancelled",
+                              f"Export cancelled after {result.saved} of {result.total} images in:\n{output_dir}")
+        else:
+            self.export_progressbar.configure(value=self.export_progressbar.cget("maximum"))
+            details = ""
+            if result.empty or result.duplicates:
+                details += f"\nSkipped {result.empty} empty and {result.duplicates} duplicate tiles"
+            if hasattr(result, "stages"):
+                details += f"\n\nFormat: {result.encoder}\n{format_summary(result)}"
+            if getattr(result, "cached", 0):
+                details += f"\nReused {result.cached} unchanged images from the cache"
             messagebox.showinfo("Success", 
-                              f"Saved {saved_count} images to:\n{output_dir}\n\nFiles named: {example}")
+                              f"Saved {result.saved} images to:\n{output_dir}{details}\n\nFiles named: {example}")
                               
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save images: {str(e)}")
+    def cancel_export(self):
+        """Stop a running export after the tiles already in flight"""
+        if self.export_cancel:
+            self.export_cancel.set()
 
 
-def main():
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        # Any arguments mean a headless command such as "slice"
+        from cli import main as cli_main
+        return cli_main(argv)
+        
+    if tk is None:
+        print("spritecutter: tkinter is not available; use the command line, "
+              "e.g. 'spritecutter.py slice --help'", file=sys.stderr)
+        return 1
+        
     root = tk.Tk()
     app = SpriteCutter(root)
     root.mainloop()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Tile tensor export for SpriteCutter
+Writes every cell into one uncompressed NumPy .npy array of shape
+(tiles, height, width, channels) plus a JSON index, for training and
+engine loaders that memory-map the file and read any tile by position
+without decoding anything.
+"""
+
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from PIL import Image
+
+from grid import GridSpec, plan_tiles
+from tileview import ARRAY_MODES, MAX_PIXELS, GridTiles
+
+TENSOR_VERSION = 1
+
+
+class TensorResult:
+    """Outcome of a tile tensor export"""
+
+    def __init__(self, saved, total, path=None, index_path=None, cancelled=False):
+        self.saved = saved
+        self.total = total
+        self.path = path
+        self.index_path = index_path
+        self.cancelled = cancelled
+        self.empty = self.duplicates = 0
+
+    def __repr__(self):
+        return (f"TensorResult(saved={self.saved}, total={self.total}, "
+                f"path={self.path!r}, cancelled={self.cancelled})")
+
+
+def tensor_paths(output_dir, prefix):
+    """(array path, index path) of a tensor export"""
+    base = os.path.join(output_dir, f"{prefix}_tiles")
+    return base + ".npy", base + ".json"
+
+
+def _tile_shape(tiles):
+    """(height, width) every slot of the tensor needs"""
+    if not tiles:
+        return 0, 0
+    return (max(box[3] - box[1] for _, _, box, _ in tiles),
+            max(box[2] - box[0] for _, _, box, _ in tiles))
+
+
+def export_tensor(image, spec, output_dir, prefix="sprite", naming_scheme="row_col", mode="RGBA",
+                  progress=None, cancel_event=None, source_path=None):
+    """Write every cell of spec into '<prefix>_tiles.npy' and '<prefix>_tiles.json'
+
+    Tiles are stored in the order plan_tiles gives them, each in a slot as
+    large as the largest cell.  Cells clipped by the image edge, and the
+    smaller boxes of region or sprite layouts, sit in the top-left corner
+    of their slot with the rest zeroed.  The index keys every tile by the
+    file name it would have had with naming_scheme and records its index,
+    row, col, source box, size and the byte offset of its first pixel in
+    the .npy file; since slots are contiguous, tile i starts at
+    data_offset + i * tile_bytes.
+
+    Uniform grids are copied from one array of the grid region a grid row
+    at a time; other layouts, and grids covering more than
+    tileview.MAX_PIXELS, crop each cell.  progress(done, total) counts
+    tiles.
+    """
+    if mode not in ARRAY_MODES:
+        raise ValueError(f"Tile tensors support the modes {', '.join(ARRAY_MODES)}, not '{mode}'")
+    tiles = plan_tiles(spec, image.size, prefix, naming_scheme)
+    total = len(tiles)
+    height, width = _tile_shape(tiles)
+    channels = len(mode)
+
+    os.makedirs(output_dir, exist_ok=True)
+    path, index_file = tensor_paths(output_dir, prefix)
+    out = open_memmap(path, mode="w+", dtype=np.uint8, shape=(total, height, width, channels))
+    try:
+        copied = _copy_tiles(image, spec, tiles, out, mode, progress, cancel_event)
+        out.flush()
+        data_offset = out.offset
+    finally:
+        del out
+    if copied < total:
+        return TensorResult(copied, total, path, cancelled=True)
+
+    tile_bytes = height * width * channels
+    index = {
+        "version": TENSOR_VERSION,
+        "source": os.path.basename(source_path) if source_path else None,
+        "grid": spec.to_dict(),
+        "file": os.path.basename(path),
+        "dtype": "uint8",
+        "mode": mode,
+        "shape": [total, height, width, channels],
+        "data_offset": data_offset,
+        "tile_bytes": tile_bytes,
+        "tiles": {},
+    }
+    for number, (row, col, box, filename) in enumerate(tiles):
+        index["tiles"][filename] = {
+            "index": number, "row": row, "col": col, "box": list(box),
+            "size": [box[2] - box[0], box[3] - box[1]],
+            "offset": data_offset + number * tile_bytes,
+        }
+    with open(index_file, "w") as f:
+        # Compact and encoded in one call; json.dump is far slower on big indexes
+        f.write(json.dumps(index, separators=(",", ":")))
+    return TensorResult(total, total, path, index_file)
+
+
+def _copy_tiles(image, spec, tiles, out, mode, progress, cancel_event):
+    """Fill out with the tiles; returns how many were copied before a cancel"""
+    total = len(tiles)
+    grid = None
+    if isinstance(spec, GridSpec):
+        left, top, right, bottom = spec.bounds
+        width, height = image.size
+        # Larger regions are cropped cell by cell, like inspect_grid leaves
+        # them, so memory-mapped sheets are not decoded in full
+        if (0 <= left < width and 0 <= top < height
+                and (min(right, width) - left) * (min(bottom, height) - top) <= MAX_PIXELS):
+            grid = GridTiles(image, spec, mode)
+
+    done = 0
+    if grid is not None:
+        # Whole cells of a grid row go in with one strided copy, as they
+        # are consecutive tiles in plan_tiles order
+        view = grid.view
+        rows, cols = view.shape[:2]
+        cell_h, cell_w = view.shape[2:4]
+        start = 0
+        while done < total:
+            if cancel_event is not None and cancel_event.is_set():
+                return done
+            row = tiles[start][0]
+            end = start
+            while end < total and tiles[end][0] == row:
+                end += 1
+            whole = min(cols, end - start) if row < rows else 0
+            if whole:
+                out[start:start + whole, :cell_h, :cell_w] = view[row, :whole]
+            for number in range(start + whole, end):
+                tile = grid.tile(tiles[number][2])
+                out[number, :tile.shape[0], :tile.shape[1]] = tile
+            done = start = end
+            if progress:
+                progress(done, total)
+        return done
+
+    for number, (_, _, box, _) in enumerate(tiles):
+        if cancel_event is not None and cancel_event.is_set():
+            return number
+        cell = image.crop(box)
+        if cell.mode != mode:
+            cell = cell.convert(mode)
+        pixels = np.asarray(cell).reshape(cell.height, cell.width, -1)
+        out[number, :cell.height, :cell.width] = pixels
+        if progress:
+            progress(number + 1, total)
+    return total
+
+
+class TileTensor:
+    """Read side of a tensor export: the memory-mapped array and its index
+
+    Tiles are looked up by file name or (row, col) and returned as views
+    cut to the cell's real size, so nothing is read before it is used.
+    (row, col) keys are only unique for single grids; region layouts
+    repeat them, so look their tiles up by name.
+    """
+
+    def __init__(self, index_path):
+        with open(index_path) as f:
+            self.index = json.load(f)
+        self.array = np.load(os.path.join(os.path.dirname(os.path.abspath(index_path)),
+                                          self.index["file"]), mmap_mode="r")
+        self.by_cell = {(entry["row"], entry["col"]): name
+                        for name, entry in self.index["tiles"].items()}
+
+    @property
+    def names(self):
+        return list(self.index["tiles"])
+
+    def tile(self, key):
+        """Pixels of one tile, by file name or (row, col), as a read-only view"""
+        name = self.by_cell[tuple(key)] if isinstance(key, (tuple, list)) else key
+        entry = self.index["tiles"][name]
+        width, height = entry["size"]
+        return self.array[entry["index"], :height, :width]
+
+    def image(self, key):
+        """One tile as a Pillow image"""
+        tile = self.tile(key)
+        if tile.shape[2] == 1:
+            tile = tile[:, :, 0]
+        return Image.fromarray(np.ascontiguousarray(tile), self.index["mode"])
+
+    def __len__(self):
+        return len(self.index["tiles"])
@@ -0,0 +1,44 @@
+"""
+inspect_grid must flag the same cells empty as cropping each cell and
+calling slicer.is_empty_tile does.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from grid import GridSpec
+from slicer import inspect_tile
+from tileview import inspect_grid
+
+
+def sprite_sheet(mode):
+    """Black sprites on transparent black, with a half-transparent cell and
+    a column the image edge clips"""
+    sheet = Image.new("RGBA", (72, 32), (0, 0, 0, 0))
+    sheet.paste((0, 0, 0, 255), (4, 4, 12, 12))
+    sheet.paste((0, 0, 0, 255), (0, 16, 16, 32))
+    sheet.paste((0, 0, 0, 128), (16, 16, 32, 32))
+    sheet.paste((0, 0, 0, 255), (64, 0, 72, 32))
+    return sheet.convert(mode)
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "LA", "RGB", "L"])
+@pytest.mark.parametrize("background", [None, (0, 0, 0), (0, 0, 0, 0), (0, 0, 0, 255),
+                                        (0, 0, 0, 128), (255, 255, 255)])
+def test_inspect_grid_matches_cropped_tiles(mode, background):
+    image = sprite_sheet(mode)
+    spec = GridSpec(0, 0, 2, 5, 16, 16)
+    inspected = inspect_grid(image, spec, background)
+    assert inspected is not None
+    expected = [inspect_tile(image, box, background)[1]
+                for _, _, box in spec.crop_boxes(*image.size)]
+    assert [empty for _, empty in inspected] == expected
+
+
+def test_opaque_sprite_on_transparent_black_is_kept():
+    image = Image.new("RGBA", (64, 32), (0, 0, 0, 0))
+    image.paste((0, 0, 0, 255), (8, 8, 24, 24))
+    inspected = inspect_grid(image, GridSpec(0, 0, 1, 2, 32, 32), (0, 0, 0))
+    assert [empty for _, empty in inspected] == [False, True]
@@ -0,0 +1,153 @@
+"""
+Tiled canvas viewer for SpriteCutter
+Only the tiles that intersect the visible part of the canvas are turned
+into PhotoImages, so memory follows the viewport rather than the sheet.
+"""
+
+import math
+from collections import OrderedDict
+
+from PIL import Image, ImageTk
+
+
+class TileCache:
+    """Least-recently-used cache of rendered tiles"""
+
+    def __init__(self, capacity=192):
+        self.capacity = capacity
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        photo = self.items.get(key)
+        if photo is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return photo
+
+    def put(self, key, photo):
+        self.items[key] = photo
+        self.items.move_to_end(key)
+        while len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class TiledView:
+    """Draws a PreviewPyramid onto a canvas one tile at a time
+
+    Canvas coordinates are display pixels: source pixel (x, y) is drawn at
+    (x * scale, y * scale).  Call refresh() whenever the canvas scrolls or
+    resizes; it places newly visible tiles and drops hidden ones.
+    """
+
+    TAG = "tile"
+    FILTER_MARGIN = 6  # Source pixels around a tile that LANCZOS can reach
+
+    def __init__(self, canvas, pyramid, tile_size=256, cache_size=192):
+        self.canvas = canvas
+        self.pyramid = pyramid
+        self.tile_size = tile_size
+        self.cache = TileCache(cache_size)
+        self.scale = 1.0
+        self.placed = {}  # (tx, ty) -> canvas item id at the current scale
+
+    @property
+    def display_size(self):
+        width, height = self.pyramid.size
+        return max(1, int(width * self.scale)), max(1, int(height * self.scale))
+
+    def set_scale(self, scale):
+        """Switch to a new display scale; call refresh() once scrolled into place"""
+        self.scale = scale
+        self.clear()
+        width, height = self.display_size
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+
+    def clear(self):
+        """Remove every placed tile from the canvas (the cache is kept)"""
+        self.canvas.delete(self.TAG)
+        self.placed = {}
+
+    def visible_tiles(self):
+        """Tile indices intersecting the part of the canvas on screen"""
+        left = self.canvas.canvasx(0)
+        top = self.canvas.canvasy(0)
+        right = left + self.canvas.winfo_width()
+        bottom = top + self.canvas.winfo_height()
+
+        width, height = self.display_size
+        size = self.tile_size
+        first_col = max(0, int(left // size))
+        first_row = max(0, int(top // size))
+        last_col = min(math.ceil(width / size), int(right // size) + 1)
+        last_row = min(math.ceil(height / size), int(bottom // size) + 1)
+
+        return {(tx, ty)
+                for ty in range(first_row, last_row)
+                for tx in range(first_col, last_col)}
+
+    def refresh(self):
+        """Place tiles that became visible and remove those that scrolled away"""
+        visible = self.visible_tiles()
+
+        for key in list(self.placed):
+            if key not in visible:
+                self.canvas.delete(self.placed.pop(key))
+
+        for tx, ty in visible - set(self.placed):
+            photo = self.tile_photo(tx, ty)
+            self.placed[(tx, ty)] = self.canvas.create_image(
+                tx * self.tile_size, ty * self.tile_size,
+                anchor="nw", image=photo, tags=self.TAG)
+
+        # Tiles always sit underneath overlays such as the grid
+        self.canvas.tag_lower(self.TAG)
+
+    def tile_photo(self, tx, ty):
+        key = (self.scale, tx, ty)
+        photo = self.cache.get(key)
+        if photo is None:
+            photo = ImageTk.PhotoImage(self.render_tile(tx, ty))
+            self.cache.put(key, photo)
+        return photo
+
+    def render_tile(self, tx, ty):
+        """Resample one display tile from the nearest pyramid level"""
+        width, height = self.display_size
+        size = self.tile_size
+        left, top = tx * size, ty * size
+        right, bottom = min(left + size, width), min(top + size, height)
+
+        index = self.pyramid.level_for_scale(self.scale)
+        level = self.pyramid.level(index)
+        # Display pixels -> level pixels
+        factor = level.width / (self.pyramid.size[0] * self.scale)
+        box = (left * factor, top * factor, right * factor, bottom * factor)
+
+        # Crop the covering whole-pixel region first so only that part of
+        # the level is converted and resampled; the margin gives the filter
+        # the neighbouring pixels it needs so tile edges do not show seams
+        margin = self.FILTER_MARGIN
+        region = (max(0, int(box[0]) - margin), max(0, int(box[1]) - margin),
+                  min(level.width, math.ceil(box[2]) + margin),
+                  min(level.height, math.ceil(box[3]) + margin))
+        patch = level.crop(region)
+        if patch.mode in ("1", "P"):
+            patch = patch.convert("RGBA")
+        box = (box[0] - region[0], box[1] - region[1],
+               min(box[2] - region[0], patch.width), min(box[3] - region[1], patch.height))
+
+        if self.scale >= 1.0:
+            resample = Image.Resampling.NEAREST
+        else:
+            resample = Image.Resampling.LANCZOS
+        return patch.resize((right - left, bottom - top), resample, box=box)
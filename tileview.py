@@ -0,0 +1,216 @@
+"""
+Array views of grid cells for SpriteCutter
+Turns the part of a sheet a uniform grid covers into one NumPy buffer and
+exposes its cells as views into it: a (rows, cols, cell_h, cell_w,
+channels) strided view of every whole cell, and per-cell slices that
+follow the same clipping rules as GridSpec.crop_boxes.  Nothing is copied
+per cell, so whole-grid work such as finding empty or repeated cells
+costs a few vectorised passes instead of one crop() per cell.
+"""
+
+import hashlib
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# Modes whose pixels map one-to-one onto array values
+ARRAY_MODES = ("L", "LA", "RGB", "RGBA")
+
+# Grid regions larger than this are left to per-cell crops, which keep
+# memory-mapped sheets from being decoded in full
+MAX_PIXELS = 1 << 26
+
+
+class GridTiles:
+    """The cells of a GridSpec as views into one array of the grid region
+
+    array is the region the grid covers, clipped to the image, as
+    (height, width, channels).  Boxes handed to tile() are in source
+    pixels, like the ones crop_boxes yields.  Grids must start inside the
+    image; crop() pads cells left of or above it, which views cannot.
+    """
+
+    def __init__(self, image, spec, mode=None):
+        self.spec = spec
+        self.image_size = tuple(image.size)
+        width, height = self.image_size
+        left, top, right, bottom = spec.bounds
+        if left < 0 or top < 0 or left >= width or top >= height:
+            raise ValueError("The grid must start inside the image")
+        self.origin = (left, top)
+        region = (left, top, min(right, width), min(bottom, height))
+
+        tile = image.crop(region)
+        if mode is not None and tile.mode != mode:
+            tile = tile.convert(mode)
+        self.mode = tile.mode
+        array = np.asarray(tile)
+        self.array = array if array.ndim == 3 else array[:, :, np.newaxis]
+
+    @property
+    def view(self):
+        """(rows, cols, cell_h, cell_w, channels) view of every cell that is not clipped
+
+        Cells are padded like crop_boxes; clipped rows and columns at the
+        right and bottom edges are left out, see tile() for those.
+        """
+        spec = self.spec
+        pad = spec.padding
+        cell_w, cell_h = spec.cell_width - 2 * pad, spec.cell_height - 2 * pad
+        pitch_x, pitch_y = spec.cell_width + spec.gutter, spec.cell_height + spec.gutter
+        if cell_w <= 0 or cell_h <= 0:
+            return np.empty((0, 0, 0, 0, self.array.shape[2]), dtype=self.array.dtype)
+
+        height, width, _ = self.array.shape
+        rows = min(spec.rows, max(0, (height - pad - cell_h) // pitch_y + 1))
+        cols = min(spec.cols, max(0, (width - pad - cell_w) // pitch_x + 1))
+        base = self.array[pad:, pad:]
+        row_stride, col_stride, channel_stride = base.strides
+        return as_strided(base, shape=(rows, cols, cell_h, cell_w, base.shape[2]),
+                          strides=(pitch_y * row_stride, pitch_x * col_stride,
+                                   row_stride, col_stride, channel_stride),
+                          writeable=False)
+
+    def tile(self, box):
+        """View of one cell given by its (clipped) box in source pixels"""
+        x, y = self.origin
+        return self.array[box[1] - y:box[3] - y, box[0] - x:box[2] - x]
+
+    def tiles(self):
+        """Yield (row, col, box, view) for every cell crop_boxes yields"""
+        for row, col, box in self.spec.crop_boxes(*self.image_size):
+            yield row, col, box, self.tile(box)
+
+
+def tile_array_digest(mode, tile):
+    """Content hash of a cell view, like slicer.tile_digest for a cropped tile"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{mode}:{tile.shape[1]}x{tile.shape[0]}:".encode())
+    digest.update(np.ascontiguousarray(tile).data)
+    return digest.hexdigest()
+
+
+def changed_cells(old, new, boxes):
+    """For each crop box, whether two GridTiles of the same grid differ in it
+
+    Both must come from images of the same size and mode.  Whole cells
+    are compared a grid row at a time through the strided views.
+    """
+    view, previous = new.view, old.view
+    rows, cols = view.shape[:2]
+    differs = np.zeros((rows, cols), dtype=bool)
+    if view.size:
+        for row in range(rows):
+            differs[row] = (view[row] != previous[row]).any(axis=(1, 2, 3))
+    differs = differs.tolist()
+    return [differs[row][col] if row < rows and col < cols
+            else not np.array_equal(new.tile(box), old.tile(box))
+            for row, col, box in boxes]
+
+
+def inspect_grid(image, spec, background=None):
+    """(digest, empty) for each cell crop_boxes yields, like slicer.inspect_tile
+
+    Works on array views of one buffer instead of cropping each cell.
+    Whole cells get a vectorised 64-bit fingerprint as their digest, which
+    is checked pixel for pixel against the first cell sharing it; clipped
+    edge cells and the rare mismatches are hashed like cropped tiles.
+    Digests only compare equal for identical cells, as dedupe needs, but
+    are not the strings tile_digest returns.
+
+    Returns None when the image is not one of ARRAY_MODES, the grid does
+    not start inside the image or its region is too large to hold as one
+    array, so callers can fall back to inspecting cropped tiles.
+    """
+    if image.mode not in ARRAY_MODES or "transparency" in getattr(image, "info", {}):
+        return None
+    left, top, right, bottom = spec.bounds
+    width, height = image.size
+    if left < 0 or top < 0 or left >= width or top >= height:
+        return None
+    if (min(right, width) - left) * (min(bottom, height) - top) > MAX_PIXELS:
+        return None
+    grid = GridTiles(image, spec)
+    channels = grid.array.shape[2]
+
+    # Whole cells are classified in a few passes over the strided view
+    view = grid.view
+    rows, cols = view.shape[:2]
+    empty_cells = np.zeros((rows, cols), dtype=bool)
+    keys = collisions = None
+    if view.size:
+        if grid.mode in ("LA", "RGBA"):
+            empty_cells |= view[..., -1].max(axis=(2, 3)) == 0
+        if background is not None:
+            # A cell is background only if it is one colour, as getcolors(1) has it
+            uniform = (view == view[:, :, :1, :1]).all(axis=(2, 3, 4))
+            empty_cells |= uniform & _matches(view[:, :, 0, 0], grid.mode, background)
+        keys = _fingerprints(view)
+        collisions = _collisions(view, keys)
+        keys, empty_cells, collisions = keys.tolist(), empty_cells.tolist(), collisions.tolist()
+
+    results = []
+    for row, col, box in spec.crop_boxes(width, height):
+        if row < rows and col < cols and not collisions[row][col]:
+            results.append((keys[row][col], empty_cells[row][col]))
+            continue
+        tile = grid.tile(box)
+        empty = tile.size == 0
+        if not empty and grid.mode in ("LA", "RGBA"):
+            empty = tile[..., channels - 1].max() == 0
+        if not empty and background is not None:
+            empty = bool((tile == tile[:1, :1]).all() and _matches(tile[0, 0], grid.mode, background))
+        results.append((tile_array_digest(grid.mode, tile), bool(empty)))
+    return results
+
+
+def _fingerprints(view):
+    """(rows, cols) array of 64-bit fingerprints of the cells of a strided view
+
+    A weighted sum of the pixel values with fixed random odd weights,
+    wrapping at 64 bits, computed one grid row at a time.
+    """
+    weights = np.random.default_rng(0).integers(1, 2 ** 63, size=view.shape[2:], dtype=np.uint64)
+    weights |= np.uint64(1)
+    keys = np.empty(view.shape[:2], dtype=np.uint64)
+    for row in range(view.shape[0]):
+        keys[row] = (view[row].astype(np.uint64) * weights).sum(axis=(1, 2, 3), dtype=np.uint64)
+    return keys
+
+
+def _collisions(view, keys):
+    """Cells whose fingerprint equals an earlier cell's although the pixels differ"""
+    rows, cols = keys.shape
+    _, first, inverse = np.unique(keys.ravel(), return_index=True, return_inverse=True)
+    leaders = first[inverse.ravel()].reshape(rows, cols)
+    collisions = np.zeros((rows, cols), dtype=bool)
+    positions = np.arange(cols)
+    for row in range(rows):
+        followers = leaders[row] != row * cols + positions
+        if followers.any():
+            leader = leaders[row][followers]
+            same = view[row][followers] == view[leader // cols, leader % cols]
+            collisions[row, followers] = ~same.all(axis=(1, 2, 3))
+    return collisions
+
+
+def _matches(pixels, mode, background):
+    """Per-pixel test of pixels == background, compared as RGBA like is_empty_tile
+
+    A 3-value background matches any alpha, as in is_empty_tile, so callers
+    must also check that the cell is one colour.
+    """
+    background = tuple(background)
+    if mode == "RGBA":
+        rgba = pixels
+    elif mode == "RGB":
+        if len(background) > 3 and background[3] != 255:
+            return np.zeros(pixels.shape[:-1], dtype=bool)
+        rgba, background = pixels, background[:3]
+    elif mode == "LA":
+        rgba = pixels[..., [0, 0, 0, 1]]
+    else:
+        if len(background) > 3 and background[3] != 255:
+            return np.zeros(pixels.shape[:-1], dtype=bool)
+        rgba, background = pixels[..., [0, 0, 0]], background[:3]
+    return (rgba[..., :len(background)] == np.array(background, dtype=pixels.dtype)).all(axis=-1)
@@ -0,0 +1,233 @@
+"""
+Watch mode for SpriteCutter
+Polls a sheet, or every sheet in a directory, and slices it again as soon
+as it is saved.  A change is only acted on once the file has stopped
+changing, saves that leave the contents as they were are recognised by
+their hash, and of a sheet that did change only the cells whose pixels
+differ are encoded and written again.
+"""
+
+import os
+import threading
+import time
+
+from batch import iter_inputs, load_sidecar
+from cache import file_digest
+from encoders import get_encoder
+from grid import GridSpec, grid_for_image, plan_tiles
+from loader import open_image
+from slicer import SliceEngine, tile_digest
+
+# Seconds between looks at the watched files
+DEFAULT_INTERVAL = 0.1
+
+# Seconds a file must stay unchanged before it is sliced, so editors that
+# write in several steps are not caught half way
+DEFAULT_DEBOUNCE = 0.25
+
+
+def snapshot(image, spec, tiles):
+    """What the cells of a sheet are compared with after its next change
+
+    Uniform grids keep their pixels as a tileview.GridTiles when NumPy is
+    available and the grid region is small enough; everything else keeps
+    a digest of every tile.
+    """
+    if isinstance(spec, GridSpec):
+        try:
+            from tileview import ARRAY_MODES, MAX_PIXELS, GridTiles
+        except ImportError:
+            pass
+        else:
+            left, top, right, bottom = spec.bounds
+            width, height = image.size
+            area = (min(right, width) - left) * (min(bottom, height) - top)
+            if image.mode in ARRAY_MODES and area <= MAX_PIXELS:
+                try:
+                    return GridTiles(image, spec)
+                except ValueError:
+                    # Grids starting outside the image are compared by digest
+                    pass
+    return [tile_digest(image.crop(box)) for _, _, box, _ in tiles]
+
+
+def changed_tiles(tiles, current, previous):
+    """Whether each tile differs between two snapshots of the same layout"""
+    if previous is None or type(current) is not type(previous):
+        return [True] * len(tiles)
+    if isinstance(current, list):
+        return [a != b for a, b in zip(current, previous)]
+    from tileview import changed_cells
+    return changed_cells(previous, current, [(row, col, box) for row, col, box, _ in tiles])
+
+
+class WatchUpdate:
+    """One re-export of a changed sheet
+
+    saved counts the cells written, total the cells of the sheet and
+    removed the files of cells the grid no longer has.  error is set
+    instead if the sheet could not be sliced, e.g. because it was caught
+    while being written.
+    """
+
+    def __init__(self, path, output_dir, saved=0, total=0, removed=0, elapsed=0.0, error=None):
+        self.path = path
+        self.output_dir = output_dir
+        self.saved = saved
+        self.total = total
+        self.removed = removed
+        self.elapsed = elapsed
+        self.error = error
+
+    def __repr__(self):
+        return (f"WatchUpdate(path={self.path!r}, saved={self.saved}, total={self.total}, "
+                f"removed={self.removed}, error={self.error!r})")
+
+
+class _Sheet:
+    """What the watcher knows about one watched sheet"""
+
+    def __init__(self, path, output_dir, prefix):
+        self.path = path
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.stamp = None       # (size, mtime) last seen
+        self.changed_at = None  # when the stamp last moved, while settling
+        self.digest = None      # content hash of the last export
+        self.layout = None      # size, mode, grid and format of the last export
+        self.snapshot = None    # see snapshot()
+        self.files = set()      # file names written for it
+
+
+class SheetWatcher:
+    """Keep the tiles of one sheet, or of every sheet in a directory, up to date
+
+    A file source is sliced into output_dir with prefix (its name by
+    default).  For a directory, each sheet gets a sub-directory named
+    after it, as in batch mode, and sheets added later are picked up.
+    The grid is spec if given, otherwise template (see
+    grid.grid_for_image) merged with the sheet's '.grid.json' sidecar,
+    worked out again whenever a sheet changes.
+
+    Polling os.stat() is cheap, so this needs no platform file events;
+    poll() does one round and run() keeps polling until stop_event is set.
+    """
+
+    def __init__(self, source, output_dir, spec=None, template=None, prefix=None,
+                 naming_scheme="row_col", encoder=None, workers=None,
+                 interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE, on_update=None):
+        self.source = source
+        self.output_dir = output_dir
+        self.spec = spec
+        self.template = template or {}
+        self.prefix = prefix
+        self.naming_scheme = naming_scheme
+        self.encoder = get_encoder(encoder)
+        self.engine = SliceEngine(workers=workers)
+        self.interval = interval
+        self.debounce = debounce
+        self.on_update = on_update
+        self.sheets = {}
+
+    def _paths(self):
+        if not os.path.isdir(self.source):
+            return [self.source]
+        output = os.path.abspath(self.output_dir)
+        return [path for path in iter_inputs([self.source])
+                if os.path.dirname(os.path.abspath(path)) != output]
+
+    def _sheet(self, path):
+        sheet = self.sheets.get(path)
+        if sheet is None:
+            name = os.path.splitext(os.path.basename(path))[0]
+            if os.path.isdir(self.source):
+                sheet = _Sheet(path, os.path.join(self.output_dir, name), name)
+            else:
+                sheet = _Sheet(path, self.output_dir, (self.prefix or "").strip() or name)
+            self.sheets[path] = sheet
+        return sheet
+
+    def poll(self, now=None):
+        """Look at every sheet once and re-export the ones that settled
+
+        Returns the WatchUpdates made, which are also passed to on_update.
+        """
+        now = time.monotonic() if now is None else now
+        updates = []
+        paths = self._paths()
+        for path in paths:
+            sheet = self._sheet(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Missing for a moment while an editor replaces it
+                continue
+            stamp = (stat.st_size, stat.st_mtime_ns)
+            if stamp != sheet.stamp:
+                sheet.stamp, sheet.changed_at = stamp, now
+                continue
+            if sheet.changed_at is None or now - sheet.changed_at < self.debounce:
+                continue
+            sheet.changed_at = None
+            update = self.export(sheet)
+            if update is not None:
+                updates.append(update)
+                if self.on_update:
+                    self.on_update(update)
+        for path in set(self.sheets) - set(paths):
+            del self.sheets[path]
+        return updates
+
+    def export(self, sheet):
+        """Slice a sheet again, writing only the cells that changed
+
+        Returns None if its contents are the same as at the last export.
+        """
+        started = time.perf_counter()
+        try:
+            digest = file_digest(sheet.path)
+            if digest == sheet.digest:
+                return None
+            with open_image(sheet.path) as image:
+                spec = self.spec
+                if spec is None:
+                    spec = grid_for_image(dict(self.template, **load_sidecar(sheet.path)),
+                                          image.size)
+                tiles = plan_tiles(spec, image.size, sheet.prefix, self.naming_scheme,
+                                   self.encoder.extension)
+                layout = (image.size, image.mode, spec.to_dict(), self.encoder.name)
+                current = snapshot(image, spec, tiles)
+                previous = sheet.snapshot if layout == sheet.layout else None
+
+                tasks = []
+                for (_, _, box, filename), changed in zip(tiles,
+                                                          changed_tiles(tiles, current, previous)):
+                    path = os.path.join(sheet.output_dir, filename)
+                    if changed or not os.path.exists(path):
+                        tasks.append((box, path))
+                os.makedirs(sheet.output_dir, exist_ok=True)
+                result = self.engine.run(image, tasks, encoder=self.encoder)
+        except Exception as e:
+            # Some cells may already hold the new pixels, so the next
+            # change is exported in full
+            sheet.digest, sheet.snapshot = None, None
+            return WatchUpdate(sheet.path, sheet.output_dir, error=f"{type(e).__name__}: {e}",
+                               elapsed=time.perf_counter() - started)
+
+        files = {filename for _, _, _, filename in tiles}
+        removed = 0
+        for filename in sheet.files - files:
+            path = os.path.join(sheet.output_dir, filename)
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+        sheet.digest, sheet.layout, sheet.snapshot, sheet.files = digest, layout, current, files
+        return WatchUpdate(sheet.path, sheet.output_dir, result.saved, len(tiles), removed,
+                           time.perf_counter() - started)
+
+    def run(self, stop_event=None):
+        """Poll until stop_event is set (or forever)"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.poll()
+            stop_event.wait(self.interval)